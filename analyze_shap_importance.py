@@ -8,6 +8,7 @@ import pandas as pd
 import shap
 import matplotlib.pyplot as plt
 from module_b_scaling_bridge import ScalingBridge
+from feature_engineering import add_derived
 
 def analyze_shap_importance():
     """
@@ -29,11 +30,7 @@ def analyze_shap_importance():
     test_df = pd.read_csv('data/test_split.csv')
     
     # Prepare features (add derived features)
-    epsilon = 1e-6
-    test_df['LDL_HDL_Ratio'] = test_df['LDL Cholesterol'] / (test_df['HDL Cholesterol'] + epsilon)
-    test_df['Chol_HDL_Ratio'] = test_df['Cholesterol'] / (test_df['HDL Cholesterol'] + epsilon)
-    test_df['Glucose_Insulin_Interaction'] = test_df['Glucose'] * test_df['Insulin']
-    test_df['MAP'] = test_df['Diastolic Blood Pressure'] + (1/3 * (test_df['Systolic Blood Pressure'] - test_df['Diastolic Blood Pressure']))
+    add_derived(test_df)
     
     X_test = test_df[feature_names].values
     y_test = label_encoder.transform(test_df['Disease'].values)
@@ -5,6 +5,8 @@ This acts as a safety net to catch dangerous outliers.
 """
 import numpy as np
 
+from clinical_rules import ClinicalRulesEngine, anomaly_rules
+
 class AnomalyDetector:
     """
     Detects critical anomalies in individual blood test parameters.
@@ -49,6 +51,68 @@ class AnomalyDetector:
             'Heart Rate': 50  # Bradycardia
         }
         
+        # Critical markers that require immediate attention
+        self.critical_markers = ['Troponin', 'Glucose', 'Systolic Blood Pressure', 
+                                 'Diastolic Blood Pressure', 'Creatinine']
+        
+        self.feature_names = None
+        self.engine = None
+    
+    def compile(self, feature_names, engine=None):
+        """
+        Register the critical thresholds as the 'anomaly' rule set of a
+        ClinicalRulesEngine so detect_matrix is evaluated by the shared engine.
+        
+        Args:
+            feature_names: Column order of the matrices that will be screened
+            engine: ClinicalRulesEngine for this feature order (a private one is built if None)
+        """
+        self.feature_names = list(feature_names)
+        if engine is None or engine.feature_names != self.feature_names:
+            engine = ClinicalRulesEngine(self.feature_names)
+        if 'anomaly' not in engine.rule_sets:
+            engine.add_rule_set('anomaly', anomaly_rules(self.critical_high, self.critical_low))
+        self.engine = engine
+        
+        # Map compiled rules back to feature columns (high rules use '>=')
+        rules = engine.rule_sets['anomaly'].rules
+        self.rule_features = np.array([engine.feature_index[r['feature']] for r in rules], dtype=int)
+        self.rule_is_high = np.array([r['op'] == '>=' for r in rules], dtype=bool)
+        self.critical_marker_mask = np.array([f in self.critical_markers for f in self.feature_names])
+        
+    def detect_matrix(self, X_raw, feature_names=None):
+        """
+        Screen many patients at once through the compiled 'anomaly' rule set.
+        
+        Args:
+            X_raw: Array of shape (n_samples, n_features) with raw values (NaN = not measured)
+            feature_names: Column order of X_raw (defaults to the compiled order)
+            
+        Returns:
+            AnomalyMatrixResult with boolean high/low masks and per-row risk levels
+        """
+        if feature_names is not None and list(feature_names) != self.feature_names:
+            self.compile(feature_names)
+        if self.feature_names is None:
+            raise ValueError("Call compile(feature_names) or pass feature_names first")
+        
+        result = self.engine.evaluate('anomaly', X_raw)
+        X_raw = result.X
+        high = np.zeros(X_raw.shape, dtype=bool)
+        low = np.zeros(X_raw.shape, dtype=bool)
+        high[:, self.rule_features[self.rule_is_high]] = result.hits[:, self.rule_is_high]
+        low[:, self.rule_features[~self.rule_is_high]] = result.hits[:, ~self.rule_is_high]
+        hits = high | low
+        
+        counts = hits.sum(axis=1)
+        critical = (hits & self.critical_marker_mask).any(axis=1)
+        risk_levels = np.select(
+            [critical, counts >= 3, counts >= 1],
+            ['CRITICAL', 'HIGH', 'MEDIUM'],
+            default='LOW'
+        )
+        return AnomalyMatrixResult(self, X_raw, high, low, counts, risk_levels)
+        
     def detect_anomalies(self, raw_features):
         """
         Detect critical anomalies in raw feature values.
@@ -104,12 +168,8 @@ class AnomalyDetector:
         if not anomalies:
             return 'LOW'
         
-        # Critical markers that require immediate attention
-        critical_markers = ['Troponin', 'Glucose', 'Systolic Blood Pressure', 
-                          'Diastolic Blood Pressure', 'Creatinine']
-        
         for anomaly in anomalies:
-            if anomaly['feature'] in critical_markers:
+            if anomaly['feature'] in self.critical_markers:
                 return 'CRITICAL'
         
         if len(anomalies) >= 3:
@@ -120,6 +180,44 @@ class AnomalyDetector:
         return 'LOW'
 
 
+class AnomalyMatrixResult:
+    """
+    Output of AnomalyDetector.detect_matrix.
+    Human-readable anomaly dicts are only built for rows that are displayed.
+    """
+    
+    def __init__(self, detector, values, high, low, counts, risk_levels):
+        self.detector = detector
+        self.values = values
+        self.high = high  # (n_samples, n_features) bool
+        self.low = low  # (n_samples, n_features) bool
+        self.counts = counts  # (n_samples,) anomalies per row
+        self.risk_levels = risk_levels  # (n_samples,) 'CRITICAL' / 'HIGH' / 'MEDIUM' / 'LOW'
+    
+    def __len__(self):
+        return len(self.risk_levels)
+    
+    def anomalies(self, row):
+        """Anomaly dicts for one row, in the same format as detect_anomalies"""
+        feature_names = self.detector.feature_names
+        anomalies = []
+        for mask, thresholds, severity, label, op in (
+            (self.high, self.detector.critical_high, 'critical_high', 'HIGH', '≥'),
+            (self.low, self.detector.critical_low, 'critical_low', 'LOW', '≤')
+        ):
+            for j in np.flatnonzero(mask[row]):
+                feature = feature_names[j]
+                value = float(self.values[row, j])
+                threshold = thresholds[feature]
+                anomalies.append({
+                    'feature': feature,
+                    'value': value,
+                    'threshold': threshold,
+                    'severity': severity,
+                    'message': f'{feature} is critically {label} ({value:.2f} {op} {threshold})'
+                })
+        return anomalies
+
 def test_anomaly_detector():
     """Test the anomaly detector"""
     detector = AnomalyDetector()
@@ -176,6 +274,18 @@ def test_anomaly_detector():
     print(f"Risk Level: {risk}")
     for anomaly in anomalies:
         print(f"  ⚠️  {anomaly['message']}")
+    
+    # Test case 4: Matrix API over all three panels (missing values as NaN)
+    print("\nTest Case 4: detect_matrix over the three panels")
+    features = sorted(set(test_case_1) | set(test_case_2) | set(test_case_3))
+    X = np.array([[case.get(f, np.nan) for f in features]
+                  for case in (test_case_1, test_case_2, test_case_3)])
+    result = detector.detect_matrix(X, features)
+    for row, risk in enumerate(result.risk_levels):
+        expected = detector.get_risk_level(detector.detect_anomalies(
+            [test_case_1, test_case_2, test_case_3][row]))
+        status = "✓" if risk == expected else "✗"
+        print(f"  {status} Row {row}: {risk} ({result.counts[row]} anomalies)")
 
 if __name__ == "__main__":
     test_anomaly_detector()
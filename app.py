@@ -3,70 +3,188 @@ MediGuard AI - Flask Web Application
 Main application file with routes, authentication, and database
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_file, Response, stream_with_context, has_request_context
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import io
 import json
 import hashlib
-import joblib
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import numpy as np
 import shap
-from module_b_scaling_bridge import ScalingBridge
-from anomaly_detector import AnomalyDetector
 from chatbot_engine import MedicalChatbot
-from models import db, User, Prediction
-import traceback
+from chatbot_service import ChatbotService, ChatbotBusyError, ChatbotTimeoutError
+from inference_scheduler import InferenceScheduler
+from bulk_triage import BulkTriage
+from unit_normalizer import UnitNormalizer
+from feature_aliases import FeatureAliasMap
+from metrics import REGISTRY, MODEL_CALLS, DB_WRITES, timed, mark_stage
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import db, User, Prediction, ConfirmedLabel, utcnow
+from prevention_advisor import LabelPrefixIndex
+from model_registry import ModelRegistry
+import logging
+from structured_logging import setup_logging, get_logger
+from profiling import RequestProfiler
 
 app = Flask(__name__)
 app.secret_key = 'mediguard_ai_secret_key_change_in_production'  # Change for production
 
-# Initialize Chatbot
-chatbot = MedicalChatbot()
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///mediguard.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('MEDIGUARD_DATABASE_URI', 'sqlite:///mediguard.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Chatbot execution limits (per worker process)
+app.config['CHATBOT_MAX_WORKERS'] = 4  # Threads running NLP + model inference
+app.config['CHATBOT_MAX_PENDING'] = 16  # Queued + running messages before rejecting with 503
+app.config['CHATBOT_TIMEOUT'] = 10.0  # Seconds per message
+# Micro-batching of model calls shared by /predict, /api/explain and the chatbot
+app.config['INFERENCE_MAX_BATCH_SIZE'] = 32  # Rows per predict_proba call
+app.config['INFERENCE_MAX_WAIT_MS'] = 2.0  # Time a request waits for others to join its batch
+app.config['INFERENCE_TIMEOUT'] = 10.0  # Seconds a request waits for its scores before answering 503
+# Bulk triage of JSONL message files
+app.config['BULK_TRIAGE_CHUNK_SIZE'] = 256  # Messages per batched ensemble call
+app.config['BULK_TRIAGE_PROCESSES'] = 0  # NLP extraction processes (0 = extract in the web worker; >0 spawns a pool)
+app.config['BULK_TRIAGE_MAX_LINES'] = 100_000  # Lines per request; later lines are answered with one error record
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024  # Request body limit (413 above it), bounds bulk uploads
+# Logging: JSON lines written by a background thread; DEBUG/INFO records sampled per endpoint
+app.config['MODEL_DIR'] = os.environ.get('MEDIGUARD_MODEL_DIR', 'models')  # Versioned artifacts (model_registry.py)
+app.config['MODEL_RELOAD_INTERVAL'] = 5.0  # Seconds between checks of models/CURRENT for a new version
+
+app.config['LOG_LEVEL'] = 'INFO'
+app.config['LOG_JSON'] = True
+app.config['LOG_SAMPLE_RATES'] = {'dashboard': 0.1, 'chatbot_api': 0.1, 'predict': 1.0}
+
+app.config['ADMIN_USERNAMES'] = []  # Users allowed to request profiles (X-Profile header / ?profile=)
+app.config['PROFILING_ENABLED'] = False  # When False no profiling hooks are registered
+app.config['PROFILING_SAMPLE_RATE'] = 0.0  # Fraction of requests profiled without being asked
+app.config['PROFILING_SAMPLE_MODE'] = 'sample'  # 'cprofile' or 'sample' (stack sampling, lower overhead)
 # Disable template caching to ensure fresh template loading
 app.config['TEMPLATES_AUTO_RELOAD'] = True
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 
+setup_logging(app.config['LOG_LEVEL'], app.config['LOG_JSON'], app.config['LOG_SAMPLE_RATES'])
+logger = get_logger('app')
+
 # Initialize extensions
 db.init_app(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'Please log in to access this page.'
+profiler = RequestProfiler(app)
 
-# Global model components (loaded once)
-model = None
-label_encoder = None
-feature_names = None
-scaling_bridge = None
-shap_explainer = None
-shap_model = None
-anomaly_detector = AnomalyDetector()  # Initialize anomaly detector
+# Initialize Chatbot
+chatbot = MedicalChatbot()
+chatbot_service = ChatbotService(
+    chatbot,
+    max_workers=app.config['CHATBOT_MAX_WORKERS'],
+    max_pending=app.config['CHATBOT_MAX_PENDING'],
+    timeout=app.config['CHATBOT_TIMEOUT']
+)
+bulk_triage = BulkTriage(
+    chatbot,
+    chunk_size=app.config['BULK_TRIAGE_CHUNK_SIZE'],
+    processes=app.config['BULK_TRIAGE_PROCESSES']
+)
+
+# Model components: the registry's current ModelBundle, read once per request
+inference_scheduler = None
+model_registry = None  # Watches models/CURRENT and swaps in new versions
+unit_normalizer = UnitNormalizer()  # Converts lab-reported units to dashboard units
+
+# Features entered on the dashboard form (and required by /predict)
+DASHBOARD_FEATURES = [
+    'Glucose', 'Insulin', 'HbA1c', 'BMI',
+    'Hemoglobin', 'Platelets', 'White Blood Cells', 'Red Blood Cells', 'Hematocrit', 
+    'Mean Corpuscular Volume', 'Mean Corpuscular Hemoglobin', 'Mean Corpuscular Hemoglobin Concentration',
+    'Systolic Blood Pressure', 'Diastolic Blood Pressure', 'Heart Rate', 
+    'Cholesterol', 'Triglycerides', 'LDL Cholesterol', 'HDL Cholesterol', 
+    'Troponin', 'C-reactive Protein',
+    'ALT', 'AST', 'Creatinine'
+]
+feature_alias_map = FeatureAliasMap(DASHBOARD_FEATURES)  # Accepted field spellings -> feature names
+
+@event.listens_for(Session, 'after_flush')
+def count_db_writes(session, flush_context):
+    """Count rows written per flush (exported at /metrics)"""
+    route = request.endpoint if has_request_context() else ''
+    for operation, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        if objects:
+            DB_WRITES.inc(len(objects), route=route, operation=operation)
+
+def collect_component_metrics():
+    """Scrape-time export of statistics kept by the inference, chatbot and cache components"""
+    collected = [
+        ('mediguard_cache_requests_total', 'counter', 'Cache lookups by cache and result.', [
+            ({'cache': 'advice_labels', 'result': 'hit'}, chatbot.advisor.cache_hits),
+            ({'cache': 'advice_labels', 'result': 'miss'}, chatbot.advisor.cache_misses),
+            ({'cache': 'feature_aliases', 'result': 'hit'}, feature_alias_map.cache_hits),
+            ({'cache': 'feature_aliases', 'result': 'miss'}, feature_alias_map.cache_misses),
+        ]),
+        ('mediguard_chatbot_pending_messages', 'gauge', 'Chatbot messages queued or running.', [
+            ({}, chatbot_service.stats()['pending'])
+        ]),
+    ]
+    if inference_scheduler is not None:
+        stats = inference_scheduler.stats()
+        collected += [
+            ('mediguard_inference_batches_total', 'counter', 'predict_proba calls made by the inference scheduler.',
+             [({}, stats['batches'])]),
+            ('mediguard_inference_rows_total', 'counter', 'Rows scored by the inference scheduler.',
+             [({}, stats['rows'])]),
+            ('mediguard_inference_queue_depth', 'gauge', 'Requests waiting for the inference scheduler.',
+             [({}, stats['queued'])]),
+        ]
+    return collected
+
+REGISTRY.register_collector(collect_component_metrics)
+
+def install_model_bundle(bundle):
+    """Point the shared components at a newly loaded (and compiled) model version"""
+    global inference_scheduler
+    
+    # One scheduler per process batches concurrent requests from all routes;
+    # on a swap it keeps its queue (requests pin the model of the bundle they read)
+    if inference_scheduler is None:
+        inference_scheduler = InferenceScheduler(
+            bundle.model,
+            max_batch_size=app.config['INFERENCE_MAX_BATCH_SIZE'],
+            max_wait_ms=app.config['INFERENCE_MAX_WAIT_MS'],
+            model_version=bundle.version
+        )
+    else:
+        inference_scheduler.swap_model(bundle.model, bundle.version)
+    chatbot.scheduler = inference_scheduler
+    chatbot.use_bundle(bundle)
+    
+    if bundle.population_model is None:
+        logger.warning("Population anomaly model not available in version %s", bundle.version)
+    if bundle.shap_explainer is None:
+        logger.warning("SHAP components not available in version %s", bundle.version)
+    logger.info("Model components installed", extra={'fields': {'version': bundle.version}})
+
+def current_bundle():
+    """The active ModelBundle (loaded on first use), or None if no model could be loaded"""
+    if model_registry is None or model_registry.current is None:
+        load_model_components()
+    return model_registry.current if model_registry is not None else None
 
 def load_model_components():
-    """Load ML model and components"""
-    global model, label_encoder, feature_names, scaling_bridge, shap_explainer, shap_model
+    """Load the active model version and start watching for new ones"""
+    global model_registry
     try:
-        model = joblib.load('models/best_model.pkl')
-        label_encoder = joblib.load('models/label_encoder.pkl')
-        feature_names = joblib.load('models/feature_names.pkl')
-        scaling_bridge = ScalingBridge.load('models/scaling_bridge.pkl')
-        
-        # Load SHAP components (optional but recommended)
-        try:
-            shap_explainer = joblib.load('models/shap_explainer.pkl')
-            shap_model = joblib.load('models/shap_model.pkl')
-            print("✓ SHAP components loaded successfully")
-        except Exception as e:
-            print(f"Warning: SHAP components could not be loaded: {e}")
-            
-        print("✓ Model components loaded successfully")
+        if model_registry is None:
+            model_registry = ModelRegistry(
+                app.config['MODEL_DIR'],
+                poll_interval=app.config['MODEL_RELOAD_INTERVAL'],
+                on_swap=install_model_bundle
+            )
+        model_registry.load_active()
+        model_registry.start()
     except Exception as e:
-        print(f"Error loading model: {e}")
-        traceback.print_exc()
+        logger.exception("Error loading model: %s", e)
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -84,35 +202,23 @@ def safe_check_password_hash(pwhash, password):
             return False
         raise
 
-def detect_data_quality_issues(raw_features):
-    """Detect data quality issues"""
+def detect_data_quality_issues(raw_row, scaling_bridge, feature_names):
+    """Detect data quality issues (vectorized range check over a one-row model-order matrix)"""
     issues = []
     warnings = []
     
-    if scaling_bridge is None:
-        return issues, warnings
+    issue_mask, warning_mask = scaling_bridge.data_quality_masks(raw_row, feature_names)
+    expected_range = scaling_bridge.range_bounds(feature_names)['expected_range']
     
-    for feature_name, raw_value in raw_features.items():
-        if feature_name in scaling_bridge.physiological_ranges:
-            min_val, max_val = scaling_bridge.physiological_ranges[feature_name]
-            range_size = max_val - min_val
-            extended_min = min_val - range_size
-            extended_max = max_val + range_size
-            
-            if raw_value < extended_min or raw_value > extended_max:
-                issues.append({
-                    'feature': feature_name,
-                    'value': raw_value,
-                    'expected_range': f"{min_val:.2f} - {max_val:.2f}",
-                    'severity': 'critical'
-                })
-            elif raw_value < min_val or raw_value > max_val:
-                warnings.append({
-                    'feature': feature_name,
-                    'value': raw_value,
-                    'expected_range': f"{min_val:.2f} - {max_val:.2f}",
-                    'severity': 'warning'
-                })
+    # Dicts are only built for flagged features
+    for mask, severity, target in ((issue_mask, 'critical', issues), (warning_mask, 'warning', warnings)):
+        for j in np.flatnonzero(mask[0]):
+            target.append({
+                'feature': feature_names[j],
+                'value': float(raw_row[0, j]),
+                'expected_range': expected_range[j],
+                'severity': severity
+            })
     
     return issues, warnings
 
@@ -218,7 +324,8 @@ def chatbot_page():
 
 @app.route('/api/chatbot', methods=['POST'])
 @login_required
-def chatbot_api():
+@timed('chatbot_api')
+async def chatbot_api():
     """Handle chatbot conversation"""
     data = request.get_json()
     user_message = data.get('message', '')
@@ -227,10 +334,52 @@ def chatbot_api():
     if not user_message:
         return jsonify({'error': 'No message provided'}), 400
         
-    # Process message
-    response = chatbot.process_message(user_message, session_context)
+    mark_stage('parse')
+    
+    # Process message on the bounded chatbot executor. Under WSGI the worker thread
+    # still waits for the coroutine; the gain is the bounded pool and backpressure.
+    try:
+        response = await chatbot_service.process_message(user_message, session_context)
+        if response.get('prediction'):
+            MODEL_CALLS.inc(route='chatbot_api', model='ensemble')
+    except ChatbotBusyError as e:
+        return jsonify({'error': str(e)}), 503
+    except ChatbotTimeoutError as e:
+        return jsonify({'error': str(e)}), 504
     
-    return jsonify(response)
+    mark_stage('process')
+    
+    response = jsonify(response)
+    mark_stage('serialize')
+    return response
+
+def closing_lines(stream):
+    """Yield the lines of a file object, closing it when exhausted or abandoned"""
+    with stream:
+        yield from stream
+
+@app.route('/api/triage/bulk', methods=['POST'])
+@login_required
+def bulk_triage_api():
+    """Triage a JSONL file of patient messages, streaming JSONL results back"""
+    if not chatbot.model_loaded:
+        return jsonify({'error': 'Model files not loaded. Please contact administrator.'}), 500
+    
+    # Accept either a multipart upload ('file') or a raw JSONL request body; both are
+    # iterated line by line while the response streams, never read whole
+    upload = request.files.get('file')
+    if upload:
+        # Werkzeug closes uploads when the view returns, before the body streams:
+        # keep its spooled file (memory or temp file) and close it when done instead
+        lines = closing_lines(upload.stream)
+        upload.stream = io.BytesIO()
+    else:
+        lines = request.stream
+    
+    return Response(
+        stream_with_context(bulk_triage.triage_jsonl(lines, app.config['BULK_TRIAGE_MAX_LINES'])),
+        mimetype='application/x-ndjson'
+    )
 
 @app.route('/logout')
 @login_required
@@ -265,13 +414,13 @@ def analytics():
             disease_confidence[disease] = round(avg_conf, 2)
         
         # Recent predictions (last 7 days)
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
+        seven_days_ago = utcnow() - timedelta(days=7)
         recent_predictions = [p for p in predictions if p.created_at >= seven_days_ago]
         
         # Predictions per day (last 7 days)
         daily_counts = {}
         for i in range(7):
-            date = (datetime.utcnow() - timedelta(days=i)).strftime('%Y-%m-%d')
+            date = (utcnow() - timedelta(days=i)).strftime('%Y-%m-%d')
             daily_counts[date] = 0
         
         for pred in recent_predictions:
@@ -294,28 +443,20 @@ def analytics():
 def dashboard():
     """Main dashboard with prediction form"""
     # Ensure models are loaded
-    if model is None or feature_names is None or scaling_bridge is None:
-        load_model_components()
-        if model is None or feature_names is None or scaling_bridge is None:
-            flash('Model files not found. Please run module_a_train_model.py first.', 'error')
-            return render_template('dashboard.html', 
-                                 feature_names=[],
-                                 feature_ranges={},
-                                 healthy_defaults={})
+    bundle = current_bundle()
+    if bundle is None:
+        flash('Model files not found. Please run module_a_train_model.py first.', 'error')
+        return render_template('dashboard.html', 
+                             feature_names=[],
+                             feature_ranges={},
+                             healthy_defaults={})
+    scaling_bridge = bundle.scaling_bridge
     
     # Use normal physiological ranges instead of dataset-derived ranges
     feature_ranges = {}
     
     # Define all required features for the UI
-    all_required_features = [
-        'Glucose', 'Insulin', 'HbA1c', 'BMI',
-        'Hemoglobin', 'Platelets', 'White Blood Cells', 'Red Blood Cells', 'Hematocrit', 
-        'Mean Corpuscular Volume', 'Mean Corpuscular Hemoglobin', 'Mean Corpuscular Hemoglobin Concentration',
-        'Systolic Blood Pressure', 'Diastolic Blood Pressure', 'Heart Rate', 
-        'Cholesterol', 'Triglycerides', 'LDL Cholesterol', 'HDL Cholesterol', 
-        'Troponin', 'C-reactive Protein',
-        'ALT', 'AST', 'Creatinine'
-    ]
+    all_required_features = DASHBOARD_FEATURES
     
     for feat in all_required_features:
         if feat in scaling_bridge.physiological_ranges:
@@ -369,20 +510,13 @@ def dashboard():
         'C-reactive Protein': 1.0
     }
     
-    # Debug: Print what we're passing to the template
-    print(f"DEBUG: Total features in display_feature_names: {len(display_feature_names)}")
-    print(f"DEBUG: display_feature_names: {display_feature_names}")
-    print(f"DEBUG: Total features in feature_ranges: {len(feature_ranges)}")
-    print(f"DEBUG: feature_ranges keys: {list(feature_ranges.keys())}")
-    
-    # Check which features are missing
-    missing = [f for f in display_feature_names if f not in feature_ranges]
-    if missing:
-        print(f"DEBUG: Missing features: {missing}")
-    
-    # Debug: Print Red Blood Cells range specifically
-    if 'Red Blood Cells' in feature_ranges:
-        print(f"DEBUG: Red Blood Cells range: {feature_ranges['Red Blood Cells']}")
+    # Debug: Log what we're passing to the template
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Dashboard template data", extra={'fields': {
+            'display_feature_names': display_feature_names,
+            'feature_ranges': list(feature_ranges.keys()),
+            'missing_ranges': [f for f in display_feature_names if f not in feature_ranges]
+        }})
     
     return render_template('dashboard.html', 
                          feature_names=display_feature_names,
@@ -391,129 +525,114 @@ def dashboard():
 
 @app.route('/predict', methods=['POST'])
 @login_required
+@timed('predict')
 def predict():
     """Handle prediction request"""
     try:
-        # Ensure models are loaded
-        if model is None or feature_names is None or scaling_bridge is None:
-            load_model_components()
-            if model is None or feature_names is None or scaling_bridge is None:
-                return jsonify({'error': 'Model files not loaded. Please contact administrator.'}), 500
+        # One model version for the whole request: every component comes from this bundle
+        bundle = current_bundle()
+        if bundle is None:
+            return jsonify({'error': 'Model files not loaded. Please contact administrator.'}), 500
+        feature_names = bundle.feature_names
+        scaling_bridge = bundle.scaling_bridge
         
         data = request.get_json()
         
-        # PREPROCESSING: Clean malformed field names from cached templates
+        # Resolve field names in one pass through the precompiled alias map.
         # Some browsers cache old templates with newlines and underscores in field names
         # e.g., 'Red\n________________________________________________Blood_Cells'
-        cleaned_data = {}
-        for key, value in data.items():
-            # Remove newlines and collapse multiple underscores to single underscore
-            cleaned_key = key.replace('\n', '').replace('_' * 48, '_').replace('_' * 10, '_').strip()
-            # Remove any remaining extra underscores
-            while '__' in cleaned_key:
-                cleaned_key = cleaned_key.replace('__', '_')
-            cleaned_data[cleaned_key] = value
-            if key != cleaned_key:
-                print(f"DEBUG: Cleaned key '{key}' -> '{cleaned_key}'")
-        
-        # Use cleaned data for processing
-        data = cleaned_data
-        
-        raw_features = {}
-        
-        # Use the same feature list as the dashboard
-        all_required_features = [
-            'Glucose', 'Insulin', 'HbA1c', 'BMI',
-            'Hemoglobin', 'Platelets', 'White Blood Cells', 'Red Blood Cells', 'Hematocrit', 
-            'Mean Corpuscular Volume', 'Mean Corpuscular Hemoglobin', 'Mean Corpuscular Hemoglobin Concentration',
-            'Systolic Blood Pressure', 'Diastolic Blood Pressure', 'Heart Rate', 
-            'Cholesterol', 'Triglycerides', 'LDL Cholesterol', 'HDL Cholesterol', 
-            'Troponin', 'C-reactive Protein',
-            'ALT', 'AST', 'Creatinine'
-        ]
+        all_required_features = DASHBOARD_FEATURES
+        resolved, missing = feature_alias_map.resolve(data)
         
-        # Debug: Print received data in detail
-        print(f"DEBUG PREDICT: Received {len(data)} fields")
-        print(f"DEBUG PREDICT: All keys received: {list(data.keys())}")
-        for key in data.keys():
-            print(f"  - Key: {repr(key)} = {data[key]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Predict payload received", extra={'fields': {
+                'n_fields': len(data),
+                'keys': {key: feature_alias_map.lookup(key) for key in data.keys()}
+            }})
         
-        # Extract input features from request
-        for feature_name in all_required_features:
-            value = data.get(feature_name)
-            if value is None:
-                # Try underscored version for features with spaces
-                underscored_name = feature_name.replace(' ', '_')
-                value = data.get(underscored_name)
-                if value is not None:
-                    print(f"DEBUG: Found {feature_name} as{underscored_name}")
-            
-            # If still not found, try to find it in the data keys with newlines/malformed names
-            if value is None:
-                # Look for keys that might contain the feature name (handling cached HTML with newlines)
-                for key in data.keys():
-                    # Try multiple cleaning strategies
-                    cleaned_variations = [
-                        key.replace('\\n', '').replace('_' * 48, '').strip(),  # Remove literal \n and long underscores
-                        key.replace('\n', '').replace('_' * 48, '').strip(),   # Remove actual newlines
-                        key.split('\n')[0] + key.split('\n')[-1] if '\n' in key else key,  # Join parts around newline
-                        ''.join(key.split()),  # Remove all whitespace
-                    ]
-                    
-                    for cleaned_key in cleaned_variations:
-                        cleaned_key = cleaned_key.replace('_' * 48, '').replace('_' * 10, '').strip()
-                        # Try matching with underscores or spaces
-                        if (cleaned_key == underscored_name or 
-                            cleaned_key.replace('_', ' ') == feature_name or
-                            cleaned_key == feature_name.replace(' ', '')):
-                            value = data.get(key)
-                            print(f"DEBUG: Found {feature_name} as malformed key: {repr(key)} -> cleaned: {cleaned_key}")
-                            break
-                    
-                    if value is not None:
-                        break
-            
-            if value is None:
-                print(f"DEBUG: Missing feature: {feature_name}, tried both '{feature_name}' and '{feature_name.replace(' ', '_')}'")
-                return jsonify({'error': f'Missing feature: {feature_name}. Please hard refresh the page (Ctrl+Shift+R or Cmd+Shift+R) to clear cache.', 'success': False}), 400
+        if missing:
+            return jsonify({'error': f'Missing feature: {missing[0]}. Please hard refresh the page (Ctrl+Shift+R or Cmd+Shift+R) to clear cache.', 'success': False}), 400
+        
+        base_row = np.empty((1, len(all_required_features)))
+        for j, feature_name in enumerate(all_required_features):
             try:
-                raw_features[feature_name] = float(value)
-            except ValueError:
+                base_row[0, j] = float(resolved[feature_name])
+            except (TypeError, ValueError):
                 return jsonify({'error': f'Invalid value for {feature_name}'}), 400
+        
+        # Raw-units path: values reported in lab units, e.g. {"units": {"Glucose": "mmol/L"}}
+        units = data.get('units')
+        if units:
+            if not isinstance(units, dict):
+                return jsonify({'error': 'Invalid units: expected an object of feature -> unit', 'success': False}), 400
+            try:
+                base_row = unit_normalizer.convert_matrix(base_row, all_required_features, units)
+            except (ValueError, AttributeError) as e:
+                return jsonify({'error': f'Invalid units: {e}', 'success': False}), 400
                 
-        # Calculate derived features
+        mark_stage('parse')
+        
+        # Model-order raw row with the derived features (same code as training)
         try:
-            epsilon = 1e-6
-            raw_features['LDL_HDL_Ratio'] = raw_features['LDL Cholesterol'] / (raw_features['HDL Cholesterol'] + epsilon)
-            raw_features['Chol_HDL_Ratio'] = raw_features['Cholesterol'] / (raw_features['HDL Cholesterol'] + epsilon)
-            raw_features['Glucose_Insulin_Interaction'] = raw_features['Glucose'] * raw_features['Insulin']
-            raw_features['MAP'] = raw_features['Diastolic Blood Pressure'] + (1/3 * (raw_features['Systolic Blood Pressure'] - raw_features['Diastolic Blood Pressure']))
-        except Exception as e:
+            raw_row = bundle.features.build(base_row, all_required_features)
+        except ValueError as e:
             return jsonify({'error': f'Error calculating derived features: {str(e)}'}), 400
         
+        mark_stage('derived_features')
+        
         # --- Anomaly Detection (Safety Net) ---
-        anomalies = anomaly_detector.detect_anomalies(raw_features)
-        anomaly_risk = anomaly_detector.get_risk_level(anomalies)
+        screening = bundle.anomaly_detector.detect_matrix(raw_row)
+        anomalies = screening.anomalies(0)
+        anomaly_risk = str(screening.risk_levels[0])
         
         # If critical anomalies detected, override risk level
         if anomaly_risk in ['CRITICAL', 'HIGH']:
-            print(f"⚠️  Anomaly detected: {anomaly_risk} - {len(anomalies)} critical values")
+            logger.warning("Anomaly detected: %s - %d critical values", anomaly_risk, len(anomalies),
+                           extra={'fields': {'anomalies': [a['feature'] for a in anomalies]}})
         
         patient_id = data.get('patient_id', f'PAT_{datetime.now().strftime("%Y%m%d%H%M%S")}')
         
+        mark_stage('anomaly_rules')
+        
         # Data quality check
-        issues, warnings = detect_data_quality_issues(raw_features)
+        issues, warnings = detect_data_quality_issues(raw_row, scaling_bridge, feature_names)
         
-        # Scale features
-        scaled_features_array = scaling_bridge.scale_to_array(raw_features, feature_names)
+        mark_stage('data_quality')
         
-        # Make prediction
-        prediction_encoded = model.predict(scaled_features_array.reshape(1, -1))[0]
-        prediction = label_encoder.inverse_transform([prediction_encoded])[0]
-        prediction_proba = model.predict_proba(scaled_features_array.reshape(1, -1))[0]
+        # Scale features
+        scaled_features_array = scaling_bridge.scale_matrix(raw_row, feature_names)[0]
+        
+        mark_stage('scaling')
+        
+        # Population check: is this panel unlike anything in the training data?
+        population = None
+        population_model = bundle.population_model
+        if population_model is not None:
+            population_scores = population_model.score(scaled_features_array, feature_names)
+            population = {
+                'out_of_distribution': bool(population_scores['out_of_distribution'][0]),
+                'distance': round(float(population_scores['distance'][0]), 2),
+                'threshold': round(population_model.threshold, 2),
+                'nearest_class': str(population_scores['nearest_class'][0])
+            }
+        
+        mark_stage('population')
+        
+        # Make prediction (single predict_proba call, batched with concurrent requests)
+        future = inference_scheduler.submit(scaled_features_array, bundle.model, bundle.version)
+        try:
+            prediction_proba = future.result(timeout=app.config['INFERENCE_TIMEOUT'])
+        except FutureTimeoutError:
+            logger.error("Inference timed out after %.1fs", app.config['INFERENCE_TIMEOUT'])
+            return jsonify({'error': 'Model inference timed out, please retry'}), 503
+        prediction_model_version = future.model_version  # Version that scored this row
+        MODEL_CALLS.inc(route='predict', model='ensemble')
+        mark_stage('inference')
+        prediction_encoded = future.model.classes_[np.argmax(prediction_proba)]
+        prediction = bundle.label_encoder.inverse_transform([prediction_encoded])[0]
         
         # Get probabilities
-        class_names = label_encoder.classes_
+        class_names = bundle.label_encoder.classes_
         proba_dict = {class_names[i]: float(prob) for i, prob in enumerate(prediction_proba)}
         base_confidence = float(max(prediction_proba)) * 100
         
@@ -538,46 +657,18 @@ def predict():
         
         # --- CARDIAC MARKER DETECTION (Critical Safety Override) ---
         # Training data has ZERO heart disease samples, so model cannot predict it
-        # Use rule-based detection for critical cardiac injury markers
-        cardiac_risk_score = 0
-        cardiac_indicators = []
-        
-        # Critical marker: Troponin (cardiac injury)
-        if raw_features['Troponin'] > 0.04:
-            troponin_severity = raw_features['Troponin'] / 0.04
-            cardiac_risk_score += min(40, troponin_severity * 20)
-            cardiac_indicators.append(f"Elevated Troponin ({raw_features['Troponin']:.3f} ng/mL, normal <0.04)")
-        
-        # Critical marker: C-reactive Protein (inflammation)
-        if raw_features['C-reactive Protein'] > 3.0:
-            crp_severity = raw_features['C-reactive Protein'] / 3.0
-            cardiac_risk_score += min(20, crp_severity * 10)
-            cardiac_indicators.append(f"High CRP ({raw_features['C-reactive Protein']:.1f} mg/L, normal <3.0)")
-        
-        # High LDL cholesterol
-        if raw_features['LDL Cholesterol'] > 160:
-            cardiac_risk_score += 15
-            cardiac_indicators.append(f"High LDL ({raw_features['LDL Cholesterol']:.0f} mg/dL)")
-        
-        # Low HDL cholesterol
-        if raw_features['HDL Cholesterol'] < 40:
-            cardiac_risk_score += 10
-            cardiac_indicators.append(f"Low HDL ({raw_features['HDL Cholesterol']:.0f} mg/dL)")
-        
-        # Hypertension
-        if raw_features['Systolic Blood Pressure'] > 140 or raw_features['Diastolic Blood Pressure'] > 90:
-            cardiac_risk_score += 15
-            cardiac_indicators.append(f"Hypertension ({raw_features['Systolic Blood Pressure']:.0f}/{raw_features['Diastolic Blood Pressure']:.0f} mmHg)")
-        
-        # High triglycerides
-        if raw_features['Triglycerides'] > 200:
-            cardiac_risk_score += 10
-            cardiac_indicators.append(f"High Triglycerides ({raw_features['Triglycerides']:.0f} mg/dL)")
+        # Use rule-based detection for critical cardiac injury markers (compiled CARDIAC_RULES)
+        cardiac, cardiac_override, override_confidence = bundle.rules_engine.cardiac_assessment(raw_row, [prediction])
+        cardiac_risk_score = float(cardiac.total[0])
+        # Raw values (with derived features) for indicator texts, the audit hash and the stored record
+        raw_features = bundle.features.to_dict(raw_row[0], all_required_features)
+        cardiac_indicators = cardiac.indicators(0, raw_features)
         
         # Override prediction if cardiac risk is HIGH
-        if cardiac_risk_score >= 60 and prediction != 'Heart Di':
-            print(f"🚨 CARDIAC OVERRIDE: Risk score {cardiac_risk_score}, overriding {prediction} → Heart Di")
-            print(f"   Cardiac indicators: {', '.join(cardiac_indicators)}")
+        if cardiac_override[0]:
+            logger.warning("Cardiac override: risk score %.1f, overriding %s -> Heart Di",
+                           cardiac_risk_score, prediction,
+                           extra={'fields': {'cardiac_indicators': cardiac_indicators}})
             
             original_prediction = prediction
             original_confidence = confidence
@@ -585,8 +676,7 @@ def predict():
             # Override to Heart Disease
             prediction = 'Heart Di'
             # Set confidence based on cardiac risk score
-            confidence = min(95.0, 50 + cardiac_risk_score * 0.7)
-            confidence = round(confidence, 2)
+            confidence = float(override_confidence[0])
             
             # Update probability dict to reflect override
             proba_dict['Heart Di'] = confidence / 100
@@ -597,6 +687,8 @@ def predict():
                 proba_dict[cls] = proba_dict.get(cls, 0) * remaining_prob
         
         
+        mark_stage('cardiac_rules')
+        
         # Calculate risk level based on prediction type
         # Healthy = LOW risk, Diseases = HIGH/MEDIUM risk
         if prediction == 'Healthy':
@@ -636,10 +728,12 @@ def predict():
             probabilities=json.dumps(proba_dict),
             block_hash=block_hash,
             data_quality_issues=json.dumps(data_quality_issues) if data_quality_issues else None,
-            data_quality_warnings=json.dumps(data_quality_warnings) if data_quality_warnings else None
+            data_quality_warnings=json.dumps(data_quality_warnings) if data_quality_warnings else None,
+            model_version=prediction_model_version
         )
         db.session.add(prediction_record)
         db.session.commit()
+        mark_stage('db_commit')
         
         # Prepare response
         response = {
@@ -659,13 +753,60 @@ def predict():
                 'risk_level': anomaly_risk,
                 'count': len(anomalies)
             },
+            'population': population,
+            'model_version': prediction_model_version,
             'prediction_id': prediction_record.id
         }
         
-        return jsonify(response)
+        response = jsonify(response)
+        mark_stage('serialize')
+        return response
     
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Request failed")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/predictions/<int:prediction_id>/confirm', methods=['POST'])
+@login_required
+def confirm_prediction(prediction_id):
+    """Record the confirmed diagnosis of a stored prediction (fed to incremental_training.py)"""
+    try:
+        prediction = Prediction.query.get_or_404(prediction_id)
+        
+        # Check ownership
+        if prediction.user_id != current_user.id:
+            return jsonify({'error': 'Unauthorized'}), 403
+        
+        bundle = current_bundle()
+        if bundle is None:
+            return jsonify({'error': 'Model files not loaded. Please contact administrator.'}), 500
+        label_encoder = bundle.label_encoder
+        
+        data = request.get_json(silent=True) or {}
+        label = LabelPrefixIndex(label_encoder.classes_).lookup(str(data.get('label', '')))
+        if label is None:
+            return jsonify({'error': f"Unknown label. Expected one of: {', '.join(label_encoder.classes_)}",
+                            'success': False}), 400
+        
+        confirmed = prediction.confirmed_label
+        if confirmed is None:
+            confirmed = ConfirmedLabel(prediction_id=prediction.id, user_id=current_user.id, label=label)
+            db.session.add(confirmed)
+        elif confirmed.label != label:
+            confirmed.label = label
+            confirmed.user_id = current_user.id
+            confirmed.trained_at = None  # Corrected label: feed it to the next update again
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'prediction_id': prediction.id,
+            'label': label,
+            'matches_prediction': label == prediction.prediction
+        })
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Request failed")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/reports')
@@ -754,47 +895,61 @@ def api_stats():
         'disease_distribution': disease_counts
     })
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint (text exposition format)"""
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/rules/stats')
+@login_required
+def api_rules_stats():
+    """Per-rule evaluation and hit counters of the clinical rules engine"""
+    bundle = current_bundle()
+    if bundle is None:
+        return jsonify({'error': 'Model not loaded'}), 500
+    return jsonify(bundle.rules_engine.stats())
+
 @app.route('/api/explain', methods=['POST'])
 @login_required
+@timed('explain_prediction')
 def explain_prediction():
     """Generate SHAP explanation for a prediction"""
     try:
-        if shap_explainer is None or scaling_bridge is None:
+        # One model version for the whole request
+        bundle = current_bundle()
+        if bundle is None or bundle.shap_explainer is None:
             return jsonify({'error': 'Explainability components not loaded'}), 500
+        feature_names = bundle.feature_names
             
         data = request.get_json()
-        raw_features = {}
         
-        # Define derived features
-        derived_features = ['LDL_HDL_Ratio', 'Chol_HDL_Ratio', 'Glucose_Insulin_Interaction', 'MAP']
-        input_features = [f for f in feature_names if f not in derived_features]
-        
-        # Extract input features
-        for feature_name in input_features:
+        # Extract input features (the base features, in model order)
+        input_features = bundle.features.base_features
+        base_row = np.empty((1, len(input_features)))
+        for j, feature_name in enumerate(input_features):
             value = data.get(feature_name)
             if value is None:
                 return jsonify({'error': f'Missing feature: {feature_name}'}), 400
             try:
-                raw_features[feature_name] = float(value)
+                base_row[0, j] = float(value)
             except ValueError:
                 return jsonify({'error': f'Invalid value for {feature_name}'}), 400
                 
-        # Calculate derived features
-        try:
-            epsilon = 1e-6
-            raw_features['LDL_HDL_Ratio'] = raw_features['LDL Cholesterol'] / (raw_features['HDL Cholesterol'] + epsilon)
-            raw_features['Chol_HDL_Ratio'] = raw_features['Cholesterol'] / (raw_features['HDL Cholesterol'] + epsilon)
-            raw_features['Glucose_Insulin_Interaction'] = raw_features['Glucose'] * raw_features['Insulin']
-            raw_features['MAP'] = raw_features['Diastolic Blood Pressure'] + (1/3 * (raw_features['Systolic Blood Pressure'] - raw_features['Diastolic Blood Pressure']))
-        except Exception as e:
-            return jsonify({'error': f'Error calculating derived features: {str(e)}'}), 400
+        # Model-order raw row with the derived features (same code as training)
+        raw_row = bundle.features.build(base_row)
             
+        mark_stage('parse')
+        
         # Scale features
-        scaled_features_array = scaling_bridge.scale_to_array(raw_features, feature_names)
+        scaled_features_array = bundle.scaling_bridge.scale_matrix(raw_row, feature_names)[0]
+        
+        mark_stage('scaling')
         
         # Calculate SHAP values
         # shap_explainer expects a matrix, so reshape
-        shap_values = shap_explainer(scaled_features_array.reshape(1, -1))
+        shap_values = bundle.shap_explainer(scaled_features_array.reshape(1, -1))
+        MODEL_CALLS.inc(route='explain_prediction', model='shap')
+        mark_stage('shap')
         
         # Extract values for the first (and only) sample
         # For multi-class, shap_values might be a list of arrays (one for each class)
@@ -816,8 +971,15 @@ def explain_prediction():
         # We need to know which class was predicted.
         
         # Re-predict to be sure
-        prediction_idx = model.predict(scaled_features_array.reshape(1, -1))[0]
-        predicted_class = label_encoder.inverse_transform([prediction_idx])[0]
+        try:
+            prediction_idx = inference_scheduler.predict(scaled_features_array, app.config['INFERENCE_TIMEOUT'],
+                                                         model=bundle.model, model_version=bundle.version)
+        except FutureTimeoutError:
+            logger.error("Inference timed out after %.1fs", app.config['INFERENCE_TIMEOUT'])
+            return jsonify({'error': 'Model inference timed out, please retry'}), 503
+        MODEL_CALLS.inc(route='explain_prediction', model='ensemble')
+        mark_stage('inference')
+        predicted_class = bundle.label_encoder.inverse_transform([prediction_idx])[0]
         
         # If values has 3 dims: (samples, features, classes)
         if len(values.shape) == 3:
@@ -837,7 +999,7 @@ def explain_prediction():
             explanation.append({
                 'feature': feature,
                 'impact': float(class_impacts[i]),
-                'value': raw_features[feature]
+                'value': float(raw_row[0, i])
             })
             
         # Sort by absolute impact
@@ -850,7 +1012,7 @@ def explain_prediction():
         })
         
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Request failed")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/feature_importance', methods=['GET'])
@@ -884,7 +1046,7 @@ def get_feature_importance():
         })
         
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Request failed")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/report/<int:report_id>/delete', methods=['POST', 'DELETE'])
@@ -905,11 +1067,12 @@ def delete_report(report_id):
         return jsonify({'success': True, 'message': 'Report deleted successfully'})
     except Exception as e:
         db.session.rollback()
-        traceback.print_exc()
+        logger.exception("Request failed")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/report/<int:report_id>/pdf')
 @login_required
+@timed('download_report_pdf')
 def download_report_pdf(report_id):
     """Generate and download PDF report"""
     try:
@@ -929,6 +1092,8 @@ def download_report_pdf(report_id):
         if prediction.user_id != current_user.id:
             return "Unauthorized", 403
         
+        mark_stage('query')
+        
         # Create PDF buffer
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter)
@@ -1043,42 +1208,9 @@ def download_report_pdf(report_id):
         
         elements.append(Spacer(1, 0.3*inch))
         
-        # Health Recommendations
+        # Health Recommendations (same compiled advice the chatbot uses)
         elements.append(Paragraph("Health Recommendations", heading_style))
-        recommendations = []
-        
-        if prediction.prediction == 'Healthy':
-            recommendations = [
-                "✓ Maintain your current healthy lifestyle",
-                "✓ Continue regular exercise (150 minutes/week)",
-                "✓ Maintain balanced diet",
-                "✓ Get 7-9 hours of sleep",
-                "✓ Schedule annual check-ups"
-            ]
-        elif prediction.prediction == 'Diabetes':
-            recommendations = [
-                "• Consult an endocrinologist immediately",
-                "• Monitor blood glucose regularly",
-                "• Reduce refined carbohydrates",
-                "• Increase physical activity",
-                "• HbA1c testing every 3 months"
-            ]
-        elif prediction.prediction == 'Heart Di':
-            recommendations = [
-                "⚠ URGENT: Consult a cardiologist immediately",
-                "• Monitor blood pressure daily",
-                "• Reduce sodium intake",
-                "• Quit smoking",
-                "• Consider cardiac stress test"
-            ]
-        else:
-            recommendations = [
-                "• Consult a specialist for proper diagnosis",
-                "• Follow prescribed treatment plan",
-                "• Regular monitoring of key parameters",
-                "• Maintain healthy lifestyle",
-                "• Report any unusual symptoms"
-            ]
+        recommendations = chatbot.advisor.get_recommendations(prediction.prediction)
         
         for rec in recommendations:
             elements.append(Paragraph(rec, styles['Normal']))
@@ -1089,9 +1221,12 @@ def download_report_pdf(report_id):
         footer_text = "<i>This report is generated by MediGuard AI for informational purposes only. Please consult with a qualified healthcare professional for medical advice.</i>"
         elements.append(Paragraph(footer_text, styles['Italic']))
         
+        mark_stage('layout')
+        
         # Build PDF
         doc.build(elements)
         buffer.seek(0)
+        mark_stage('render')
         
         return send_file(
             buffer,
@@ -1101,17 +1236,16 @@ def download_report_pdf(report_id):
         )
         
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Request failed")
         return f"Error generating PDF: {str(e)}", 500
 
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
-        load_model_components()
-        if model is None:
-            print("⚠️  WARNING: Model files not found. Please run module_a_train_model.py first.")
+        if current_bundle() is None:
+            logger.warning("Model files not found. Please run module_a_train_model.py first.")
         else:
-            print("✓ All systems ready!")
+            logger.info("All systems ready")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -0,0 +1,5 @@
+"""
+Benchmarks
+Reproducible latency/throughput benchmarks for the inference and web paths.
+Run with `python -m benchmarks.run` from the repository root.
+"""
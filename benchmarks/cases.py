@@ -0,0 +1,124 @@
+"""
+Benchmark Cases
+Builds the benchmarked callables from the same components the web app loads.
+Every case is seeded so two runs on the same machine measure the same work.
+"""
+import numpy as np
+import pandas as pd
+
+from feature_engineering import add_derived
+
+BATCH_SIZES = (1, 8, 32, 256, 1024)
+
+PANEL = {
+    'Glucose': 95, 'Insulin': 10, 'HbA1c': 5.2, 'BMI': 23, 'Hemoglobin': 14.5, 'Platelets': 250000,
+    'White Blood Cells': 7000, 'Red Blood Cells': 5.0, 'Hematocrit': 45, 'Mean Corpuscular Volume': 90,
+    'Mean Corpuscular Hemoglobin': 30, 'Mean Corpuscular Hemoglobin Concentration': 34,
+    'Systolic Blood Pressure': 115, 'Diastolic Blood Pressure': 75, 'Heart Rate': 72, 'Cholesterol': 170,
+    'Triglycerides': 100, 'LDL Cholesterol': 100, 'HDL Cholesterol': 55, 'ALT': 25, 'AST': 25,
+    'Creatinine': 0.9, 'Troponin': 0.01, 'C-reactive Protein': 1.0
+}
+
+CHAT_MESSAGE = ("I'm a 54 year old male, my glucose is 182 mg/dL, HbA1c 7.9%, cholesterol 240 "
+                "and blood pressure 150/95. I feel thirsty and tired all the time.")
+
+BENCHMARK_USER = 'benchmark'
+BENCHMARK_PASSWORD = 'benchmark'
+
+
+def raw_panel(panel):
+    """Panel dict with the derived features added, as the web app computes them"""
+    raw = dict(panel)
+    add_derived(raw)
+    return raw
+
+
+def raw_matrix(feature_names, rows, seed=42):
+    """(rows, F) raw-unit matrix: PANEL with ±10% multiplicative noise per value"""
+    rng = np.random.default_rng(seed)
+    base = np.array([raw_panel(PANEL)[name] for name in feature_names], dtype=float)
+    return base * rng.normal(1.0, 0.1, size=(rows, len(feature_names)))
+
+
+def scaled_matrix(feature_names, rows, path='data/test_split.csv'):
+    """(rows, F) model-space matrix tiled from the stored test split"""
+    X = pd.read_csv(path)[feature_names].values
+    return np.resize(X, (rows, X.shape[1]))
+
+
+def _login(webapp):
+    """Test client logged in as the benchmark user (created if missing)"""
+    from werkzeug.security import generate_password_hash
+
+    with webapp.app.app_context():
+        if not webapp.User.query.filter_by(username=BENCHMARK_USER).first():
+            webapp.db.session.add(webapp.User(
+                username=BENCHMARK_USER, email='benchmark@localhost',
+                password_hash=generate_password_hash(BENCHMARK_PASSWORD, method='pbkdf2:sha256')))
+            webapp.db.session.commit()
+
+    client = webapp.app.test_client()
+    client.post('/login', data={'username': BENCHMARK_USER, 'password': BENCHMARK_PASSWORD})
+    return client
+
+
+def _checked(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.path} returned {response.status_code}")
+    return response
+
+
+def build_cases(webapp):
+    """
+    Build the benchmark cases.
+
+    Args:
+        webapp: The imported `app` module, after load_model_components()
+
+    Returns:
+        Tuple of (dict name -> (callable, items per call), dict name -> reason skipped)
+    """
+    bundle = webapp.current_bundle()
+    feature_names = bundle.feature_names
+    bridge = bundle.scaling_bridge
+    detector = bundle.anomaly_detector
+    nlp = webapp.chatbot.nlp
+
+    cases = {}
+    skipped = {}
+
+    panel = raw_panel(PANEL)
+    raw = raw_matrix(feature_names, max(BATCH_SIZES))
+    scaled = scaled_matrix(feature_names, max(BATCH_SIZES))
+
+    cases['scaling.single'] = (lambda: bridge.scale_to_array(panel, feature_names), 1)
+    cases['scaling.batch_1024'] = (lambda: bridge.scale_matrix(raw, feature_names), len(raw))
+    cases['features.build.single'] = (lambda: bundle.features.build_row(panel), 1)
+    cases['features.build.batch_1024'] = (lambda: bundle.features.build(raw, feature_names), len(raw))
+
+    for n in BATCH_SIZES:
+        X = scaled[:n]
+        cases[f'ensemble.predict_proba.batch_{n}'] = (lambda X=X: bundle.model.predict_proba(X), n)
+
+    if bundle.shap_explainer is not None:
+        row = scaled[:1]
+        cases['shap.explain.single'] = (lambda: bundle.shap_explainer(row), 1)
+    else:
+        skipped['shap.explain.single'] = 'SHAP explainer not loaded'
+
+    cases['nlp.extract'] = (lambda: (nlp.extract_clinical_values(CHAT_MESSAGE),
+                                     nlp.extract_symptoms(CHAT_MESSAGE),
+                                     nlp.extract_demographics(CHAT_MESSAGE)), 1)
+
+    cases['anomaly.single'] = (lambda: detector.detect_anomalies(panel), 1)
+    cases['anomaly.batch_1024'] = (lambda: detector.detect_matrix(raw, feature_names), len(raw))
+
+    client = _login(webapp)
+    payload = dict(PANEL, patient_id='BENCH-1')
+    prediction_id = _checked(client.post('/predict', json=payload)).get_json()['prediction_id']
+
+    cases['http.predict'] = (lambda: _checked(client.post('/predict', json=payload)), 1)
+    cases['http.chatbot'] = (lambda: _checked(client.post('/api/chatbot', json={'message': CHAT_MESSAGE})), 1)
+    cases['http.report_pdf'] = (lambda: _checked(client.get(f'/report/{prediction_id}/pdf')), 1)
+
+    return cases, skipped
@@ -0,0 +1,82 @@
+"""
+Benchmark Harness
+Timing, percentile and peak-RSS measurement plus baseline comparison.
+"""
+import gc
+import resource
+import sys
+import time
+
+import numpy as np
+
+PERCENTILES = (50, 90, 99)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure(fn, repeat=50, warmup=5, items=1):
+    """
+    Time repeated calls of `fn`.
+
+    Args:
+        fn: Zero-argument callable to benchmark
+        repeat: Number of timed calls
+        warmup: Untimed calls made first (caches, lazy imports, JIT-like warmups)
+        items: Rows/requests processed per call, for throughput
+
+    Returns:
+        Dict with latency percentiles (ms), mean, throughput (items/s) and peak RSS (MB)
+    """
+    for _ in range(warmup):
+        fn()
+
+    timings = np.empty(repeat)
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings[i] = time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    result = {f'p{p}_ms': float(np.percentile(timings, p) * 1000) for p in PERCENTILES}
+    result.update({
+        'mean_ms': float(timings.mean() * 1000),
+        'min_ms': float(timings.min() * 1000),
+        'repeat': repeat,
+        'items_per_call': items,
+        'throughput_per_s': float(items * repeat / timings.sum()),
+        'peak_rss_mb': round(peak_rss_mb(), 1)
+    })
+    return result
+
+
+def compare(results, baseline, tolerance=0.2, metric='p50_ms'):
+    """
+    Compare results against a baseline.
+
+    Args:
+        results: Dict of benchmark name -> measure() output
+        baseline: Same structure from a previous run
+        tolerance: Allowed relative slowdown before a benchmark counts as a regression
+        metric: Latency metric compared
+
+    Returns:
+        List of (name, baseline value, current value, relative change, regressed) tuples
+    """
+    rows = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference or metric not in current or metric not in reference:
+            continue
+        change = current[metric] / reference[metric] - 1 if reference[metric] else 0.0
+        rows.append((name, reference[metric], current[metric], change, change > tolerance))
+    return rows
@@ -0,0 +1,268 @@
+"""
+Load Test
+Drives a locally started MediGuard server with synthetic patients to measure the
+/predict and /api/chatbot requests per second one worker sustains. Uses only
+the standard library HTTP client and werkzeug's server; no external service.
+
+    python -m benchmarks.loadtest --concurrency 8 --duration 30
+    python -m benchmarks.loadtest --url http://127.0.0.1:5000 --users 4   # an already running server
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+from synthetic_generator import SyntheticGenerator
+
+CDF_PERCENTILES = (10, 25, 50, 75, 90, 95, 99, 99.9)
+
+# Displayed precision per raw feature, so synthetic panels look like lab reports
+_DECIMALS = {'Platelets': 0, 'White Blood Cells': 0, 'Glucose': 0, 'Cholesterol': 0, 'Triglycerides': 0,
+             'LDL Cholesterol': 0, 'HDL Cholesterol': 0, 'ALT': 0, 'AST': 0, 'Heart Rate': 0,
+             'Systolic Blood Pressure': 0, 'Diastolic Blood Pressure': 0, 'Troponin': 3}
+
+_SYMPTOMS = {
+    'Diabetes': "I'm always thirsty and urinating a lot",
+    'Anemia': "I feel tired and dizzy and look pale",
+    'Thalasse': "I am fatigued and my skin looks yellowish",
+    'Thromboc': "I bruise easily and my gums bleed",
+    'Heart Di': "I have chest pain and shortness of breath",
+    'Healthy': "I feel fine, just a routine check"
+}
+
+
+class PanelSynthesizer:
+    """
+    Generates raw-unit blood panels with SyntheticGenerator: disease-shaped panels
+    are drawn per class from the (0-1 scaled) training CSV's class distributions,
+    healthy panels uniformly from the physiological ranges.
+    """
+
+    def __init__(self, bridge, data_path, seed=42, label_column='Disease'):
+        df = pd.read_csv(data_path)
+        self.features = [c for c in df.columns if c != label_column and c in bridge.physiological_ranges]
+        self.generator = SyntheticGenerator(bridge, self.features, seed=seed).fit_classes(df, label_column)
+        self.decimals = [_DECIMALS.get(f, 1) for f in self.features]
+
+    def sample(self, n, healthy_fraction=0.2):
+        """
+        Draw n panels.
+
+        Returns:
+            Tuple of (list of panel dicts in raw units, array of source class labels)
+        """
+        healthy = self.generator.rng.random(n) < healthy_fraction
+        raw, labels = self.generator.sample_raw(n, mode='class_conditional')
+        raw[healthy], _ = self.generator.sample_raw(int(healthy.sum()), mode='uniform')
+        labels[healthy] = 'Healthy'
+
+        panels = [
+            {f: round(float(v), d) for f, v, d in zip(self.features, row, self.decimals)}
+            for row in raw
+        ]
+        return panels, labels
+
+
+def chat_message(panel, label):
+    """Free-text chatbot message describing a panel"""
+    return (f"My glucose is {panel['Glucose']:.0f} mg/dL, HbA1c {panel['HbA1c']}%, "
+            f"cholesterol {panel['Cholesterol']:.0f}, hemoglobin {panel['Hemoglobin']} and "
+            f"blood pressure {panel['Systolic Blood Pressure']:.0f}/{panel['Diastolic Blood Pressure']:.0f}. "
+            f"{_SYMPTOMS.get(label, '')}")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Session:
+    """One logged-in user: urllib opener with its own cookie jar"""
+
+    def __init__(self, base_url, username, password, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+        form = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+        try:
+            self.opener.open(self.base_url + '/login', form, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 302 and '/login' not in e.headers.get('Location', ''):
+                return  # Redirected away from the login page: logged in
+        raise RuntimeError(f"Login failed for '{username}'")
+
+    def post_json(self, path, payload):
+        """POST JSON; returns (status code, latency in seconds)"""
+        request = urllib.request.Request(self.base_url + path, json.dumps(payload).encode(),
+                                         {'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            status = 0
+        return status, time.perf_counter() - start
+
+
+def start_local_server(threaded=True):
+    """
+    Start the Flask app on an ephemeral local port (temporary database unless
+    MEDIGUARD_DATABASE_URI is set).
+
+    Returns:
+        Tuple of (base URL, werkzeug server, imported app module)
+    """
+    import logging
+    from werkzeug.serving import make_server
+    from benchmarks.run import load_webapp
+
+    webapp = load_webapp()
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # No access log line per request
+    server = make_server('127.0.0.1', 0, webapp.app, threaded=threaded)
+    threading.Thread(target=server.serve_forever, name='loadtest-server', daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server, webapp
+
+
+def create_users(webapp, count, password):
+    """Ensure load-test users exist; returns their usernames"""
+    from werkzeug.security import generate_password_hash
+
+    usernames = [f'loadtest_{i}' for i in range(count)]
+    with webapp.app.app_context():
+        password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        for username in usernames:
+            if not webapp.User.query.filter_by(username=username).first():
+                webapp.db.session.add(webapp.User(username=username, email=f'{username}@localhost',
+                                                  password_hash=password_hash))
+        webapp.db.session.commit()
+    return usernames
+
+
+def run_load(sessions, panels, labels, concurrency, duration, chatbot_fraction=0.3, seed=42):
+    """
+    Issue requests from `concurrency` threads for `duration` seconds.
+
+    Returns:
+        Tuple of (dict endpoint -> list of latencies, dict endpoint -> Counter of status codes, elapsed seconds)
+    """
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id):
+        rng = np.random.default_rng(seed + worker_id)
+        session = sessions[worker_id % len(sessions)]
+        local_latencies = defaultdict(list)
+        local_statuses = defaultdict(Counter)
+        while time.perf_counter() < deadline:
+            i = int(rng.integers(len(panels)))
+            if rng.random() < chatbot_fraction:
+                endpoint = '/api/chatbot'
+                status, latency = session.post_json(endpoint, {'message': chat_message(panels[i], labels[i])})
+            else:
+                endpoint = '/predict'
+                status, latency = session.post_json(endpoint, dict(panels[i], patient_id=f'LOAD-{i}'))
+            local_statuses[endpoint][status] += 1
+            if status == 200:
+                local_latencies[endpoint].append(latency)
+        with lock:
+            for endpoint, values in local_latencies.items():
+                latencies[endpoint].extend(values)
+            for endpoint, counts in local_statuses.items():
+                statuses[endpoint].update(counts)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, statuses, time.perf_counter() - started
+
+
+def summarize(latencies, statuses, elapsed):
+    """Per-endpoint throughput, error counts and latency CDF (ms at each percentile)"""
+    report = {}
+    for endpoint in sorted(statuses):
+        values = np.array(latencies.get(endpoint, []))
+        total = sum(statuses[endpoint].values())
+        report[endpoint] = {
+            'requests': total,
+            'ok': int(len(values)),
+            'status_counts': {str(code): count for code, count in sorted(statuses[endpoint].items())},
+            'throughput_per_s': len(values) / elapsed,
+            'cdf_ms': {f'p{p:g}': float(np.percentile(values, p) * 1000) for p in CDF_PERCENTILES} if len(values) else {},
+            'max_ms': float(values.max() * 1000) if len(values) else None
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test /predict and /api/chatbot with synthetic patients')
+    parser.add_argument('--url', help='Base URL of a running server (default: start one locally)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent client threads')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds of load')
+    parser.add_argument('--users', type=int, default=4, help='Distinct logged-in test users')
+    parser.add_argument('--password', default='loadtest', help='Password of the test users')
+    parser.add_argument('--chatbot-fraction', type=float, default=0.3, help='Share of requests sent to /api/chatbot')
+    parser.add_argument('--panels', type=int, default=2000, help='Synthetic panels generated up front')
+    parser.add_argument('--data', default='data/Blood_samples_dataset_balanced_2(f).csv', help='Training CSV for class shapes')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('-o', '--output', help='Write the JSON report here')
+    args = parser.parse_args()
+
+    from module_b_scaling_bridge import ScalingBridge
+
+    if args.url:
+        base_url, server = args.url, None
+        bridge = ScalingBridge.load('models/scaling_bridge.pkl')
+        usernames = [f'loadtest_{i}' for i in range(args.users)]  # Must already exist on that server
+    else:
+        base_url, server, webapp = start_local_server()
+        bridge = webapp.current_bundle().scaling_bridge
+        usernames = create_users(webapp, args.users, args.password)
+
+    panels, labels = PanelSynthesizer(bridge, args.data, seed=args.seed).sample(args.panels)
+    sessions = [Session(base_url, username, args.password) for username in usernames]
+
+    print("="*60)
+    print(f"LOAD TEST: {base_url}  concurrency={args.concurrency}  duration={args.duration:.0f}s")
+    print("="*60)
+    try:
+        latencies, statuses, elapsed = run_load(sessions, panels, labels, args.concurrency, args.duration,
+                                                args.chatbot_fraction, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report = summarize(latencies, statuses, elapsed)
+    for endpoint, r in report.items():
+        print(f"\n{endpoint}: {r['ok']}/{r['requests']} ok, {r['throughput_per_s']:.1f} req/s, statuses {r['status_counts']}")
+        for name, value in r['cdf_ms'].items():
+            print(f"  {name:>6}: {value:9.2f} ms")
+    print(f"\nTotal: {sum(r['ok'] for r in report.values()) / elapsed:.1f} successful req/s over {elapsed:.1f}s")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump({'settings': vars(args), 'elapsed_s': elapsed, 'endpoints': report}, f, indent=2)
+        print(f"✓ Report saved to '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
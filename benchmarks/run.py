@@ -0,0 +1,143 @@
+"""
+Benchmark Runner
+Runs the benchmark cases, writes JSON results and flags regressions against a
+stored baseline.
+
+    python -m benchmarks.run                      # run and compare with benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline      # run and store the results as the new baseline
+    python -m benchmarks.run --only ensemble      # cases whose name contains 'ensemble'
+
+Requests go to a throwaway SQLite database unless MEDIGUARD_DATABASE_URI is set.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import warnings
+from datetime import datetime
+
+from benchmarks.harness import compare, measure
+
+DEFAULT_BASELINE = 'benchmarks/baseline.json'
+DEFAULT_RESULTS_DIR = 'benchmarks/results'
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def environment_info():
+    """Versions and model checksum recorded with each result file"""
+    import numpy
+    import sklearn
+    import xgboost
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': numpy.__version__,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost.__version__,
+        'model_sha256': _file_sha256('models/best_model.pkl') if os.path.exists('models/best_model.pkl') else None
+    }
+
+
+def load_webapp():
+    """Import the Flask app against a temporary database and load its models"""
+    if 'MEDIGUARD_DATABASE_URI' not in os.environ:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='mediguard-bench-'), 'bench.db')
+        os.environ['MEDIGUARD_DATABASE_URI'] = f'sqlite:///{db_path}'
+
+    import logging
+    import app as webapp
+    from structured_logging import ROOT_LOGGER
+
+    logging.getLogger(ROOT_LOGGER).setLevel(logging.WARNING)
+    with webapp.app.app_context():
+        webapp.db.create_all()
+        webapp.load_model_components()
+    if webapp.current_bundle() is None:
+        raise SystemExit("Model files not found. Please run module_a_train_model.py first.")
+    return webapp
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MediGuard inference and web path benchmarks')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed calls per case')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed calls per case')
+    parser.add_argument('--only', action='append', default=[], help='Run only cases whose name contains this text')
+    parser.add_argument('-o', '--output', help='Results JSON (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative p50 slowdown')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    webapp = load_webapp()
+    from benchmarks.cases import build_cases
+
+    cases, skipped = build_cases(webapp)
+    if args.only:
+        cases = {name: case for name, case in cases.items() if any(part in name for part in args.only)}
+
+    print("="*60)
+    print("MEDIGUARD BENCHMARKS")
+    print("="*60)
+    print(f"{'case':<36}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'items/s':>11}{'RSS MB':>8}")
+
+    results = {}
+    for name, (fn, items) in cases.items():
+        results[name] = r = measure(fn, repeat=args.repeat, warmup=args.warmup, items=items)
+        print(f"{name:<36}{r['p50_ms']:>9.3f}{r['p90_ms']:>9.3f}{r['p99_ms']:>9.3f}"
+              f"{r['throughput_per_s']:>11.1f}{r['peak_rss_mb']:>8.1f}")
+    for name, reason in skipped.items():
+        print(f"⚠️  Skipped {name}: {reason}")
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'settings': {'repeat': args.repeat, 'warmup': args.warmup},
+        'results': results,
+        'skipped': skipped
+    }
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results saved to '{output}'")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['environment'].get('model_sha256') != report['environment']['model_sha256']:
+            print("⚠️  Baseline was recorded with a different model file")
+        print(f"\nComparison with '{args.baseline}' (p50, tolerance {args.tolerance:.0%}):")
+        for name, before, after, change, regressed in compare(results, baseline['results'], args.tolerance):
+            marker = '⚠️ REGRESSION' if regressed else ''
+            print(f"  {name:<36}{before:>9.3f} -> {after:>9.3f} ms ({change:+.1%}) {marker}")
+            if regressed:
+                regressions.append(name)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Baseline saved to '{args.baseline}'")
+
+    if regressions:
+        print(f"\n⚠️  {len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Bulk Triage
+Scores large files of free-text patient messages in chunks: NLP extraction runs in a
+multiprocessing pool, missing values are imputed in bulk and each chunk is scored
+with a single batched ensemble call.
+
+Usage:
+    python bulk_triage.py messages.jsonl -o results.jsonl
+"""
+import argparse
+import atexit
+import json
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+from medical_nlp import MedicalNLPExtractor
+
+# Per-process extractor, built once (by the pool initializer or on first use)
+_extractor = None
+
+
+def _init_worker():
+    global _extractor
+    _extractor = MedicalNLPExtractor()
+
+
+def _extract(message, extractor=None):
+    """Run the NLP extractor over one message (pool workers use the per-process extractor)"""
+    global _extractor
+    if extractor is None:
+        if _extractor is None:
+            _extractor = MedicalNLPExtractor()
+        extractor = _extractor
+    return (
+        extractor.extract_clinical_values(message),
+        extractor.extract_symptoms(message),
+        extractor.extract_demographics(message)
+    )
+
+
+def read_jsonl(lines, max_lines=None):
+    """
+    Parse JSONL message records.
+    Each line is an object with a 'message' (or 'text') field and an optional 'id'.
+    A line that cannot be parsed yields {'id': line_no, 'error': ...} and parsing
+    continues, so one bad line never cuts off a streamed response.
+
+    Args:
+        lines: Iterable of str or bytes lines (a file or request stream is read lazily)
+        max_lines: Stop after this many lines with a final error record (None = no limit)
+    """
+    for line_no, line in enumerate(lines, 1):
+        if max_lines is not None and line_no > max_lines:
+            yield {'id': line_no, 'error': f'Line limit of {max_lines} exceeded; the rest of the input was ignored'}
+            return
+        try:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+        except (UnicodeDecodeError, ValueError) as e:
+            yield {'id': line_no, 'error': f'Invalid JSON: {e}'}
+            continue
+        if isinstance(record, str):
+            record = {'message': record}
+        if not isinstance(record, dict):
+            yield {'id': line_no, 'error': f'Expected an object or a string, got {type(record).__name__}'}
+            continue
+        record.setdefault('id', line_no)
+        yield record
+
+
+class BulkTriage:
+    """
+    Batch counterpart of MedicalChatbot.process_message for intake queues.
+    Reuses the chatbot's loaded model, scaler, symptom mapper, estimator and clinical rules.
+    """
+
+    def __init__(self, chatbot, chunk_size=256, processes=None):
+        """
+        Initialize Bulk Triage
+
+        Args:
+            chatbot: Loaded MedicalChatbot
+            chunk_size: Messages per extraction/scoring chunk
+            processes: NLP worker processes (None = CPU count, 0 = extract in-process).
+                Workers are spawned, not forked, so they are safe to start from a
+                threaded server; the pool is closed at exit.
+        """
+        self.chatbot = chatbot
+        self.chunk_size = chunk_size
+        self.processes = processes
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None and self.processes != 0:
+            # Forking a process that runs scheduler/logging/watcher threads can copy held locks
+            context = multiprocessing.get_context('spawn')
+            self._pool = context.Pool(self.processes, initializer=_init_worker)
+            atexit.register(self.close)
+        return self._pool
+
+    def _extract_chunk(self, messages):
+        pool = self._get_pool()
+        if pool is None:
+            extractor = self.chatbot.nlp  # In-process: reuse the chatbot's extractor
+            return [_extract(m, extractor) for m in messages]
+        workers = self.processes or os.cpu_count() or 1
+        return pool.map(_extract, messages, chunksize=max(1, len(messages) // (workers * 4)))
+
+    def _score_chunk(self, records):
+        chatbot = self.chatbot
+        bundle = chatbot.bundle  # One model version for the whole chunk
+        messages = [str(r.get('message', r.get('text', ''))) for r in records]
+        extracted = self._extract_chunk(messages)
+
+        values_list = [values for values, _, _ in extracted]
+        implied_list = [chatbot.mapper.get_implied_parameters(symptoms) for _, symptoms, _ in extracted]
+        demographics_list = [demographics for _, _, demographics in extracted]
+
+        # Impute the whole chunk at once
+        raw, base_features = chatbot.estimator.estimate_missing_matrix(values_list, implied_list, demographics_list)
+
+        # Model-order matrix with the derived features (same code as prepare_data)
+        raw_ordered = bundle.features.build(raw, base_features)
+
+        # Critical-value screening over the whole chunk
+        screening = bundle.anomaly_detector.detect_matrix(raw_ordered)
+        quality_issues, _ = bundle.scaling_bridge.data_quality_masks(raw_ordered, bundle.feature_names)
+
+        # One scaling pass and one ensemble call per chunk (through the shared scheduler if any)
+        scaled = bundle.scaling_bridge.scale_matrix(raw_ordered, bundle.feature_names)
+        if chatbot.scheduler is not None:
+            future = chatbot.scheduler.submit(scaled, bundle.model, bundle.version)
+            proba, scoring_model = future.result(), future.model
+        else:
+            proba, scoring_model = bundle.model.predict_proba(scaled), bundle.model
+        predictions = bundle.label_encoder.inverse_transform(scoring_model.classes_[np.argmax(proba, axis=1)])
+        confidence = proba.max(axis=1) * 100
+
+        # Cardiac override (same compiled rules as /predict and the chatbot)
+        _, override, override_confidence = bundle.rules_engine.cardiac_assessment(raw_ordered, predictions)
+        predictions = np.where(override, 'Heart Di', predictions)
+        confidence = np.where(override, override_confidence, confidence)
+
+        for i, record in enumerate(records):
+            yield {
+                'id': record['id'],
+                'prediction': str(predictions[i]),
+                'confidence': round(float(confidence[i]), 2),
+                'cardiac_override': bool(override[i]),
+                'anomaly_risk': str(screening.risk_levels[i]),
+                'anomalies': [a['message'] for a in screening.anomalies(i)] if screening.counts[i] else [],
+                'data_quality_issues': [bundle.feature_names[j] for j in np.flatnonzero(quality_issues[i])],
+                'extracted_values': values_list[i],
+                'symptoms': extracted[i][1],
+                'demographics': demographics_list[i],
+                'model_version': bundle.version
+            }
+
+    def triage(self, records):
+        """
+        Score an iterable of message records chunk by chunk.
+
+        Yields:
+            Result dicts with prediction, confidence and extracted values
+            (records with an 'error' are passed through in input order)
+        """
+        if not self.chatbot.model_loaded:
+            raise RuntimeError("Chatbot models are not loaded")
+
+        chunk = []
+        for record in records:
+            if 'error' in record and 'message' not in record and 'text' not in record:
+                if chunk:
+                    yield from self._score_chunk(chunk)
+                    chunk = []
+                yield record
+                continue
+            chunk.append(record)
+            if len(chunk) >= self.chunk_size:
+                yield from self._score_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield from self._score_chunk(chunk)
+
+    def triage_jsonl(self, lines, max_lines=None):
+        """Score JSONL input lines and yield JSONL output lines (see read_jsonl for max_lines)"""
+        for result in self.triage(read_jsonl(lines, max_lines)):
+            yield json.dumps(result) + '\n'
+
+    def close(self):
+        """Shut down the extraction pool"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+def main():
+    """Command-line bulk triage"""
+    from chatbot_engine import MedicalChatbot
+
+    parser = argparse.ArgumentParser(description='Bulk triage of patient messages (JSONL in, JSONL out)')
+    parser.add_argument('input', help="JSONL file with one {'id': ..., 'message': ...} object per line")
+    parser.add_argument('-o', '--output', help='Output JSONL file (default: stdout)')
+    parser.add_argument('--chunk-size', type=int, default=256, help='Messages per scoring chunk')
+    parser.add_argument('--processes', type=int, default=None, help='NLP worker processes (0 = no pool)')
+    args = parser.parse_args()
+
+    triage = BulkTriage(MedicalChatbot(), chunk_size=args.chunk_size, processes=args.processes)
+    out = open(args.output, 'w') if args.output else sys.stdout
+    count = 0
+    try:
+        with open(args.input) as f:
+            for line in triage.triage_jsonl(f):
+                out.write(line)
+                count += 1
+    finally:
+        triage.close()
+        if args.output:
+            out.close()
+
+    if args.output:
+        print(f"✓ Triaged {count} messages -> '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,29 +10,92 @@ from symptom_mapper import SymptomMapper
 from param_estimator import ParameterEstimator
 from prevention_advisor import PreventionAdvisor
 from module_b_scaling_bridge import ScalingBridge
+from model_registry import ModelBundle, LEGACY_VERSION
+from structured_logging import get_logger
+
+logger = get_logger('chatbot')
 
 class MedicalChatbot:
     def __init__(self, model_path='models/best_model.pkl', 
                  scaler_path='models/scaling_bridge.pkl',
                  label_encoder_path='models/label_encoder.pkl',
-                 feature_names_path='models/feature_names.pkl'):
+                 feature_names_path='models/feature_names.pkl',
+                 scheduler=None):
+        
+        # Optional InferenceScheduler shared with the web app; when set, model
+        # calls are micro-batched with concurrent /predict requests
+        self.scheduler = scheduler
         
         # Initialize components
         self.nlp = MedicalNLPExtractor()
         self.mapper = SymptomMapper()
         self.estimator = ParameterEstimator()
         self.advisor = PreventionAdvisor()
+        self.bundle = None  # ModelBundle serving the chatbot (swapped as one reference)
         
         # Load ML models
         try:
-            self.model = joblib.load(model_path)
-            self.scaling_bridge = ScalingBridge.load(scaler_path)
-            self.label_encoder = joblib.load(label_encoder_path)
-            self.feature_names = joblib.load(feature_names_path)
-            self.model_loaded = True
+            self.use_bundle(ModelBundle(
+                version=LEGACY_VERSION,
+                model=joblib.load(model_path),
+                label_encoder=joblib.load(label_encoder_path),
+                feature_names=joblib.load(feature_names_path),
+                scaling_bridge=ScalingBridge.load(scaler_path)
+            ).compile())
         except Exception as e:
-            print(f"Error loading models: {e}")
-            self.model_loaded = False
+            logger.error("Error loading models: %s", e)
+
+    def use_bundle(self, bundle):
+        """Serve with a compiled ModelBundle (the web app passes the registry's current one)"""
+        previous = self.bundle
+        if previous is None or list(previous.label_encoder.classes_) != list(bundle.label_encoder.classes_):
+            self.advisor.compile(bundle.label_encoder.classes_)
+        self.bundle = bundle
+
+    @property
+    def model_loaded(self):
+        return self.bundle is not None
+
+    # Components of the current bundle (read self.bundle once when several are needed together)
+    @property
+    def model(self):
+        return self.bundle.model
+
+    @property
+    def label_encoder(self):
+        return self.bundle.label_encoder
+
+    @property
+    def scaling_bridge(self):
+        return self.bundle.scaling_bridge
+
+    @property
+    def feature_names(self):
+        return self.bundle.feature_names
+
+    @property
+    def features(self):
+        return self.bundle.features
+
+    @property
+    def rules_engine(self):
+        return self.bundle.rules_engine
+
+    @property
+    def anomaly_detector(self):
+        return self.bundle.anomaly_detector
+
+    def _predict_proba(self, bundle, scaled_features):
+        """
+        Class probabilities for one scaled feature row, scored by `bundle`'s model.
+
+        Returns:
+            Tuple of (probabilities, model that produced them)
+        """
+        if self.scheduler is not None:
+            future = self.scheduler.submit(scaled_features, bundle.model, bundle.version)
+            return future.result(), future.model
+        return bundle.model.predict_proba(scaled_features.reshape(1, -1))[0], bundle.model
 
     def process_message(self, user_input, session_context=None):
         """
@@ -61,11 +124,13 @@ class MedicalChatbot:
         current_symptoms.extend([s for s in symptoms if s not in current_symptoms])
         
         # Debug logging
-        print(f"DEBUG: User Input: {user_input}")
-        print(f"DEBUG: Extracted Values: {extracted_values}")
-        print(f"DEBUG: Extracted Symptoms: {symptoms}")
-        print(f"DEBUG: Current Context Values: {current_values}")
-        print(f"DEBUG: Current Context Symptoms: {current_symptoms}")
+        logger.debug("Chatbot message parsed", extra={'fields': {
+            'user_input': user_input,
+            'extracted_values': extracted_values,
+            'extracted_symptoms': symptoms,
+            'context_values': current_values,
+            'context_symptoms': current_symptoms
+        }})
         
         # 2. Determine if we have enough info to predict
         # Relaxed threshold: Predict if we have ANY meaningful input (1 value or 1 symptom)
@@ -90,8 +155,9 @@ class MedicalChatbot:
             )
             return response
             
-        # 3. Prepare for prediction
-        if not self.model_loaded:
+        # 3. Prepare for prediction (one model version for the whole message)
+        bundle = self.bundle
+        if bundle is None:
             response['text'] = "I'm sorry, but my medical knowledge base is currently unavailable. Please try again later."
             return response
             
@@ -103,72 +169,60 @@ class MedicalChatbot:
             current_values, implied_params, demographics
         )
         
-        # Calculate derived features (same as in app.py)
-        epsilon = 1e-6
-        full_features['LDL_HDL_Ratio'] = full_features['LDL Cholesterol'] / (full_features['HDL Cholesterol'] + epsilon)
-        full_features['Chol_HDL_Ratio'] = full_features['Cholesterol'] / (full_features['HDL Cholesterol'] + epsilon)
-        full_features['Glucose_Insulin_Interaction'] = full_features['Glucose'] * full_features['Insulin']
-        full_features['MAP'] = full_features['Diastolic Blood Pressure'] + (1/3 * (full_features['Systolic Blood Pressure'] - full_features['Diastolic Blood Pressure']))
+        # Model-order raw row with the derived features (same code as training and /predict)
+        raw_row = bundle.features.build_row(full_features)
         
         # 4. Make Prediction
         try:
             # Scale features
-            scaled_features = self.scaling_bridge.scale_to_array(full_features, self.feature_names)
+            scaled_features = bundle.scaling_bridge.scale_matrix(raw_row, bundle.feature_names)[0]
             
-            # Predict
-            prediction_idx = self.model.predict(scaled_features.reshape(1, -1))[0]
-            prediction = self.label_encoder.inverse_transform([prediction_idx])[0]
-            probabilities = self.model.predict_proba(scaled_features.reshape(1, -1))[0]
+            # Predict (decoded with the classes of the model that scored the row)
+            probabilities, scoring_model = self._predict_proba(bundle, scaled_features)
+            prediction_idx = scoring_model.classes_[np.argmax(probabilities)]
+            prediction = bundle.label_encoder.inverse_transform([prediction_idx])[0]
             confidence = max(probabilities) * 100
             
             # --- CARDIAC OVERRIDE CHECK (Safety) ---
-            cardiac_risk_score = 0
-            if full_features.get('Troponin', 0) > 0.04: cardiac_risk_score += 40
-            if full_features.get('C-reactive Protein', 0) > 3.0: cardiac_risk_score += 20
-            if full_features.get('LDL Cholesterol', 0) > 160: cardiac_risk_score += 15
-            if full_features.get('Systolic Blood Pressure', 0) > 140: cardiac_risk_score += 15
-            
-            if cardiac_risk_score >= 60 and prediction != 'Heart Di':
+            cardiac, override, override_confidence = bundle.rules_engine.cardiac_assessment(
+                raw_row, [prediction])
+            if override[0]:
                 prediction = 'Heart Di'
-                confidence = 95.0
+                confidence = float(override_confidence[0])
                 response['cardiac_override'] = True
+                response['cardiac_indicators'] = cardiac.indicators(0, full_features)
             # ---------------------------------------
             
-            # Get advice
+            # Get advice (pre-rendered fragments, resolved through the label index)
             advice = self.advisor.get_advice(prediction)
+            compiled = self.advisor.get_compiled(prediction)
             
             # Construct response text
             symptom_str = ", ".join(current_symptoms) if current_symptoms else "reported symptoms"
             
-            response_text = f"Based on your {symptom_str} and the clinical values provided (or estimated), "
-            response_text += f"my assessment points to **{prediction}** (Confidence: {confidence:.1f}%).\n\n"
-            
-            response_text += f"**Analysis:**\n{advice['description']}\n\n"
-            
-            response_text += "**Key Indicators:**\n"
+            parts = [
+                f"Based on your {symptom_str} and the clinical values provided (or estimated), ",
+                f"my assessment points to **{prediction}** (Confidence: {confidence:.1f}%).\n\n",
+                compiled['analysis'],
+                "**Key Indicators:**\n"
+            ]
             # List abnormal values
-            for param, val in current_values.items():
-                response_text += f"- {param}: {val}\n"
+            parts.extend(f"- {param}: {val}\n" for param, val in current_values.items())
             if implied_params:
-                response_text += f"- (Inferred from symptoms: {', '.join(implied_params.keys())})\n"
-                
-            response_text += "\n**Recommended Actions:**\n"
-            for action in advice['immediate_actions']:
-                response_text += f"- {action}\n"
-                
-            response_text += "\n**Prevention & Lifestyle:**\n"
-            for tip in advice['lifestyle']:
-                response_text += f"- {tip}\n"
+                parts.append(f"- (Inferred from symptoms: {', '.join(implied_params.keys())})\n")
+            parts.append(compiled['actions'])
+            response_text = "".join(parts)
                 
             response['text'] = response_text
             response['prediction'] = {
                 'disease': prediction,
                 'confidence': confidence,
-                'advice': advice
+                'advice': advice,
+                'model_version': bundle.version
             }
             
         except Exception as e:
-            print(f"Prediction error: {e}")
+            logger.exception("Prediction error: %s", e)
             response['text'] = "I encountered an error while analyzing your data. Please ensure you've provided valid clinical values."
             
         return response
@@ -0,0 +1,166 @@
+"""
+Chatbot Service
+Asyncio front-end for the MedicalChatbot that runs the CPU-bound pipeline
+(NLP, imputation, model inference, response rendering) on a bounded thread pool.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+
+class ChatbotBusyError(Exception):
+    """Raised when the service already has the maximum number of pending messages"""
+
+
+class ChatbotTimeoutError(Exception):
+    """Raised when a message is not processed within the per-request timeout"""
+
+
+class ChatbotService:
+    """
+    Runs MedicalChatbot.process_message on a bounded executor.
+
+    Backpressure: at most `max_pending` messages may be queued or running at once;
+    further messages are rejected immediately with ChatbotBusyError instead of
+    piling up behind a slow prediction.
+    """
+
+    def __init__(self, chatbot, max_workers=4, max_pending=16, timeout=10.0):
+        """
+        Initialize Chatbot Service
+
+        Args:
+            chatbot: MedicalChatbot instance used to process messages
+            max_workers: Number of threads running the chatbot pipeline
+            max_pending: Maximum number of queued + running messages
+            timeout: Seconds to wait for a single message before giving up
+        """
+        self.chatbot = chatbot
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='chatbot')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def _submit(self, user_input, session_context):
+        """Reserve a slot and submit the message to the executor"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ChatbotBusyError(
+                    f"Chatbot is busy ({self.max_pending} messages pending). Please retry shortly."
+                )
+            self._pending += 1
+        try:
+            future = self._executor.submit(self.chatbot.process_message, user_input, session_context)
+        except Exception:
+            self._release()
+            raise
+        # The slot is held until the work actually finishes, even if the caller timed out,
+        # so abandoned requests still count against the backpressure limit.
+        future.add_done_callback(self._release)
+        return future
+
+    async def process_message(self, user_input, session_context=None, timeout=None):
+        """
+        Process a message without blocking the event loop.
+
+        Args:
+            user_input (str): The user's natural language message
+            session_context (dict): Previous context (optional)
+            timeout (float): Override the service timeout for this request
+
+        Returns:
+            dict: Response from MedicalChatbot.process_message
+        """
+        timeout = self.timeout if timeout is None else timeout
+        future = self._submit(user_input, session_context)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            raise ChatbotTimeoutError(f"Chatbot did not respond within {timeout:.1f}s")
+
+    def process_message_sync(self, user_input, session_context=None, timeout=None):
+        """Blocking variant for callers that are not running an event loop"""
+        timeout = self.timeout if timeout is None else timeout
+        future = self._submit(user_input, session_context)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise ChatbotTimeoutError(f"Chatbot did not respond within {timeout:.1f}s")
+
+    def stats(self):
+        """Current load of the service"""
+        return {
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': self._pending,
+        }
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and shut the executor down"""
+        self._executor.shutdown(wait=wait)
+
+
+def load_test(n_sessions=32, service=None):
+    """
+    Compare concurrent chat sessions handled by one worker before (serial
+    process_message calls) and after (ChatbotService on the event loop).
+    """
+    from chatbot_engine import MedicalChatbot
+
+    if service is None:
+        service = ChatbotService(MedicalChatbot(), max_workers=4, max_pending=n_sessions)
+    chatbot = service.chatbot
+
+    messages = [
+        "My glucose is 210 and I am always thirsty",
+        "I have chest pain and my troponin is 0.08",
+        "I feel tired and pale, hemoglobin 9.5",
+        "platelets 90000, bruising easily",
+    ]
+
+    print(f"Load test: {n_sessions} concurrent chat sessions")
+
+    # Before: a synchronous worker handles one session at a time
+    start = time.perf_counter()
+    for i in range(n_sessions):
+        chatbot.process_message(messages[i % len(messages)], {})
+    serial_elapsed = time.perf_counter() - start
+
+    # After: sessions are awaited concurrently, model calls run on the pool
+    async def run_concurrent():
+        tasks = [service.process_message(messages[i % len(messages)], {})
+                 for i in range(n_sessions)]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    start = time.perf_counter()
+    results = asyncio.run(run_concurrent())
+    async_elapsed = time.perf_counter() - start
+    failures = sum(1 for r in results if isinstance(r, Exception))
+
+    print(f"  Synchronous worker: {serial_elapsed:.3f}s "
+          f"({n_sessions / serial_elapsed:.1f} sessions/s, 1 in flight)")
+    print(f"  ChatbotService:     {async_elapsed:.3f}s "
+          f"({n_sessions / async_elapsed:.1f} sessions/s, up to {service.max_workers} in flight)")
+    if failures:
+        print(f"  ⚠️  {failures} sessions rejected or timed out")
+
+    service.shutdown()
+    return {
+        'sessions': n_sessions,
+        'serial_seconds': serial_elapsed,
+        'async_seconds': async_elapsed,
+        'failures': failures,
+    }
+
+
+if __name__ == "__main__":
+    load_test()
@@ -0,0 +1,244 @@
+"""
+Clinical Rules Engine
+Declarative clinical rules (cardiac override, critical-value anomalies) compiled
+into numpy expressions and evaluated over whole batches.
+Every entry point (/predict, the chatbot, bulk triage) evaluates the same rules.
+"""
+import operator
+import threading
+
+import numpy as np
+
+# Each rule names its feature, comparison, threshold and score contribution.
+#   score:           points added when the rule fires
+#   scale_by_value:  score is (value / threshold) * score, capped at max_score
+#   any:             several (feature, op, threshold) conditions, rule fires if any holds
+#   indicator:       human-readable text, formatted with the row's raw values
+CARDIAC_RULES = [
+    {'name': 'elevated_troponin', 'feature': 'Troponin', 'op': '>', 'threshold': 0.04,
+     'score': 20, 'scale_by_value': True, 'max_score': 40,
+     'indicator': 'Elevated Troponin ({Troponin:.3f} ng/mL, normal <0.04)'},
+    {'name': 'high_crp', 'feature': 'C-reactive Protein', 'op': '>', 'threshold': 3.0,
+     'score': 10, 'scale_by_value': True, 'max_score': 20,
+     'indicator': 'High CRP ({C-reactive Protein:.1f} mg/L, normal <3.0)'},
+    {'name': 'high_ldl', 'feature': 'LDL Cholesterol', 'op': '>', 'threshold': 160,
+     'score': 15, 'indicator': 'High LDL ({LDL Cholesterol:.0f} mg/dL)'},
+    {'name': 'low_hdl', 'feature': 'HDL Cholesterol', 'op': '<', 'threshold': 40,
+     'score': 10, 'indicator': 'Low HDL ({HDL Cholesterol:.0f} mg/dL)'},
+    {'name': 'hypertension',
+     'any': [('Systolic Blood Pressure', '>', 140), ('Diastolic Blood Pressure', '>', 90)],
+     'score': 15,
+     'indicator': 'Hypertension ({Systolic Blood Pressure:.0f}/{Diastolic Blood Pressure:.0f} mmHg)'},
+    {'name': 'high_triglycerides', 'feature': 'Triglycerides', 'op': '>', 'threshold': 200,
+     'score': 10, 'indicator': 'High Triglycerides ({Triglycerides:.0f} mg/dL)'},
+]
+
+# Cardiac risk score at which the prediction is overridden to Heart Disease
+CARDIAC_OVERRIDE_THRESHOLD = 60
+CARDIAC_LABEL = 'Heart Di'
+
+OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+}
+
+
+def anomaly_rules(critical_high, critical_low):
+    """Rule specs for AnomalyDetector's critical thresholds (high rules first)"""
+    rules = []
+    for feature, threshold in critical_high.items():
+        rules.append({'name': f'critical_high:{feature}', 'feature': feature, 'op': '>=',
+                      'threshold': threshold, 'score': 1})
+    for feature, threshold in critical_low.items():
+        rules.append({'name': f'critical_low:{feature}', 'feature': feature, 'op': '<=',
+                      'threshold': threshold, 'score': 1})
+    return rules
+
+
+class CompiledRuleSet:
+    """
+    A rule set flattened into condition arrays:
+    one column per (feature, op, threshold) condition and a 0/1 matrix mapping
+    conditions to rules, so a batch is evaluated with a handful of array ops.
+    """
+
+    def __init__(self, name, rules, feature_index):
+        self.name = name
+        self.rules = []
+
+        cond_features, cond_ops, cond_thresholds, cond_rules = [], [], [], []
+        for rule in rules:
+            conditions = rule.get('any') or [(rule['feature'], rule['op'], rule['threshold'])]
+            conditions = [c for c in conditions if c[0] in feature_index]
+            if not conditions:
+                continue  # Feature not part of this model's inputs
+            for feature, op, threshold in conditions:
+                if op not in OPERATORS:
+                    raise ValueError(f"Unknown operator '{op}' in rule {rule['name']}")
+                cond_features.append(feature_index[feature])
+                cond_ops.append(op)
+                cond_thresholds.append(threshold)
+                cond_rules.append(len(self.rules))
+            self.rules.append(rule)
+
+        n_rules = len(self.rules)
+        self.names = [rule['name'] for rule in self.rules]
+        self.cond_features = np.array(cond_features, dtype=int)
+        self.cond_thresholds = np.array(cond_thresholds, dtype=float)
+        self.membership = np.zeros((len(cond_features), n_rules), dtype=np.int32)
+        self.membership[np.arange(len(cond_rules)), cond_rules] = 1
+        # Group condition columns by operator: one vectorized comparison per operator
+        self.op_groups = [
+            (OPERATORS[op], np.array([i for i, o in enumerate(cond_ops) if o == op]))
+            for op in sorted(set(cond_ops))
+        ]
+
+        # Score model per rule (value-scaled rules use their first condition)
+        first_cond = {}
+        for i, r in enumerate(cond_rules):
+            first_cond.setdefault(r, i)
+        self.base_scores = np.array([rule.get('score', 0) for rule in self.rules], dtype=float)
+        self.scaled = np.array([bool(rule.get('scale_by_value')) for rule in self.rules])
+        self.max_scores = np.array([rule.get('max_score', np.inf) for rule in self.rules], dtype=float)
+        self.score_features = np.array([cond_features[first_cond[r]] for r in range(n_rules)], dtype=int)
+        self.score_thresholds = np.array([cond_thresholds[first_cond[r]] for r in range(n_rules)], dtype=float)
+
+    def evaluate(self, X):
+        """
+        Args:
+            X: Array of shape (n_samples, n_features) with raw values (NaN never fires)
+
+        Returns:
+            Tuple of (hits (n_samples, n_rules) bool, scores (n_samples, n_rules) float)
+        """
+        values = X[:, self.cond_features]
+        cond_hits = np.zeros(values.shape, dtype=bool)
+        for compare, cols in self.op_groups:
+            cond_hits[:, cols] = compare(values[:, cols], self.cond_thresholds[cols])
+
+        hits = (cond_hits.astype(np.int32) @ self.membership) > 0
+
+        scores = np.broadcast_to(self.base_scores, hits.shape)
+        if self.scaled.any():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratio = X[:, self.score_features] / self.score_thresholds
+            scaled_scores = np.minimum(self.max_scores, ratio * self.base_scores)
+            scores = np.where(self.scaled, scaled_scores, scores)
+        scores = np.where(hits, scores, 0.0)
+        return hits, scores
+
+
+class RuleSetResult:
+    """Per-row outcome of one rule set over a batch"""
+
+    def __init__(self, rule_set, X, hits, scores):
+        self.rule_set = rule_set
+        self.X = X
+        self.hits = hits
+        self.scores = scores
+        self.total = scores.sum(axis=1)
+
+    def fired(self, row):
+        """Names of the rules that fired for one row"""
+        return [self.rule_set.names[j] for j in np.flatnonzero(self.hits[row])]
+
+    def indicators(self, row, raw_values):
+        """Formatted indicator texts of the rules that fired for one row"""
+        return [
+            self.rule_set.rules[j]['indicator'].format_map(raw_values)
+            for j in np.flatnonzero(self.hits[row])
+            if 'indicator' in self.rule_set.rules[j]
+        ]
+
+
+class ClinicalRulesEngine:
+    """
+    Holds compiled rule sets for one feature order and per-rule evaluation counters.
+    """
+
+    def __init__(self, feature_names):
+        self.feature_names = list(feature_names)
+        self.feature_index = {f: i for i, f in enumerate(self.feature_names)}
+        self.rule_sets = {}
+        self._evaluations = {}
+        self._hits = {}
+        self._lock = threading.Lock()
+
+    def add_rule_set(self, name, rules):
+        """Compile and register a list of rule specs under `name`"""
+        compiled = CompiledRuleSet(name, rules, self.feature_index)
+        self.rule_sets[name] = compiled
+        with self._lock:
+            self._evaluations[name] = np.zeros(len(compiled.rules), dtype=np.int64)
+            self._hits[name] = np.zeros(len(compiled.rules), dtype=np.int64)
+        return compiled
+
+    def to_matrix(self, raw_features):
+        """One-row matrix from a raw feature dict (missing features become NaN)"""
+        return np.array([[raw_features.get(f, np.nan) for f in self.feature_names]], dtype=float)
+
+    def evaluate(self, name, X):
+        """
+        Evaluate rule set `name` over a batch.
+
+        Args:
+            X: Array (n_samples, n_features) in engine feature order, or a raw feature dict
+
+        Returns:
+            RuleSetResult
+        """
+        if isinstance(X, dict):
+            X = self.to_matrix(X)
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        rule_set = self.rule_sets[name]
+        hits, scores = rule_set.evaluate(X)
+
+        with self._lock:
+            self._evaluations[name] += X.shape[0]
+            self._hits[name] += hits.sum(axis=0)
+        return RuleSetResult(rule_set, X, hits, scores)
+
+    def cardiac_assessment(self, X, predictions):
+        """
+        Cardiac override over a batch.
+
+        Args:
+            X: Raw feature matrix (or dict for one patient)
+            predictions: Array of predicted labels, one per row
+
+        Returns:
+            Tuple of (RuleSetResult, override mask, override confidence per row)
+        """
+        result = self.evaluate('cardiac', X)
+        override = (result.total >= CARDIAC_OVERRIDE_THRESHOLD) & (np.asarray(predictions) != CARDIAC_LABEL)
+        confidence = np.round(np.minimum(95.0, 50 + result.total * 0.7), 2)
+        return result, override, confidence
+
+    def stats(self):
+        """Per-rule evaluation and hit counters, for monitoring"""
+        with self._lock:
+            return {
+                name: {
+                    rule_name: {
+                        'evaluations': int(self._evaluations[name][j]),
+                        'hits': int(self._hits[name][j])
+                    }
+                    for j, rule_name in enumerate(rule_set.names)
+                }
+                for name, rule_set in self.rule_sets.items()
+            }
+
+
+def build_rules_engine(feature_names, anomaly_detector=None):
+    """
+    Engine with the standard rule sets: 'cardiac', plus 'anomaly' when the
+    detector is given.
+    """
+    engine = ClinicalRulesEngine(feature_names)
+    engine.add_rule_set('cardiac', CARDIAC_RULES)
+    if anomaly_detector is not None:
+        engine.add_rule_set('anomaly', anomaly_rules(anomaly_detector.critical_high,
+                                                     anomaly_detector.critical_low))
+    return engine
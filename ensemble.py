@@ -0,0 +1,78 @@
+"""
+Ensemble
+Soft-voting ensemble over estimators that are already fitted. Produces the same
+predictions as sklearn's VotingClassifier(voting='soft') without cloning and
+retraining every member on the full training set.
+"""
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.utils import Bunch
+
+
+class PrefitVotingClassifier(ClassifierMixin, BaseEstimator):
+    """
+    Weighted soft voting over fitted classifiers.
+
+    predict_proba is the weighted average of the members' probabilities, as in
+    VotingClassifier(voting='soft', weights=...). Pickles with joblib like any
+    sklearn estimator and exposes classes_, estimators_ and named_estimators_ so
+    it is a drop-in replacement for the fitted VotingClassifier.
+    """
+
+    def __init__(self, estimators, weights=None):
+        """
+        Initialize Prefit Voting Classifier
+
+        Only stores the parameters (sklearn's get_params/clone contract); the
+        members are validated by fit() and by every predict_proba call.
+
+        Args:
+            estimators: List of (name, fitted classifier) tuples, all fitted on the same classes
+            weights: Per-estimator weights (None = equal weights)
+        """
+        self.estimators = estimators
+        self.weights = weights
+
+    def _validate(self):
+        if not self.estimators:
+            raise ValueError("PrefitVotingClassifier needs at least one estimator")
+        if self.weights is not None and len(self.weights) != len(self.estimators):
+            raise ValueError(f"Got {len(self.weights)} weights for {len(self.estimators)} estimators")
+
+        classes = [np.asarray(est.classes_) for _, est in self.estimators]
+        for (name, _), est_classes in zip(self.estimators[1:], classes[1:]):
+            if not np.array_equal(est_classes, classes[0]):
+                raise ValueError(f"Estimator '{name}' was fitted on different classes")
+
+    # Fitted attributes are read from the members, so they exist as soon as the members are fitted
+    @property
+    def classes_(self):
+        return np.asarray(self.estimators[0][1].classes_)
+
+    @property
+    def estimators_(self):
+        return [est for _, est in self.estimators]
+
+    @property
+    def named_estimators_(self):
+        return Bunch(**dict(self.estimators))
+
+    @property
+    def n_features_in_(self):
+        return self.estimators[0][1].n_features_in_
+
+    def fit(self, X=None, y=None):
+        """Members are already fitted; only validates them"""
+        self._validate()
+        return self
+
+    def predict_proba(self, X):
+        """Weighted average of the members' class probabilities"""
+        self._validate()
+        probas = [est.predict_proba(X) for est in self.estimators_]
+        return np.average(probas, axis=0, weights=self.weights)
+
+    def predict(self, X):
+        """Class with the highest averaged probability"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
@@ -0,0 +1,75 @@
+"""
+Feature Aliases
+Maps every accepted spelling of a form field (spaces, underscores, mixed case and the
+malformed names produced by stale cached templates) to its canonical feature name.
+"""
+import re
+
+# Characters stale templates inject into field names: real newlines, literal '\n',
+# whitespace runs and underscore runs ('Red\n______Blood_Cells')
+_NOISE = re.compile(r'(?:\\n|[\s_])+')
+
+
+class FeatureAliasMap:
+    """
+    Precompiled alias table, built once per feature list.
+    Exact spellings resolve with one dict lookup; anything else is folded to a
+    compact key (noise removed, lower-cased) and looked up once more.
+    """
+
+    def __init__(self, canonical_names, max_cache_size=4096):
+        """
+        Initialize Feature Alias Map
+
+        Args:
+            canonical_names: Feature names the payload should be resolved to
+            max_cache_size: Maximum number of unseen spellings remembered
+        """
+        self.canonical_names = list(canonical_names)
+        self.max_cache_size = max_cache_size
+
+        self.compact_to_name = {}
+        self.aliases = {}
+        self.cache_hits = 0  # Keys found in the alias table
+        self.cache_misses = 0  # Keys that had to be folded
+        for name in self.canonical_names:
+            compact = self.compact(name)
+            if compact in self.compact_to_name:
+                raise ValueError(f"Ambiguous feature names: '{name}' and '{self.compact_to_name[compact]}'")
+            self.compact_to_name[compact] = name
+            for alias in (name, name.replace(' ', '_'), name.replace(' ', ''), name.lower(),
+                          name.lower().replace(' ', '_')):
+                self.aliases[alias] = name
+
+    @staticmethod
+    def compact(key):
+        """Fold a field name to its comparison form"""
+        return _NOISE.sub('', key).lower()
+
+    def lookup(self, key):
+        """Canonical feature name for one field name, or None"""
+        name = self.aliases.get(key)
+        if name is not None:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+            name = self.compact_to_name.get(self.compact(key))
+            if name is not None and len(self.aliases) < self.max_cache_size:
+                self.aliases[key] = name
+        return name
+
+    def resolve(self, payload):
+        """
+        Resolve a request payload in a single pass.
+
+        Returns:
+            Tuple of (dict canonical name -> value, list of missing canonical names)
+        """
+        resolved = {}
+        for key, value in payload.items():
+            name = self.lookup(key)
+            # The exact canonical spelling wins over aliases of the same feature
+            if name is not None and value is not None and (key == name or name not in resolved):
+                resolved[name] = value
+        missing = [name for name in self.canonical_names if name not in resolved]
+        return resolved, missing
@@ -0,0 +1,129 @@
+"""
+Feature Engineering
+The derived clinical features (lipid ratios, glucose-insulin interaction, mean
+arterial pressure) in one place, shared by training (prepare_data), /predict,
+/api/explain, the chatbot, bulk triage and the SHAP analysis, so every path
+computes them with the same formulas.
+
+FeatureBuilder resolves column indices once per feature order and assembles
+whole (n_samples, n_features) matrices in the model's feature order.
+"""
+import numpy as np
+
+# Derived features, in the order prepare_data appends them to the training data
+DERIVED_FEATURES = ('LDL_HDL_Ratio', 'Chol_HDL_Ratio', 'Glucose_Insulin_Interaction', 'MAP')
+
+# Base features the derived features are computed from
+DERIVED_INPUTS = ('LDL Cholesterol', 'HDL Cholesterol', 'Cholesterol', 'Glucose', 'Insulin',
+                  'Systolic Blood Pressure', 'Diastolic Blood Pressure')
+
+EPSILON = 1e-6  # Avoids division by zero in the HDL ratios
+
+
+def derive(get):
+    """
+    Compute the derived features.
+
+    Args:
+        get: Callable returning the values of a base feature by name
+            (a DataFrame column, a matrix column or a scalar)
+
+    Returns:
+        Tuple of values in DERIVED_FEATURES order
+    """
+    hdl = get('HDL Cholesterol') + EPSILON
+    systolic = get('Systolic Blood Pressure')
+    diastolic = get('Diastolic Blood Pressure')
+    return (
+        get('LDL Cholesterol') / hdl,
+        get('Cholesterol') / hdl,
+        get('Glucose') * get('Insulin'),
+        diastolic + (1/3 * (systolic - diastolic))  # MAP = DP + 1/3(SP - DP)
+    )
+
+
+def add_derived(table):
+    """Add the derived features to a DataFrame or a dict of raw values (in place) and return it"""
+    for name, values in zip(DERIVED_FEATURES, derive(table.__getitem__)):
+        table[name] = values
+    return table
+
+
+class FeatureBuilder:
+    """
+    Builds model-order feature matrices from matrices of base features.
+
+    The column plan (where each base feature comes from, where each derived
+    feature goes) is resolved once per input column order and cached, so a
+    batch is assembled with one gather and four vectorized expressions.
+    """
+
+    def __init__(self, feature_names):
+        """
+        Initialize Feature Builder
+
+        Args:
+            feature_names: Model feature order (base and derived features)
+        """
+        self.feature_names = list(feature_names)
+        self.base_features = [f for f in self.feature_names if f not in DERIVED_FEATURES]
+        self._derived_positions = [(self.feature_names.index(f), k) for k, f in enumerate(DERIVED_FEATURES)
+                                   if f in self.feature_names]
+        self._base_positions = np.array([self.feature_names.index(f) for f in self.base_features], dtype=np.intp)
+        self._plans = {}
+
+    def _plan(self, columns):
+        """Source column of every base feature and of every derived input, for one input order"""
+        key = tuple(columns)
+        plan = self._plans.get(key)
+        if plan is None:
+            index = {f: i for i, f in enumerate(key)}
+            needed = list(self.base_features)
+            if self._derived_positions:
+                needed += [f for f in DERIVED_INPUTS if f not in needed]
+            missing = [f for f in needed if f not in index]
+            if missing:
+                raise ValueError(f"Missing features: {', '.join(missing)}")
+            plan = (np.array([index[f] for f in self.base_features], dtype=np.intp),
+                    {f: index[f] for f in DERIVED_INPUTS if f in index})
+            self._plans[key] = plan
+        return plan
+
+    def build(self, raw, columns=None):
+        """
+        Assemble the model feature matrix.
+
+        Args:
+            raw: Array (n_samples, len(columns)) of raw base values
+            columns: Feature names of raw's columns (default: base_features);
+                extra columns are ignored
+
+        Returns:
+            Array (n_samples, len(feature_names)) in model feature order
+        """
+        raw = np.atleast_2d(np.asarray(raw, dtype=float))
+        base_sources, inputs = self._plan(self.base_features if columns is None else columns)
+        X = np.empty((raw.shape[0], len(self.feature_names)))
+        X[:, self._base_positions] = raw[:, base_sources]
+        if self._derived_positions:
+            derived = derive(lambda f: raw[:, inputs[f]])
+            for position, k in self._derived_positions:
+                X[:, position] = derived[k]
+        return X
+
+    def build_row(self, values):
+        """One-row model feature matrix from a dict of raw base values"""
+        return self.build([[values[f] for f in self.base_features]])
+
+    def to_dict(self, row, base_order=None):
+        """
+        Raw values of one built row as a dict (the JSON stored with a prediction).
+
+        Args:
+            row: One row of build()'s output
+            base_order: Order of the base features in the dict (default: model order);
+                derived features always follow them
+        """
+        values = dict(zip(self.feature_names, np.asarray(row, dtype=float).tolist()))
+        order = list(base_order or self.base_features) + [f for f in DERIVED_FEATURES if f in values]
+        return {f: values[f] for f in order}
@@ -0,0 +1,220 @@
+"""
+Incremental Training
+Updates the deployed ensemble with newly confirmed labels instead of a full retrain:
+XGBoost continues boosting from the current booster (xgb_model=...), the
+RandomForest grows extra trees with warm_start, both on the new panels mixed with
+a stratified replay sample of the original training data. The result is
+published as a new model registry version, which running web apps swap in.
+"""
+import argparse
+import copy
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import recall_score
+
+from ensemble import PrefitVotingClassifier
+from model_registry import MODEL_DIR, ModelBundle, active_version, flat_artifacts, publish_version, version_dir
+
+TRAINING_SOURCES = ('data/Blood_samples_dataset_balanced_2(f).csv', 'data/blood_samples_dataset_test.csv')
+HOLDOUT_PATH = 'data/test_split.csv'
+
+
+def load_confirmed(feature_names, scaling_bridge, label_encoder, include_trained=False):
+    """
+    Confirmed labels joined with their stored raw panels (requires an app context).
+
+    Returns:
+        Tuple of (scaled matrix, encoded labels, list of ConfirmedLabel rows)
+    """
+    from models import ConfirmedLabel
+
+    query = ConfirmedLabel.query
+    if not include_trained:
+        query = query.filter(ConfirmedLabel.trained_at.is_(None))
+    rows = [row for row in query.order_by(ConfirmedLabel.id).all() if row.label in label_encoder.classes_]
+    if not rows:
+        return np.empty((0, len(feature_names))), np.empty(0, dtype=int), []
+
+    raw = np.array([[row.prediction.get_raw_features()[f] for f in feature_names] for row in rows], dtype=float)
+    X = scaling_bridge.scale_matrix(raw, feature_names)
+    y = label_encoder.transform([row.label for row in rows])
+    return X, y, rows
+
+
+def load_replay_pool(feature_names, label_encoder, sources=TRAINING_SOURCES):
+    """Deduplicated original training data in model space"""
+    from module_a_train_model import prepare_data
+
+    df = pd.concat([pd.read_csv(p) for p in sources if os.path.exists(p)], ignore_index=True).drop_duplicates()
+    X, y_encoded, columns, encoder = prepare_data(df)
+    order = [columns.index(f) for f in feature_names]
+    return X[:, order], label_encoder.transform(encoder.inverse_transform(y_encoded))
+
+
+def replay_sample(X_pool, y_pool, n_classes, n_rows, min_per_class=5, seed=42):
+    """
+    Stratified sample of the original data mixed into each update: limits
+    forgetting and guarantees every class is present (both XGBoost continuation
+    and RandomForest warm_start require the full class set in y).
+    """
+    rng = np.random.default_rng(seed)
+    per_class = max(min_per_class, int(np.ceil(n_rows / n_classes)))
+    picked = []
+    for cls in range(n_classes):
+        members = np.flatnonzero(y_pool == cls)
+        if len(members) == 0:
+            raise ValueError(f"Class {cls} has no rows in the replay pool")
+        picked.append(rng.choice(members, size=per_class, replace=len(members) < per_class))
+    index = np.concatenate(picked)
+    return X_pool[index], y_pool[index]
+
+
+def update_ensemble(model, X, y, extra_rounds=20, extra_trees=20):
+    """
+    Continue training the ensemble members on (X, y).
+
+    Args:
+        model: Fitted voting ensemble with 'xgb' and 'rf' members
+        X, y: Update set (new rows plus replay rows), every class present
+        extra_rounds: Boosting rounds appended to the XGBoost booster
+        extra_trees: Trees added to the RandomForest
+
+    Returns:
+        New PrefitVotingClassifier (the input model is not modified)
+    """
+    xgb_old = model.named_estimators_['xgb']
+    rf_old = model.named_estimators_['rf']
+
+    xgb_new = clone(xgb_old).set_params(n_estimators=extra_rounds)
+    xgb_new.fit(X, y, xgb_model=xgb_old.get_booster())
+
+    rf_new = copy.deepcopy(rf_old)
+    rf_new.set_params(warm_start=True, n_estimators=rf_old.n_estimators + extra_trees)
+    rf_new.fit(X, y)
+    rf_new.set_params(warm_start=False)
+
+    return PrefitVotingClassifier([('xgb', xgb_new), ('rf', rf_new)], weights=model.weights)
+
+
+def holdout_recall(model, feature_names, label_encoder, path=HOLDOUT_PATH):
+    """Macro recall on the stored test split (None when it does not exist)"""
+    if not os.path.exists(path):
+        return None
+    df = pd.read_csv(path)
+    known = df['Disease'].isin(label_encoder.classes_)
+    X = df.loc[known, feature_names].values
+    y = label_encoder.transform(df.loc[known, 'Disease'])
+    return recall_score(y, model.predict(X), average='macro')
+
+
+def publish(model, base_version, model_dir=MODEL_DIR, metadata=None):
+    """
+    Publish the updated ensemble as a new registry version and activate it.
+    Artifacts that do not change (encoder, feature names, scaling bridge, ...) are
+    copied from the base version; the SHAP components follow the new XGBoost member.
+
+    Returns:
+        The new version name
+    """
+    xgb_model = model.named_estimators_['xgb']
+    objects = {'best_model.pkl': model, 'shap_model.pkl': xgb_model}
+    try:
+        import shap
+        objects['shap_explainer.pkl'] = shap.TreeExplainer(xgb_model)
+    except Exception as e:
+        print(f"⚠️  SHAP explainer not updated: {e}")
+    files = flat_artifacts(version_dir(base_version, model_dir))
+    if 'shap_explainer.pkl' not in objects:
+        files.pop('shap_explainer.pkl', None)  # Would explain the previous booster
+    return publish_version(objects, files, model_dir, metadata=metadata)
+
+
+def run_update(min_new=10, replay_ratio=1.0, extra_rounds=20, extra_trees=20, max_recall_drop=0.02,
+               dry_run=False, model_dir=MODEL_DIR):
+    """
+    One incremental update (call inside a Flask app context).
+
+    Returns:
+        Dict summarizing the update ('published' tells whether artifacts were replaced)
+    """
+    from models import db, utcnow
+
+    base_version = active_version(model_dir)
+    bundle = ModelBundle.load(base_version, model_dir)
+    model, label_encoder, feature_names = bundle.model, bundle.label_encoder, bundle.feature_names
+
+    X_new, y_new, rows = load_confirmed(feature_names, bundle.scaling_bridge, label_encoder)
+    summary = {'base_version': base_version, 'new_rows': len(rows), 'published': False}
+    if len(rows) < min_new:
+        summary['reason'] = f'{len(rows)} new confirmed labels (< {min_new})'
+        return summary
+
+    X_pool, y_pool = load_replay_pool(feature_names, label_encoder)
+    X_replay, y_replay = replay_sample(X_pool, y_pool, len(label_encoder.classes_),
+                                       int(len(rows) * replay_ratio))
+    X = np.vstack([X_new, X_replay])
+    y = np.concatenate([y_new, y_replay])
+    summary['replay_rows'] = len(y_replay)
+
+    updated = update_ensemble(model, X, y, extra_rounds, extra_trees)
+
+    before = holdout_recall(model, feature_names, label_encoder)
+    after = holdout_recall(updated, feature_names, label_encoder)
+    summary.update({'holdout_recall_before': before, 'holdout_recall_after': after})
+    if before is not None and after < before - max_recall_drop:
+        summary['reason'] = f'holdout macro recall dropped {before:.4f} -> {after:.4f}'
+        return summary
+    if dry_run:
+        summary['reason'] = 'dry run'
+        return summary
+
+    summary['version'] = publish(updated, base_version, model_dir, metadata={
+        'source': 'incremental_training',
+        'confirmed_labels': len(rows),
+        'replay_rows': len(y_replay),
+        'holdout_recall_macro': after
+    })
+    trained_at = utcnow()  # Same naive-UTC convention as the created_at columns
+    for row in rows:
+        row.trained_at = trained_at
+    db.session.commit()
+    summary['published'] = True
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incrementally update the model with confirmed labels')
+    parser.add_argument('--min-new', type=int, default=10, help='Minimum new confirmed labels to run an update')
+    parser.add_argument('--replay-ratio', type=float, default=1.0, help='Replay rows per new row')
+    parser.add_argument('--extra-rounds', type=int, default=20, help='Boosting rounds added to XGBoost')
+    parser.add_argument('--extra-trees', type=int, default=20, help='Trees added to the RandomForest')
+    parser.add_argument('--max-recall-drop', type=float, default=0.02,
+                        help='Refuse to publish if holdout macro recall drops more than this')
+    parser.add_argument('--dry-run', action='store_true', help='Train and evaluate but do not publish')
+    args = parser.parse_args()
+
+    from app import app
+
+    print("="*60)
+    print("INCREMENTAL MODEL UPDATE")
+    print("="*60)
+    with app.app_context():
+        summary = run_update(args.min_new, args.replay_ratio, args.extra_rounds, args.extra_trees,
+                             args.max_recall_drop, args.dry_run)
+
+    print(f"New confirmed labels: {summary['new_rows']}")
+    if 'replay_rows' in summary:
+        print(f"Replay rows:          {summary['replay_rows']}")
+    if summary.get('holdout_recall_before') is not None:
+        print(f"Holdout macro recall: {summary['holdout_recall_before']:.4f} -> {summary['holdout_recall_after']:.4f}")
+    if summary['published']:
+        print(f"✓ Published model version '{summary['version']}' (based on '{summary['base_version']}')")
+    else:
+        print(f"⚠️  Not published: {summary['reason']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Inference Scheduler
+Micro-batches concurrent single-row predictions into one predict_proba call.
+Shared by /predict, /api/explain and the chatbot so that concurrent requests
+pay the ensemble's Python overhead once per batch instead of once per row.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class InferenceScheduler:
+    """
+    Collects rows submitted from any thread for up to `max_wait_ms` milliseconds
+    or `max_batch_size` rows, runs one predict_proba over the stacked matrix and
+    fans the probability rows back to the waiting callers.
+    """
+
+    def __init__(self, model, max_batch_size=32, max_wait_ms=2.0, model_version=None):
+        """
+        Initialize Inference Scheduler
+
+        Args:
+            model: Fitted classifier exposing predict_proba and classes_
+            max_batch_size: Maximum number of rows per predict_proba call
+            max_wait_ms: Maximum time the first row of a batch waits for company
+            model_version: Optional label of the model, reported on each result future
+        """
+        self._model = (model, model_version)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self.n_batches = 0
+        self.n_rows = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+        self._thread.start()
+
+    @property
+    def model(self):
+        return self._model[0]
+
+    @property
+    def model_version(self):
+        return self._model[1]
+
+    def swap_model(self, model, model_version=None):
+        """Serve later batches with `model`; a batch already running finishes on the old one"""
+        self._model = (model, model_version)
+
+    def submit(self, rows, model=None, model_version=None):
+        """
+        Queue one row (1-D) or a small matrix (2-D) for prediction.
+
+        Args:
+            rows: Scaled feature row(s)
+            model: Score with this model instead of the scheduler's current one
+                (callers holding a model version pass its model, so probabilities
+                and label decoding come from the same version)
+            model_version: Label of `model`
+
+        Returns:
+            concurrent.futures.Future resolving to the probability row(s); its
+            `model` and `model_version` attributes name the model that scored them
+
+        Raises:
+            ValueError: If the row width does not match the model's n_features_in_
+        """
+        rows = np.asarray(rows, dtype=float)
+        # Reject a wrong row width here so it fails only this caller, not the whole batch
+        n_features = getattr(model if model is not None else self.model, 'n_features_in_', None)
+        if rows.ndim not in (1, 2) or (n_features is not None and rows.shape[-1] != n_features):
+            raise ValueError(f"Expected rows of {n_features} features, got shape {rows.shape}")
+        pinned = (model, model_version) if model is not None else None
+        future = Future()
+        self._queue.put((rows.reshape(1, -1) if rows.ndim == 1 else rows, rows.ndim == 1, future, pinned))
+        return future
+
+    def predict_proba(self, rows, timeout=None, model=None, model_version=None):
+        """Blocking helper: submit rows and wait for their probabilities"""
+        return self.submit(rows, model, model_version).result(timeout=timeout)
+
+    def predict(self, rows, timeout=None, model=None, model_version=None):
+        """Class labels (as encoded by the scoring model) for the submitted rows"""
+        future = self.submit(rows, model, model_version)
+        proba = future.result(timeout=timeout)
+        return future.model.classes_[np.argmax(proba, axis=-1)]
+
+    def _collect(self, first):
+        """Gather queued requests behind `first` until the batch is full or the wait expires"""
+        batch = [first]
+        n_rows = first[0].shape[0]
+        deadline = time.perf_counter() + self.max_wait
+        while n_rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the stop marker back so the loop exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(item)
+            n_rows += item[0].shape[0]
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+
+            current = self._model  # One current model per batch, even across a swap
+
+            # Rows pinned to another model version (a request that started before a swap)
+            # or of another width are scored in their own group
+            groups = {}
+            for item in batch:
+                model_key = item[3] or current
+                groups.setdefault((id(model_key[0]), item[0].shape[1]), (model_key, []))[1].append(item)
+
+            for (model, model_version), items in groups.values():
+                self._score(model, model_version, items)
+
+    def _score(self, model, model_version, items):
+        """One predict_proba call for a group of queued requests"""
+        matrix = items[0][0] if len(items) == 1 else np.vstack([rows for rows, _, _, _ in items])
+        try:
+            proba = model.predict_proba(matrix)
+        except Exception as e:
+            for _, _, future, _ in items:
+                future.set_exception(e)
+            return
+
+        self.n_batches += 1
+        self.n_rows += matrix.shape[0]
+
+        offset = 0
+        for rows, single, future, _ in items:
+            result = proba[offset:offset + rows.shape[0]]
+            offset += rows.shape[0]
+            future.model = model
+            future.model_version = model_version
+            future.set_result(result[0] if single else result)
+
+    def stats(self):
+        """Batching statistics since startup"""
+        return {
+            'batches': self.n_batches,
+            'rows': self.n_rows,
+            'mean_batch_size': self.n_rows / self.n_batches if self.n_batches else 0.0,
+            'queued': self._queue.qsize(),
+        }
+
+    def close(self):
+        """Stop the scheduler thread once queued work is done"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def benchmark(model=None, n_features=28, requests_per_thread=50,
+              concurrency_levels=(1, 4, 16, 64), max_batch_size=32, max_wait_ms=2.0):
+    """
+    Report throughput and latency of direct single-row predict_proba calls vs
+    the scheduler at several concurrency levels.
+    """
+    import joblib
+    from concurrent.futures import ThreadPoolExecutor
+
+    if model is None:
+        model = joblib.load('models/best_model.pkl')
+        n_features = len(joblib.load('models/feature_names.pkl'))
+
+    def measure(predict, concurrency):
+        def worker(seed):
+            rng = np.random.default_rng(seed)
+            latencies = []
+            for _ in range(requests_per_thread):
+                row = rng.random(n_features)
+                start = time.perf_counter()
+                predict(row)
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = [lat for lats in pool.map(worker, range(concurrency)) for lat in lats]
+        elapsed = time.perf_counter() - start
+        latencies = np.array(latencies) * 1000
+        return {
+            'throughput': len(latencies) / elapsed,
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p95_ms': float(np.percentile(latencies, 95)),
+        }
+
+    print("=" * 70)
+    print(f"INFERENCE SCHEDULER BENCHMARK (max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms})")
+    print("=" * 70)
+    print(f"{'Concurrency':<12} {'Mode':<10} {'Req/s':>10} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    print("-" * 70)
+
+    results = {}
+    for concurrency in concurrency_levels:
+        direct = measure(lambda row: model.predict_proba(row.reshape(1, -1))[0], concurrency)
+
+        scheduler = InferenceScheduler(model, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        batched = measure(scheduler.predict_proba, concurrency)
+        batched['mean_batch_size'] = scheduler.stats()['mean_batch_size']
+        scheduler.close()
+
+        for mode, stats in (('direct', direct), ('batched', batched)):
+            print(f"{concurrency:<12} {mode:<10} {stats['throughput']:>10.1f} "
+                  f"{stats['p50_ms']:>10.2f} {stats['p95_ms']:>10.2f}")
+        results[concurrency] = {'direct': direct, 'batched': batched}
+
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
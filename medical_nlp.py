@@ -3,20 +3,24 @@ Medical NLP Extractor
 Extracts clinical values and symptoms from natural language text using regex and keyword matching.
 """
 import re
+from unit_normalizer import UnitNormalizer
 
 class MedicalNLPExtractor:
     def __init__(self):
+        # Unit recognition/conversion for values such as "6.1 mmol/L"
+        self.units = UnitNormalizer()
+        
         # Regex patterns for clinical parameters
         # Updated to be more flexible with intervening words
         self.patterns = {
-            'Glucose': [r'glucose(?: level| value)?\s*(?:is|:|=)?\s*(\d+)', r'sugar(?: level)?\s*(?:is|:|=)?\s*(\d+)'],
-            'Cholesterol': [r'cholesterol(?: level)?\s*(?:is|:|=)?\s*(\d+)', r'total cholesterol\s*(?:is|:|=)?\s*(\d+)'],
+            'Glucose': [r'glucose(?: level| value)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'sugar(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
+            'Cholesterol': [r'cholesterol(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'total cholesterol\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
             'BMI': [r'bmi\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'body mass index\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
             'HbA1c': [r'hba1c(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'a1c\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
             'Insulin': [r'insulin(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
             'Hemoglobin': [r'hemoglobin(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'hb\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
-            'Platelets': [r'platelets(?: count)?\s*(?:is|:|=)?\s*(\d+(?:,\d+)?)', r'plt\s*(?:is|:|=)?\s*(\d+(?:,\d+)?)'],
-            'White Blood Cells': [r'white blood cells(?: count)?\s*(?:is|:|=)?\s*(\d+(?:,\d+)?)', r'wbc\s*(?:is|:|=)?\s*(\d+(?:,\d+)?)'],
+            'Platelets': [r'platelets(?: count)?\s*(?:is|:|=)?\s*(\d+(?:,\d+)*(?:\.\d+)?)', r'plt\s*(?:is|:|=)?\s*(\d+(?:,\d+)*(?:\.\d+)?)'],
+            'White Blood Cells': [r'white blood cells(?: count)?\s*(?:is|:|=)?\s*(\d+(?:,\d+)*(?:\.\d+)?)', r'wbc\s*(?:is|:|=)?\s*(\d+(?:,\d+)*(?:\.\d+)?)'],
             'Red Blood Cells': [r'red blood cells(?: count)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'rbc\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
             'Hematocrit': [r'hematocrit(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'hct\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
             'Mean Corpuscular Volume': [r'mcv\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
@@ -24,17 +28,21 @@ class MedicalNLPExtractor:
             'Mean Corpuscular Hemoglobin Concentration': [r'mchc\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
             'Systolic Blood Pressure': [r'systolic(?: bp)?\s*(?:is|:|=)?\s*(\d+)', r'bp(?: is)?\s*(\d+)/\d+'],
             'Diastolic Blood Pressure': [r'diastolic(?: bp)?\s*(?:is|:|=)?\s*(\d+)', r'bp(?: is)?\s*\d+/(\d+)'],
-            'Heart Rate': [r'heart rate\s*(?:is|:|=)?\s*(\d+)', r'pulse\s*(?:is|:|=)?\s*(\d+)', r'bpm\s*(?:is|:|=)?\s*(\d+)'],
+            'Heart Rate': [r'heart rate\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'pulse\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'bpm\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
             'Troponin': [r'troponin(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
             'C-reactive Protein': [r'crp(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'c-reactive protein\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
-            'LDL Cholesterol': [r'ldl(?: cholesterol)?(?: level)?\s*(?:is|:|=)?\s*(\d+)', r'bad cholesterol\s*(?:is|:|=)?\s*(\d+)'],
-            'HDL Cholesterol': [r'hdl(?: cholesterol)?(?: level)?\s*(?:is|:|=)?\s*(\d+)', r'good cholesterol\s*(?:is|:|=)?\s*(\d+)'],
-            'Triglycerides': [r'triglycerides(?: level)?\s*(?:is|:|=)?\s*(\d+)', r'trigs\s*(?:is|:|=)?\s*(\d+)'],
-            'ALT': [r'alt(?: level)?\s*(?:is|:|=)?\s*(\d+)', r'sgpt\s*(?:is|:|=)?\s*(\d+)'],
-            'AST': [r'ast(?: level)?\s*(?:is|:|=)?\s*(\d+)', r'sgot\s*(?:is|:|=)?\s*(\d+)'],
+            'LDL Cholesterol': [r'ldl(?: cholesterol)?(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'bad cholesterol\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
+            'HDL Cholesterol': [r'hdl(?: cholesterol)?(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'good cholesterol\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
+            'Triglycerides': [r'triglycerides(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'trigs\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
+            'ALT': [r'alt(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'sgpt\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
+            'AST': [r'ast(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)', r'sgot\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)'],
             'Creatinine': [r'creatinine(?: level)?\s*(?:is|:|=)?\s*(\d+(?:\.\d+)?)']
         }
         
+        self.compiled_patterns = {
+            param: [re.compile(p) for p in patterns] for param, patterns in self.patterns.items()
+        }
+        
         # Symptom keywords
         self.symptoms = {
             'chest_pain': ['chest pain', 'chest discomfort', 'angina', 'tightness in chest', 'heart hurts'],
@@ -55,17 +63,21 @@ class MedicalNLPExtractor:
         extracted = {}
         text = text.lower()
         
-        for param, patterns in self.patterns.items():
+        for param, patterns in self.compiled_patterns.items():
             for pattern in patterns:
-                match = re.search(pattern, text)
+                match = pattern.search(text)
                 if match:
                     value_str = match.group(1).replace(',', '')
                     try:
                         value = float(value_str)
-                        extracted[param] = value
-                        break  # Found a match for this parameter
                     except ValueError:
                         continue
+                    # Convert to dashboard units when a recognised unit follows the number
+                    unit = self.units.parse_unit(text, match.end(1))
+                    if unit is not None and self.units.accepts(param, unit):
+                        value = self.units.convert(param, value, unit)
+                    extracted[param] = value
+                    break  # Found a match for this parameter
                         
         return extracted
 
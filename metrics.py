@@ -0,0 +1,186 @@
+"""
+Metrics
+In-process counters and fixed-bucket latency histograms rendered in the
+Prometheus text exposition format (served at /metrics, no external service).
+"""
+import bisect
+import threading
+import time
+from functools import wraps
+from inspect import iscoroutinefunction
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect plus two additions under a lock"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, {"le": le})} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {total!r}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the application's metrics.
+    Collectors are callables invoked at scrape time that return
+    (name, type, documentation, [(labels dict, value), ...]) tuples; they export
+    statistics other components already keep, at no cost per request.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """Lap timer for one request: mark(stage) records the time since the previous mark"""
+
+    def __init__(self, histogram, route):
+        self.histogram = histogram
+        self.route = route
+        self.start = self._last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.histogram.observe(now - self._last, route=self.route, stage=stage)
+        self._last = now
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'mediguard_request_duration_seconds', 'End-to-end handler latency per route.', ('route',))
+STAGE_SECONDS = REGISTRY.histogram(
+    'mediguard_stage_duration_seconds', 'Latency of each handler stage.', ('route', 'stage'))
+MODEL_CALLS = REGISTRY.counter(
+    'mediguard_model_calls_total', 'Model invocations requested by handlers.', ('route', 'model'))
+DB_WRITES = REGISTRY.counter(
+    'mediguard_db_writes_total', 'Rows written to the database by operation.', ('route', 'operation'))
+
+
+def timed(route):
+    """
+    Decorator timing a Flask view: records the total handler latency and makes a
+    StageTimer available to mark_stage() for the duration of the request.
+    """
+    from flask import g
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(*args, **kwargs):
+                g.stage_timer = timer = StageTimer(STAGE_SECONDS, route)
+                try:
+                    return await view(*args, **kwargs)
+                finally:
+                    REQUEST_SECONDS.observe(time.perf_counter() - timer.start, route=route)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.stage_timer = timer = StageTimer(STAGE_SECONDS, route)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                REQUEST_SECONDS.observe(time.perf_counter() - timer.start, route=route)
+        return wrapper
+    return decorator
+
+
+def mark_stage(stage):
+    """Close the current stage of the request being timed (no-op outside @timed views)"""
+    from flask import g, has_request_context
+    if has_request_context():
+        timer = g.get('stage_timer')
+        if timer is not None:
+            timer.mark(stage)
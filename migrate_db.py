@@ -1,6 +1,6 @@
 """
 Database Migration Script
-Adds patient demographic columns to predictions table
+Adds patient demographic and model version columns to predictions table
 """
 
 import sqlite3
@@ -28,6 +28,8 @@ def migrate_database():
             migrations_needed.append('patient_age')
         if 'patient_sex' not in columns:
             migrations_needed.append('patient_sex')
+        if 'model_version' not in columns:
+            migrations_needed.append('model_version')
         
         if not migrations_needed:
             print("✅ Database is already up to date!")
@@ -48,6 +50,10 @@ def migrate_database():
             cursor.execute('ALTER TABLE predictions ADD COLUMN patient_sex VARCHAR(10)')
             print("  ✅ Added patient_sex column")
         
+        if 'model_version' in migrations_needed:
+            cursor.execute('ALTER TABLE predictions ADD COLUMN model_version VARCHAR(64)')
+            print("  ✅ Added model_version column")
+        
         conn.commit()
         print("\n✅ Database migration completed successfully!")
         print("You can now restart the Flask app.")
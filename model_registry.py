@@ -0,0 +1,454 @@
+"""
+Model Registry
+Versioned model artifacts: each version is a directory models/<version>/ with
+the pickled components and a manifest.json of SHA-256 checksums; the text file
+models/CURRENT names the active version. A watcher thread loads a newly
+activated version in the background, verifies and warms it up, then swaps the
+registry's reference in one assignment, so in-flight requests finish on the
+version they started with and no worker restart is needed.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+
+from anomaly_detector import AnomalyDetector
+from clinical_rules import build_rules_engine
+from feature_engineering import FeatureBuilder
+from module_b_scaling_bridge import ScalingBridge
+from population_anomaly import PopulationAnomalyModel
+from structured_logging import get_logger
+
+logger = get_logger('model_registry')
+
+MODEL_DIR = 'models'
+MANIFEST = 'manifest.json'
+CURRENT = 'CURRENT'
+LEGACY_VERSION = 'legacy'  # Unversioned artifacts directly in models/
+
+# Artifact file -> required for a version to load
+ARTIFACTS = {
+    'best_model.pkl': True,
+    'label_encoder.pkl': True,
+    'feature_names.pkl': True,
+    'scaling_bridge.pkl': True,
+    'shap_model.pkl': False,
+    'shap_explainer.pkl': False,
+    'population_anomaly.pkl': False,
+    'model_metadata.pkl': False,
+}
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def version_dir(version, model_dir=MODEL_DIR):
+    """Directory holding a version's artifacts (the legacy version is models/ itself)"""
+    return model_dir if version == LEGACY_VERSION else os.path.join(model_dir, version)
+
+
+def active_version(model_dir=MODEL_DIR):
+    """Version named in models/CURRENT, or LEGACY_VERSION when nothing has been published"""
+    try:
+        with open(os.path.join(model_dir, CURRENT)) as f:
+            return f.read().strip() or LEGACY_VERSION
+    except FileNotFoundError:
+        return LEGACY_VERSION
+
+
+def list_versions(model_dir=MODEL_DIR):
+    """Published versions (directories with a manifest), oldest first"""
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(name for name in os.listdir(model_dir)
+                  if os.path.isfile(os.path.join(model_dir, name, MANIFEST)))
+
+
+def read_manifest(version, model_dir=MODEL_DIR):
+    """Parsed manifest.json of a version (None for the legacy version)"""
+    if version == LEGACY_VERSION:
+        return None
+    with open(os.path.join(version_dir(version, model_dir), MANIFEST)) as f:
+        return json.load(f)
+
+
+def verify(version, model_dir=MODEL_DIR):
+    """
+    Check a version's files against its manifest.
+
+    Returns:
+        List of problems (empty if the version is intact)
+    """
+    if version == LEGACY_VERSION:
+        directory = version_dir(version, model_dir)
+        return [f'missing {name}' for name, required in ARTIFACTS.items()
+                if required and not os.path.exists(os.path.join(directory, name))]
+    try:
+        manifest = read_manifest(version, model_dir)
+    except (OSError, ValueError) as e:
+        return [f'unreadable manifest: {e}']
+
+    problems = [f'missing {name}' for name, required in ARTIFACTS.items()
+                if required and name not in manifest['files']]
+    directory = version_dir(version, model_dir)
+    for name, entry in manifest['files'].items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            problems.append(f'missing {name}')
+        elif file_sha256(path) != entry['sha256']:
+            problems.append(f'checksum mismatch for {name}')
+    return problems
+
+
+def activate(version, model_dir=MODEL_DIR):
+    """Point models/CURRENT at `version` (atomic rename; watchers pick it up on their next poll)"""
+    if version != LEGACY_VERSION and version not in list_versions(model_dir):
+        raise ValueError(f"Unknown model version '{version}'")
+    path = os.path.join(model_dir, CURRENT)
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, path)
+
+
+def flat_artifacts(directory=MODEL_DIR):
+    """Artifact files present directly in `directory` (e.g. what module_a writes)"""
+    return {name: os.path.join(directory, name) for name in ARTIFACTS
+            if os.path.exists(os.path.join(directory, name))}
+
+
+def publish_version(objects=None, files=None, model_dir=MODEL_DIR, version=None, metadata=None, activate_version=True):
+    """
+    Write a new version directory and (by default) make it the active version.
+
+    Files are written to a hidden staging directory that is renamed into place
+    once every artifact and the manifest exist, so a version directory is
+    never visible half-written. A version missing a required artifact (see
+    ARTIFACTS) is never published.
+
+    Args:
+        objects: Dict of artifact file name -> object to joblib.dump
+        files: Dict of artifact file name -> existing file to copy
+        model_dir: Registry root
+        version: Version name (default: UTC timestamp)
+        metadata: JSON-serializable information stored in the manifest
+        activate_version: Update models/CURRENT to the new version
+
+    Returns:
+        The new version name
+
+    Raises:
+        ValueError: If a required artifact is missing (nothing is published or activated)
+    """
+    objects = objects or {}
+    files = {name: path for name, path in (files or {}).items() if name not in objects}
+    unknown = (set(objects) | set(files)) - set(ARTIFACTS)
+    if unknown:
+        raise ValueError(f"Unknown artifact(s): {', '.join(sorted(unknown))}")
+
+    os.makedirs(model_dir, exist_ok=True)
+    created_at = datetime.now(timezone.utc)
+    if version is None:
+        version = created_at.strftime('%Y%m%d-%H%M%S')
+        base, n = version, 1
+        while os.path.exists(os.path.join(model_dir, version)):
+            n += 1
+            version = f'{base}-{n}'
+    final_dir = os.path.join(model_dir, version)
+    if os.path.exists(final_dir):
+        raise FileExistsError(f"Model version '{version}' already exists")
+
+    staging = os.path.join(model_dir, f'.staging-{version}-{os.getpid()}')
+    os.makedirs(staging)
+    try:
+        for name, obj in objects.items():
+            joblib.dump(obj, os.path.join(staging, name))
+        for name, path in files.items():
+            shutil.copy2(path, os.path.join(staging, name))
+        missing = [name for name, required in ARTIFACTS.items()
+                   if required and not os.path.isfile(os.path.join(staging, name))]
+        if missing:
+            raise ValueError(f"Cannot publish version '{version}': missing {', '.join(missing)}")
+
+        manifest = {
+            'version': version,
+            'created_at': created_at.isoformat(),
+            'parent': active_version(model_dir),
+            'metadata': metadata or {},
+            'files': {name: {'sha256': file_sha256(os.path.join(staging, name)),
+                             'size': os.path.getsize(os.path.join(staging, name))}
+                      for name in sorted(os.listdir(staging))}
+        }
+        with open(os.path.join(staging, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(staging, final_dir)
+    finally:
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+
+    if activate_version:
+        activate(version, model_dir)
+    return version
+
+
+class ModelBundle:
+    """
+    All components of one model version, loaded together and read-only once installed.
+    Requests read the bundle once and take every component from it, so one request
+    never mixes versions.
+    """
+
+    def __init__(self, version, model, label_encoder, feature_names, scaling_bridge,
+                 shap_explainer=None, shap_model=None, population_model=None, manifest=None):
+        """
+        Initialize Model Bundle
+
+        Args:
+            version: Version name (LEGACY_VERSION for unversioned artifacts)
+            model: Fitted classifier (predict_proba, classes_)
+            label_encoder: Fitted LabelEncoder of the model's classes
+            feature_names: Feature order the model expects
+            scaling_bridge: ScalingBridge for raw -> model space
+            shap_explainer, shap_model: Optional SHAP components
+            population_model: Optional PopulationAnomalyModel
+            manifest: Parsed manifest.json (None for the legacy version)
+        """
+        self.version = version
+        self.model = model
+        self.label_encoder = label_encoder
+        self.feature_names = feature_names
+        self.scaling_bridge = scaling_bridge
+        self.shap_explainer = shap_explainer
+        self.shap_model = shap_model
+        self.population_model = population_model
+        self.manifest = manifest
+        # Serving components for this feature order (set by compile)
+        self.features = None
+        self.anomaly_detector = None
+        self.rules_engine = None
+
+    @classmethod
+    def load(cls, version, model_dir=MODEL_DIR, check=True):
+        """
+        Load a version's artifacts (optional components are skipped with a warning).
+
+        Raises:
+            ValueError: If `check` is set and the files do not match the manifest
+        """
+        if check:
+            problems = verify(version, model_dir)
+            if problems:
+                raise ValueError(f"Model version '{version}' failed verification: {'; '.join(problems)}")
+        directory = version_dir(version, model_dir)
+
+        def optional(name, loader):
+            path = os.path.join(directory, name)
+            if not os.path.exists(path):
+                return None
+            try:
+                return loader(path)
+            except Exception as e:
+                logger.warning("%s could not be loaded for version %s: %s", name, version, e)
+                return None
+
+        return cls(
+            version=version,
+            model=joblib.load(os.path.join(directory, 'best_model.pkl')),
+            label_encoder=joblib.load(os.path.join(directory, 'label_encoder.pkl')),
+            feature_names=joblib.load(os.path.join(directory, 'feature_names.pkl')),
+            scaling_bridge=ScalingBridge.load(os.path.join(directory, 'scaling_bridge.pkl')),
+            shap_explainer=optional('shap_explainer.pkl', joblib.load),
+            shap_model=optional('shap_model.pkl', joblib.load),
+            population_model=optional('population_anomaly.pkl', PopulationAnomalyModel.load),
+            manifest=read_manifest(version, model_dir)
+        )
+
+    def compile(self, previous=None):
+        """
+        Build the feature builder, critical-value detector and clinical rules engine
+        for this version's feature order. They are taken over from `previous` when
+        its feature order is the same (keeping the rule counters across swaps).
+        """
+        if previous is not None and list(previous.feature_names) == list(self.feature_names):
+            self.features = previous.features
+            self.anomaly_detector = previous.anomaly_detector
+            self.rules_engine = previous.rules_engine
+            return self
+        self.features = FeatureBuilder(self.feature_names)
+        self.anomaly_detector = AnomalyDetector()
+        self.rules_engine = build_rules_engine(self.feature_names, self.anomaly_detector)
+        self.anomaly_detector.compile(self.feature_names, self.rules_engine)
+        return self
+
+    def warm_up(self):
+        """
+        Run one prediction (and explanation) through the new components before they
+        serve traffic: first-call costs are paid here and a broken model fails here.
+        """
+        row = np.full((1, len(self.feature_names)), 0.5)
+        proba = self.model.predict_proba(row)
+        if proba.shape != (1, len(self.label_encoder.classes_)):
+            raise ValueError(f"Model returns {proba.shape[1]} probabilities for "
+                             f"{len(self.label_encoder.classes_)} classes")
+        self.label_encoder.inverse_transform([self.model.classes_[np.argmax(proba[0])]])
+        if self.shap_explainer is not None:
+            try:
+                self.shap_explainer(row)
+            except Exception as e:
+                logger.warning("SHAP explainer of version %s failed warm-up: %s", self.version, e)
+                self.shap_explainer = None
+
+
+class ModelRegistry:
+    """
+    Holds the active ModelBundle and swaps it when models/CURRENT changes.
+
+    `current` is replaced by a single reference assignment; callers that read it
+    once per request keep using a consistent set of components for that request.
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, poll_interval=5.0, on_swap=None):
+        """
+        Initialize Model Registry
+
+        Args:
+            model_dir: Registry root (models/)
+            poll_interval: Seconds between checks of models/CURRENT
+            on_swap: Optional callback(bundle) run after each swap (e.g. to update shared components)
+        """
+        self.model_dir = model_dir
+        self.poll_interval = poll_interval
+        self.on_swap = on_swap
+        self.current = None
+        self.swaps = 0
+        self._failed_version = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def version(self):
+        return self.current.version if self.current is not None else None
+
+    def _swap(self, bundle):
+        self.current = bundle
+        self.swaps += 1
+        if self.on_swap is not None:
+            self.on_swap(bundle)
+
+    def load_active(self):
+        """Load, warm up and install the active version synchronously (startup path)"""
+        with self._lock:
+            version = active_version(self.model_dir)
+            bundle = ModelBundle.load(version, self.model_dir).compile(self.current)
+            bundle.warm_up()
+            self._swap(bundle)
+            logger.info("Model version loaded", extra={'fields': {'version': version}})
+            return bundle
+
+    def check(self):
+        """
+        One watcher poll: install the active version if it differs from the current one.
+
+        Returns:
+            True if a new version was swapped in
+        """
+        version = active_version(self.model_dir)
+        if version == self.version or version == self._failed_version:
+            return False
+        with self._lock:
+            if version == self.version:
+                return False
+            try:
+                bundle = ModelBundle.load(version, self.model_dir).compile(self.current)
+                bundle.warm_up()
+            except Exception as e:
+                # Keep serving the current version; retry only once CURRENT changes again
+                self._failed_version = version
+                logger.error("Model version %s rejected, keeping %s: %s", version, self.version, e)
+                return False
+            previous = self.version
+            self._swap(bundle)
+            self._failed_version = None
+            logger.info("Model version swapped", extra={'fields': {'from': previous, 'to': version}})
+            return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.exception("Model watcher poll failed: %s", e)
+
+    def start(self):
+        """Start the background watcher thread (no-op if already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='model-registry-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the watcher thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage versioned model artifacts')
+    parser.add_argument('--model-dir', default=MODEL_DIR, help='Registry root')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='List versions (* = active)')
+    publish = sub.add_parser('publish', help='Publish the artifacts in a directory as a new version')
+    publish.add_argument('--source', default=MODEL_DIR, help='Directory with the artifact files')
+    publish.add_argument('--version', help='Version name (default: UTC timestamp)')
+    publish.add_argument('--no-activate', action='store_true', help='Do not make it the active version')
+    activate_parser = sub.add_parser('activate', help='Make a version active (also used for rollback)')
+    activate_parser.add_argument('version')
+    verify_parser = sub.add_parser('verify', help='Check a version against its manifest checksums')
+    verify_parser.add_argument('version', nargs='?')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        current = active_version(args.model_dir)
+        for version in list_versions(args.model_dir) + [LEGACY_VERSION]:
+            manifest = read_manifest(version, args.model_dir)
+            created = manifest['created_at'] if manifest else ''
+            print(f"{'*' if version == current else ' '} {version:<24} {created}")
+    elif args.command == 'publish':
+        try:
+            version = publish_version(files=flat_artifacts(args.source), model_dir=args.model_dir,
+                                      version=args.version, metadata={'source': args.source},
+                                      activate_version=not args.no_activate)
+        except ValueError as e:
+            raise SystemExit(f"❌ {e}")
+        print(f"✓ Published model version '{version}'")
+    elif args.command == 'activate':
+        activate(args.version, args.model_dir)
+        print(f"✓ Active model version: '{args.version}'")
+    elif args.command == 'verify':
+        version = args.version or active_version(args.model_dir)
+        problems = verify(version, args.model_dir)
+        for problem in problems:
+            print(f"⚠️  {problem}")
+        if problems:
+            raise SystemExit(1)
+        print(f"✓ Model version '{version}' is intact")
+
+
+if __name__ == "__main__":
+    main()
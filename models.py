@@ -4,10 +4,16 @@ Database Models for MediGuard AI
 
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from datetime import datetime
+from datetime import datetime, timezone
 
 db = SQLAlchemy()
 
+
+def utcnow():
+    """Current UTC time as a naive datetime: the convention of every DateTime column (SQLite stores no offset)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class User(UserMixin, db.Model):
     """User model"""
     __tablename__ = 'users'
@@ -16,7 +22,7 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow)
     is_active = db.Column(db.Boolean, default=True)
     
     # Relationship
@@ -42,7 +48,8 @@ class Prediction(db.Model):
     block_hash = db.Column(db.String(64), nullable=False)
     data_quality_issues = db.Column(db.Text)  # JSON string
     data_quality_warnings = db.Column(db.Text)  # JSON string
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    model_version = db.Column(db.String(64))  # Registry version that produced the prediction
+    created_at = db.Column(db.DateTime, default=utcnow)
     
     def __repr__(self):
         return f'<Prediction {self.id}: {self.prediction}>'
@@ -71,3 +78,20 @@ class Prediction(db.Model):
             return json.loads(self.data_quality_warnings)
         return []
 
+class ConfirmedLabel(db.Model):
+    """Clinician-confirmed diagnosis for a stored prediction (input to incremental training)"""
+    __tablename__ = 'confirmed_labels'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    prediction_id = db.Column(db.Integer, db.ForeignKey('predictions.id'), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    label = db.Column(db.String(50), nullable=False)  # Model class label, e.g. 'Diabetes'
+    created_at = db.Column(db.DateTime, default=utcnow)
+    trained_at = db.Column(db.DateTime)  # Set once the label has been fed to an incremental update
+    
+    # Relationship
+    prediction = db.relationship('Prediction', backref=db.backref('confirmed_label', uselist=False,
+                                                                  cascade='all, delete-orphan'))
+    
+    def __repr__(self):
+        return f'<ConfirmedLabel {self.prediction_id}: {self.label}>'
@@ -2,19 +2,38 @@
 Module A: Train Multi-Class Classification Model
 Trains XGBoost and Random Forest models with focus on high Recall (Sensitivity)
 to minimize dangerous False Negatives.
+
+The pipeline runs as named stages (see STAGES); each stage's output is cached
+by its inputs and code, so unchanged stages are skipped on the next run:
+    python module_a_train_model.py                       # reuse cached stages
+    python module_a_train_model.py --from-stage xgboost  # recompute xgboost onward
+    python module_a_train_model.py --columnar data/columnar --xgboost-external  # out-of-core
 """
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, RandomizedSearchCV
-from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, confusion_matrix, recall_score, accuracy_score
 from sklearn.preprocessing import LabelEncoder
-from imblearn.over_sampling import SMOTE
 import xgboost as xgb
 import shap
 import joblib
 import os
+import argparse
+import itertools
+from tuning import SuccessiveHalvingSearch, DEFAULT_CACHE_DIR as TUNING_CACHE_DIR
+from ensemble import PrefitVotingClassifier
+from oversampling import SMOTEOversampler, load_result, DEFAULT_CACHE_DIR as OVERSAMPLING_CACHE_DIR
+from stage_cache import Stage, run_stages, DEFAULT_CACHE_DIR
+from feature_engineering import add_derived, derive, DERIVED_FEATURES
+
+TRAIN_PATH = 'data/Blood_samples_dataset_balanced_2(f).csv'
+TEST_PATH = 'data/blood_samples_dataset_test.csv'
+
+# Pipeline stages in execution order (--from-stage accepts these names)
+STAGES = ('load', 'augment', 'features', 'split', 'smote', 'xgboost', 'random_forest',
+          'ensemble', 'population', 'shap', 'save')
 
 def load_data(data_path):
     """Load the training dataset"""
@@ -25,17 +44,8 @@ def load_data(data_path):
 
 def prepare_data(df):
     """Prepare features and target"""
-    # Feature Engineering: Clinical Ratios
-    # Add small epsilon to avoid division by zero
-    epsilon = 1e-6
-    
-    df['LDL_HDL_Ratio'] = df['LDL Cholesterol'] / (df['HDL Cholesterol'] + epsilon)
-    df['Chol_HDL_Ratio'] = df['Cholesterol'] / (df['HDL Cholesterol'] + epsilon)
-    df['Glucose_Insulin_Interaction'] = df['Glucose'] * df['Insulin']
-    
-    # Mean Arterial Pressure (MAP) approx
-    # MAP = DP + 1/3(SP - DP)
-    df['MAP'] = df['Diastolic Blood Pressure'] + (1/3 * (df['Systolic Blood Pressure'] - df['Diastolic Blood Pressure']))
+    # Feature Engineering: Clinical Ratios and MAP (shared with serving)
+    add_derived(df)
     
     # Separate features and target
     feature_cols = [col for col in df.columns if col != 'Disease']
@@ -48,8 +58,9 @@ def prepare_data(df):
     
     return X, y_encoded, feature_cols, label_encoder
 
-def train_xgboost(X_train, y_train, X_val, y_val, feature_names):
-    """Train XGBoost model with Hyperparameter Tuning"""
+def train_xgboost(X_train, y_train, feature_names, random_state=42, n_jobs=-1, n_candidates=12,
+                  cache_dir=TUNING_CACHE_DIR):
+    """Train XGBoost model with Hyperparameter Tuning (trial scores cached in cache_dir)"""
     print("\n" + "="*50)
     print("Training XGBoost Model (with Tuning)")
     print("="*50)
@@ -65,30 +76,55 @@ def train_xgboost(X_train, y_train, X_val, y_val, feature_names):
     }
     
     xgb_clf = xgb.XGBClassifier(
-        random_state=42,
-        eval_metric='mlogloss'
+        random_state=random_state,
+        eval_metric='mlogloss',
+        n_jobs=n_jobs
     )
     
-    # Randomized Search
-    random_search = RandomizedSearchCV(
+    # Successive halving: many candidates on small subsets, the best on all data
+    search = SuccessiveHalvingSearch(
         estimator=xgb_clf,
         param_distributions=param_dist,
-        n_iter=10, # Limit iterations for speed
+        n_candidates=n_candidates,
+        factor=3,
         scoring='recall_weighted',
+        budget_params=('n_estimators',),
         cv=3,
-        verbose=1,
-        random_state=42,
-        n_jobs=-1
+        random_state=random_state,
+        n_jobs=n_jobs,
+        cache_dir=cache_dir
     )
     
-    print("Running RandomizedSearchCV...")
-    random_search.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+    print("Running successive halving search...")
+    # Candidates are scored by cross-validation on the training set; no eval_set
+    search.fit(X_train, y_train)
     
-    print(f"Best parameters: {random_search.best_params_}")
-    return random_search.best_estimator_
+    print(f"Best parameters: {search.best_params_}")
+    return search.best_estimator_
 
-def train_random_forest(X_train, y_train, feature_names):
-    """Train Random Forest model with Hyperparameter Tuning"""
+def train_xgboost_external_memory(X_train, y_train, X_val, y_val, label_encoder, random_state=42,
+                                  num_boost_round=200, chunk_rows=65_536):
+    """
+    Train XGBoost from an external-memory DMatrix over the (memory-mapped)
+    training set: XGBoost pages quantized chunks to disk instead of copying the
+    whole matrix into RAM. Uses fixed parameters; there is no tuning search.
+    """
+    from data_pipeline import ArrayDataset, as_classifier, train_xgboost_external
+    print("\n" + "="*50)
+    print("Training XGBoost Model (external memory)")
+    print("="*50)
+    
+    dataset = ArrayDataset(X_train, y_train, label_encoder.classes_)
+    booster = train_xgboost_external(dataset, {'max_depth': 6, 'eta': 0.1, 'seed': random_state},
+                                     num_boost_round=num_boost_round, chunk_rows=chunk_rows)
+    model = as_classifier(booster)
+    print(f"✓ Trained {booster.num_boosted_rounds()} rounds in {-(-len(dataset) // chunk_rows)} chunk(s) "
+          f"(validation recall: {recall_score(y_val, model.predict(X_val), average='weighted'):.4f})")
+    return model
+
+def train_random_forest(X_train, y_train, feature_names, random_state=42, n_jobs=-1, n_candidates=12,
+                        cache_dir=TUNING_CACHE_DIR):
+    """Train Random Forest model with Hyperparameter Tuning (trial scores cached in cache_dir)"""
     print("\n" + "="*50)
     print("Training Random Forest Model (with Tuning)")
     print("="*50)
@@ -102,25 +138,27 @@ def train_random_forest(X_train, y_train, feature_names):
         'class_weight': ['balanced', 'balanced_subsample', None]
     }
     
-    rf_clf = RandomForestClassifier(random_state=42)
+    rf_clf = RandomForestClassifier(random_state=random_state, n_jobs=n_jobs)
     
-    # Randomized Search
-    random_search = RandomizedSearchCV(
+    # Successive halving: many candidates on small subsets, the best on all data
+    search = SuccessiveHalvingSearch(
         estimator=rf_clf,
         param_distributions=param_dist,
-        n_iter=10, # Limit iterations for speed
+        n_candidates=n_candidates,
+        factor=3,
         scoring='recall_weighted',
+        budget_params=('n_estimators',),
         cv=3,
-        verbose=1,
-        random_state=42,
-        n_jobs=-1
+        random_state=random_state,
+        n_jobs=n_jobs,
+        cache_dir=cache_dir
     )
     
-    print("Running RandomizedSearchCV...")
-    random_search.fit(X_train, y_train)
+    print("Running successive halving search...")
+    search.fit(X_train, y_train)
     
-    print(f"Best parameters: {random_search.best_params_}")
-    return random_search.best_estimator_
+    print(f"Best parameters: {search.best_params_}")
+    return search.best_estimator_
 
 def evaluate_model(model, X_test, y_test, label_encoder, model_name):
     """Evaluate model performance with focus on Recall"""
@@ -154,13 +192,8 @@ def evaluate_model(model, X_test, y_test, label_encoder, model_name):
         'y_pred': y_pred_decoded
     }
 
-def main():
-    """Main training pipeline"""
-    # Load data
-    # Load and combine datasets
-    train_path = 'data/Blood_samples_dataset_balanced_2(f).csv'
-    test_path = 'data/blood_samples_dataset_test.csv'
-    
+def load_combined(train_path, test_path):
+    """Load and combine the training and test datasets and drop duplicate rows"""
     print(f"Loading training data from {train_path}")
     df_train = load_data(train_path)
     
@@ -181,64 +214,57 @@ def main():
     df = df.drop_duplicates()
     print(f"\nRemoved {initial_rows - len(df)} duplicate rows")
     print(f"Unique samples for training: {len(df)}")
+    return df
 
-    # --- Data Augmentation for Healthy Class ---
+def load_columnar(columnar_dir, train_path, test_path):
+    """
+    Combine the datasets through the columnar store: the CSVs are ingested
+    chunk by chunk (deduplicated by row hash) into per-feature memory maps,
+    once per change of the source files. Returns the ColumnarDataset, not a
+    DataFrame; the later columnar stages read it chunk by chunk.
+    """
+    from data_pipeline import open_or_ingest
+    sources = [path for path in (train_path, test_path) if os.path.exists(path)]
+    if test_path not in sources:
+        print("Warning: Test dataset not found. Using only training data.")
+    dataset, ingested = open_or_ingest(sources, columnar_dir)
+    print(f"{'Ingested' if ingested else 'Opened'} columnar dataset '{columnar_dir}' "
+          f"({dataset.manifest['rows_read']} rows from {len(sources)} file(s))")
+    print(f"\nRemoved {dataset.manifest['duplicates_removed']} duplicate rows")
+    print(f"Unique samples for training: {len(dataset)}")
+    return dataset
+
+def synthetic_healthy(base_features, train_path, n_synthetic=1000):
+    """DataFrame of synthetic 'Healthy' samples (base features in the given order, then 'Disease')"""
     print("\nAugmenting data with synthetic 'Healthy' samples...")
     from module_b_scaling_bridge import ScalingBridge
+    from synthetic_generator import SyntheticGenerator
     
     # Initialize bridge (using training data to estimate ranges if needed, but we use physiological)
     bridge = ScalingBridge(train_path) 
     
-    n_synthetic = 1000
-    synthetic_data = []
-    
-    # Physiological ranges from ScalingBridge
-    ranges = bridge.physiological_ranges
-    
-    np.random.seed(42)
-    
-    for _ in range(n_synthetic):
-        sample = {}
-        for feature, (min_val, max_val) in ranges.items():
-            # Generate random value within ideal range
-            # Use a normal distribution centered in the range for more realism, 
-            # or uniform for broader coverage. Uniform is safer to force the whole range.
-            raw_val = np.random.uniform(min_val, max_val)
-            sample[feature] = raw_val
-            
-        # Scale the sample
-        scaled_sample = bridge.scale_features(sample)
-        scaled_sample['Disease'] = 'Healthy'
-        synthetic_data.append(scaled_sample)
-        
-    synthetic_df = pd.DataFrame(synthetic_data)
-    
-    # Ensure columns match
-    synthetic_df = synthetic_df[df.columns]
+    # Whole (n, F) matrix drawn uniformly from the physiological ranges in one call
+    generator = SyntheticGenerator(bridge, list(base_features), seed=42)
+    return generator.generate(n_synthetic, mode='uniform', label='Healthy')
+
+def augment_healthy(df, train_path, n_synthetic=1000):
+    """Append synthetic 'Healthy' samples drawn from the physiological ranges"""
+    # --- Data Augmentation for Healthy Class ---
+    synthetic_df = synthetic_healthy([col for col in df.columns if col != 'Disease'], train_path, n_synthetic)
     
     # Combine
     df = pd.concat([df, synthetic_df], ignore_index=True)
     print(f"Added {n_synthetic} synthetic Healthy samples")
     print(f"New dataset shape: {df.shape}")
     # -------------------------------------------
+    return df
 
-    # Prepare data
-    X, y, feature_names, label_encoder = prepare_data(df)
-    
-    # Split data: 80% Train, 20% Test
-    X_train_full, X_test, y_train_full, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
-    
-    # Split Train into Train and Validation (80% Train, 20% Val of the training set)
-    # We keep Val pure (no SMOTE) for honest early stopping/evaluation
-    X_train, X_val, y_train, y_val = train_test_split(
-        X_train_full, y_train_full, test_size=0.2, random_state=42, stratify=y_train_full
-    )
-    
-    print(f"\nTrain set (Before SMOTE): {X_train.shape[0]} samples")
-    
-    # Apply SMOTE to Training set ONLY
+def load_and_augment(train_path, test_path, n_synthetic=1000):
+    """Load and combine the datasets, drop duplicates and add synthetic Healthy samples"""
+    return augment_healthy(load_combined(train_path, test_path), train_path, n_synthetic)
+
+def build_oversampler(y_train, random_state=42, cache_dir=OVERSAMPLING_CACHE_DIR):
+    """SMOTE that raises minority classes of the training split to 80% of the majority class"""
     # Use aggressive sampling for minority classes to improve recall
     print("Applying SMOTE to balance training classes...")
     
@@ -256,72 +282,319 @@ def main():
     
     print(f"SMOTE sampling strategy: {sampling_strategy}")
     
-    smote = SMOTE(random_state=42, sampling_strategy=sampling_strategy, k_neighbors=3)
+    # Per-class neighbour index, chunked generation; reruns on unchanged data load the cached result
+    return SMOTEOversampler(sampling_strategy=sampling_strategy, k_neighbors=3, random_state=random_state,
+                            cache_dir=cache_dir)
+
+def oversample(X_train, y_train, random_state=42):
+    """SMOTE minority classes of the training split up to 80% of the majority class"""
+    smote = build_oversampler(y_train, random_state)
     X_train_resampled, y_train_resampled = smote.fit_resample(X_train, y_train)
+    if smote.cache_hit:
+        print("✓ SMOTE result loaded from cache")
+    return X_train_resampled, y_train_resampled
+
+def oversample_to_cache(X_train, y_train, cache_dir=OVERSAMPLING_CACHE_DIR, random_state=42):
+    """
+    SMOTE the training split into the oversampling cache and return the cache
+    entry directory; load_resampled() reopens it as memory maps, so the stage
+    cache stores a path instead of a second, fully loaded copy of the matrix.
+    """
+    smote = build_oversampler(y_train, random_state, cache_dir)
+    smote.fit_resample(X_train, y_train)
+    if smote.cache_hit:
+        print("✓ SMOTE result loaded from cache")
+    return smote.cache_entry
+
+def load_resampled(entry):
+    """Resampled training split (read-only memory maps) from an oversampling cache entry"""
+    try:
+        return load_result(entry)
+    except FileNotFoundError as e:
+        raise RuntimeError(f"{e}; rerun with --from-stage smote") from e
+
+def split_data(X, y, random_state=42):
+    """80/20 train/test split, then 80/20 train/validation split of the training part"""
+    # Split data: 80% Train, 20% Test
+    X_train_full, X_test, y_train_full, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=random_state, stratify=y
+    )
+    
+    # Split Train into Train and Validation (80% Train, 20% Val of the training set)
+    # We keep Val pure (no SMOTE) for honest early stopping/evaluation
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_train_full, y_train_full, test_size=0.2, random_state=random_state, stratify=y_train_full
+    )
     
-    print(f"Train set (After SMOTE):  {X_train_resampled.shape[0]} samples")
+    print(f"\nTrain set (Before SMOTE): {X_train.shape[0]} samples")
     print(f"Validation set:           {X_val.shape[0]} samples")
     print(f"Test set:                 {X_test.shape[0]} samples")
-    
-    # Save test split for evaluation
-    print("\nSaving test split to 'data/test_split.csv'...")
-    test_df_save = pd.DataFrame(X_test, columns=feature_names)
-    test_df_save['Disease'] = label_encoder.inverse_transform(y_test)
-    test_df_save.to_csv('data/test_split.csv', index=False)
-    
-    # Train models using Resampled Training data
-    xgb_model = train_xgboost(X_train_resampled, y_train_resampled, X_val, y_val, feature_names)
-    rf_model = train_random_forest(X_train_resampled, y_train_resampled, feature_names)
-    
+    return {'X_train': X_train, 'X_val': X_val, 'X_test': X_test,
+            'y_train': y_train, 'y_val': y_val, 'y_test': y_test}
+
+def prepare_columnar(dataset, synthetic_df, matrix_dir, chunk_rows=65_536):
+    """
+    prepare_data for the columnar store: the dataset rows, then the synthetic
+    rows, get their derived features chunk by chunk and are written to one
+    float32 memory-mapped matrix.
+    
+    Returns:
+        Tuple of (matrix path, y_encoded, feature_cols, label_encoder), as prepare_data
+        with the matrix path in place of X
+    """
+    from data_pipeline import write_matrix
+    base_features = list(dataset.features)
+    feature_cols = base_features + list(DERIVED_FEATURES)
+    
+    def with_derived(X):
+        X = np.asarray(X, dtype=np.float64)
+        columns = {f: X[:, i] for i, f in enumerate(base_features)}
+        return np.column_stack([X, *derive(columns.__getitem__)])
+    
+    blocks = (with_derived(X) for X, _ in dataset.iter_chunks(chunk_rows))
+    synthetic = with_derived(synthetic_df[base_features].values)
+    n_rows = len(dataset) + len(synthetic)
+    X_path = write_matrix(itertools.chain(blocks, [synthetic]), (n_rows, len(feature_cols)), matrix_dir)
+    
+    # Encode labels through the class table instead of materializing label strings
+    label_encoder = LabelEncoder().fit(np.concatenate([dataset.classes, synthetic_df['Disease'].unique()]))
+    codes = label_encoder.transform(dataset.classes)
+    y_encoded = np.concatenate([codes[dataset.labels()], label_encoder.transform(synthetic_df['Disease'])])
+    print(f"✓ Feature matrix {n_rows} x {len(feature_cols)} written to '{X_path}'")
+    return X_path, y_encoded, feature_cols, label_encoder
+
+def split_columnar(X_path, y, matrix_dir, random_state=42, chunk_rows=65_536):
+    """
+    split_data over a memory-mapped matrix: the same row partition, with each
+    part gathered chunk by chunk into its own memory-mapped matrix (paths in
+    place of the X arrays; open_split() reopens them).
+    """
+    from data_pipeline import open_matrix, write_matrix
+    split = split_data(np.arange(len(y)), y, random_state)
+    X = open_matrix(X_path)
+    for part in ('X_train', 'X_val', 'X_test'):
+        rows = split[part]
+        blocks = (X[rows[start:start + chunk_rows]] for start in range(0, len(rows), chunk_rows))
+        split[part] = write_matrix(blocks, (len(rows), X.shape[1]), matrix_dir)
+    return split
+
+def open_split(split):
+    """The split with memory maps in place of the matrix paths stored by split_columnar"""
+    from data_pipeline import open_matrix
+    return {name: open_matrix(value) if isinstance(value, str) else value for name, value in split.items()}
+
+def build_ensemble(xgb_model, rf_model, X_test, y_test, label_encoder):
+    """Soft-voting ensemble of the tuned models, with test-set results for all three"""
     # Evaluate models
     xgb_results = evaluate_model(xgb_model, X_test, y_test, label_encoder, "XGBoost")
     rf_results = evaluate_model(rf_model, X_test, y_test, label_encoder, "Random Forest")
     
     # --- Ensemble Learning (Voting Classifier) ---
     print("\n" + "="*50)
-    print("Training Voting Classifier (Ensemble)")
+    print("Building Voting Classifier (Ensemble)")
     print("="*50)
     
-    voting_clf = VotingClassifier(
+    # Both members are already fitted on the resampled training set; a
+    # VotingClassifier.fit would clone and retrain them with identical results
+    voting_clf = PrefitVotingClassifier(
         estimators=[('xgb', xgb_model), ('rf', rf_model)],
-        voting='soft',
         weights=[2, 1]  # Give XGBoost more weight (better at minority classes)
     )
     
-    voting_clf.fit(X_train_resampled, y_train_resampled)
     voting_results = evaluate_model(voting_clf, X_test, y_test, label_encoder, "Voting Ensemble")
+    return {'model': voting_clf, 'xgb_results': xgb_results, 'rf_results': rf_results,
+            'voting_results': voting_results}
+
+def build_shap_explainer(xgb_model):
+    """TreeExplainer over the XGBoost member (None if SHAP cannot build one)"""
+    print("\nGenerating SHAP Explainer...")
+    try:
+        # Use TreeExplainer for XGBoost
+        return shap.TreeExplainer(xgb_model)
+    except Exception as e:
+        print(f"Warning: Could not build SHAP explainer: {e}")
+        return None
+
+def save_artifacts(features, split, xgb_model, ensemble, population_model, explainer,
+                   model_dir='models', test_split_path='data/test_split.csv', train_path=TRAIN_PATH):
+    """Write the test split and model files, then publish them as a registry version"""
+    X, y, feature_names, label_encoder = features
+    
+    # Save test split for evaluation
+    print(f"\nSaving test split to '{test_split_path}'...")
+    test_df_save = pd.DataFrame(split['X_test'], columns=feature_names)
+    test_df_save['Disease'] = label_encoder.inverse_transform(split['y_test'])
+    test_df_save.to_csv(test_split_path, index=False)
     
     # Select best model (Voting is usually best, but let's be safe)
     # Actually, for this task, we prioritize the Ensemble for robustness
-    best_model = voting_clf
-    print(f"\n✓ Selected Voting Ensemble as best model (Recall: {voting_results['recall_weighted']:.4f})")
+    best_model = ensemble['model']
+    print(f"\n✓ Selected Voting Ensemble as best model "
+          f"(Recall: {ensemble['voting_results']['recall_weighted']:.4f})")
     
     # Save model and metadata
-    os.makedirs('models', exist_ok=True)
-    joblib.dump(best_model, 'models/best_model.pkl')
-    joblib.dump(label_encoder, 'models/label_encoder.pkl')
-    joblib.dump(feature_names, 'models/feature_names.pkl')
+    os.makedirs(model_dir, exist_ok=True)
+    joblib.dump(best_model, os.path.join(model_dir, 'best_model.pkl'))
+    joblib.dump(label_encoder, os.path.join(model_dir, 'label_encoder.pkl'))
+    joblib.dump(feature_names, os.path.join(model_dir, 'feature_names.pkl'))
+    
+    # Raw -> model space scaling used at serving time (same ranges the augmentation used)
+    from module_b_scaling_bridge import ScalingBridge
+    ScalingBridge(train_path).save(os.path.join(model_dir, 'scaling_bridge.pkl'))
+    
+    # --- Population Anomaly Model (out-of-distribution screening) ---
+    population_model.save(os.path.join(model_dir, 'population_anomaly.pkl'))
+    print(f"✓ Population anomaly model saved to '{model_dir}/population_anomaly.pkl' "
+          f"({len(population_model.classes)} classes, threshold d² > {population_model.threshold:.1f})")
     
     # --- SHAP Explainability ---
-    print("\nGenerating SHAP Explainer...")
     # SHAP works best with the underlying XGBoost model
     # We save the XGBoost component specifically for explanations
-    joblib.dump(xgb_model, 'models/shap_model.pkl')
-    
+    joblib.dump(xgb_model, os.path.join(model_dir, 'shap_model.pkl'))
+    if explainer is not None:
+        joblib.dump(explainer, os.path.join(model_dir, 'shap_explainer.pkl'))
+        print(f"✓ SHAP explainer saved to '{model_dir}/shap_explainer.pkl'")
+    
+    print(f"\n✓ Model saved to '{model_dir}/best_model.pkl'")
+    print(f"✓ Label encoder saved to '{model_dir}/label_encoder.pkl'")
+    print(f"✓ Feature names saved to '{model_dir}/feature_names.pkl'")
+    print(f"✓ Scaling bridge saved to '{model_dir}/scaling_bridge.pkl'")
+    
+    # Versioned copy that running web apps swap in without a restart
+    from model_registry import flat_artifacts, publish_version
+    version = publish_version(files=flat_artifacts(model_dir), model_dir=model_dir, metadata={
+        'source': 'module_a_train_model',
+        'recall_weighted': float(ensemble['voting_results']['recall_weighted'])
+    })
+    print(f"✓ Published and activated model version '{version}'")
+    return version
+
+def build_stages(train_path=TRAIN_PATH, test_path=TEST_PATH, model_dir='models',
+                 test_split_path='data/test_split.csv', oversampling_cache_dir=OVERSAMPLING_CACHE_DIR,
+                 columnar_dir=None, xgboost_external=False, tuning_cache_dir=TUNING_CACHE_DIR):
+    """
+    The training pipeline as cacheable stages.
+    Each stage's key covers its input stages, the listed data files, its
+    parameters and the source of the code it runs.
+    
+    Args:
+        columnar_dir: Load the CSVs through a columnar store in this directory
+            (data_pipeline) and keep the feature matrix and split on disk as memory
+            maps (under columnar_dir/matrices) instead of in-memory DataFrames/arrays
+        xgboost_external: Train XGBoost from an external-memory DMatrix
+            (fixed parameters) instead of the tuning search
+        tuning_cache_dir: Cache of hyperparameter trial scores
+    """
+    import feature_engineering
+    import oversampling
+    import population_anomaly
+    import synthetic_generator
+    import tuning
+    import ensemble
+    import module_b_scaling_bridge
+    import data_pipeline
+    
+    if columnar_dir:
+        # Data stays on disk: the dataset, feature matrix and split parts are memory maps
+        matrix_dir = os.path.join(columnar_dir, 'matrices')
+        data_stages = [
+            Stage('load', lambda: load_columnar(columnar_dir, train_path, test_path),
+                  files=(train_path, test_path), params={'columnar_dir': columnar_dir},
+                  code=(load_columnar, data_pipeline)),
+            Stage('augment', lambda dataset: (dataset, synthetic_healthy(dataset.features, train_path)),
+                  inputs=('load',), files=(train_path,),
+                  code=(synthetic_healthy, synthetic_generator, module_b_scaling_bridge)),
+            Stage('features', lambda augmented: prepare_columnar(*augmented, matrix_dir), inputs=('augment',),
+                  params={'matrix_dir': matrix_dir}, code=(prepare_columnar, feature_engineering, data_pipeline)),
+            Stage('split', lambda features: split_columnar(features[0], features[1], matrix_dir),
+                  inputs=('features',), params={'matrix_dir': matrix_dir}, code=(split_columnar, split_data)),
+        ]
+    else:
+        data_stages = [
+            Stage('load', lambda: load_combined(train_path, test_path),
+                  files=(train_path, test_path), code=(load_combined, load_data)),
+            Stage('augment', lambda df: augment_healthy(df, train_path), inputs=('load',), files=(train_path,),
+                  code=(augment_healthy, synthetic_healthy, synthetic_generator, module_b_scaling_bridge)),
+            Stage('features', lambda df: prepare_data(df.copy()), inputs=('augment',),
+                  code=(prepare_data, feature_engineering)),
+            Stage('split', lambda features: split_data(features[0], features[1]), inputs=('features',),
+                  code=(split_data,)),
+        ]
+    if xgboost_external:
+        xgboost_stage = Stage('xgboost', lambda entry, split, features: train_xgboost_external_memory(
+                                  *load_resampled(entry), open_split(split)['X_val'], split['y_val'], features[3]),
+                              inputs=('smote', 'split', 'features'),
+                              code=(train_xgboost_external_memory, load_resampled, open_split, data_pipeline))
+    else:
+        xgboost_stage = Stage('xgboost', lambda entry, features: train_xgboost(
+                                  *load_resampled(entry), features[2], cache_dir=tuning_cache_dir),
+                              inputs=('smote', 'features'), code=(train_xgboost, load_resampled, tuning))
+    
+    stages = data_stages + [
+        # Output is the oversampling cache entry; later stages reopen it as memory maps
+        Stage('smote', lambda split: oversample_to_cache(
+                  open_split(split)['X_train'], split['y_train'], oversampling_cache_dir),
+              inputs=('split',), params={'cache_dir': oversampling_cache_dir},
+              code=(oversample_to_cache, build_oversampler, open_split, oversampling)),
+        xgboost_stage,
+        Stage('random_forest', lambda entry, features: train_random_forest(
+                  *load_resampled(entry), features[2], cache_dir=tuning_cache_dir),
+              inputs=('smote', 'features'), code=(train_random_forest, load_resampled, tuning)),
+        Stage('ensemble', lambda xgb_model, rf_model, split, features: build_ensemble(
+                  xgb_model, rf_model, open_split(split)['X_test'], split['y_test'], features[3]),
+              inputs=('xgboost', 'random_forest', 'split', 'features'),
+              code=(build_ensemble, evaluate_model, open_split, ensemble)),
+        Stage('population', lambda: population_anomaly.fit_from_csv(train_path),
+              files=(train_path,), code=(population_anomaly,)),
+        Stage('shap', build_shap_explainer, inputs=('xgboost',)),
+        Stage('save', lambda features, split, xgb_model, ensemble_output, population_model, explainer: save_artifacts(
+                  features, open_split(split), xgb_model, ensemble_output, population_model, explainer,
+                  model_dir, test_split_path, train_path),
+              inputs=('features', 'split', 'xgboost', 'ensemble', 'population', 'shap'),
+              code=(save_artifacts, open_split), cache=False),
+    ]
+    assert tuple(stage.name for stage in stages) == STAGES
+    return stages
+
+def main(argv=None):
+    """Main training pipeline"""
+    parser = argparse.ArgumentParser(description='Train the disease prediction model (cached stages)')
+    parser.add_argument('--from-stage', choices=STAGES,
+                        help='Recompute this stage and every later one; earlier stages come from the cache')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute every stage')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='Stage cache directory')
+    parser.add_argument('--oversampling-cache-dir', default=OVERSAMPLING_CACHE_DIR,
+                        help='Where SMOTE results are stored as memory maps')
+    parser.add_argument('--tuning-cache-dir', default=TUNING_CACHE_DIR,
+                        help='Where hyperparameter trial scores are cached')
+    parser.add_argument('--columnar', metavar='DIR',
+                        help='Load the CSVs through a columnar store in DIR (ingested when stale) and keep '
+                             'the feature matrix and split as memory maps under DIR/matrices')
+    parser.add_argument('--xgboost-external', action='store_true',
+                        help='Train XGBoost from an external-memory DMatrix (fixed parameters, no tuning)')
+    parser.add_argument('--model-dir', default='models', help='Where to write the model files')
+    parser.add_argument('--test-split', default='data/test_split.csv', help='Where to write the test split')
+    parser.add_argument('--list-stages', action='store_true', help='Print the stage names and exit')
+    args = parser.parse_args(argv)
+    
+    if args.list_stages:
+        print('\n'.join(STAGES))
+        return None
+    
+    stages = build_stages(model_dir=args.model_dir, test_split_path=args.test_split,
+                          oversampling_cache_dir=args.oversampling_cache_dir,
+                          columnar_dir=args.columnar, xgboost_external=args.xgboost_external,
+                          tuning_cache_dir=args.tuning_cache_dir)
     try:
-        # Use TreeExplainer for XGBoost
-        explainer = shap.TreeExplainer(xgb_model)
-        joblib.dump(explainer, 'models/shap_explainer.pkl')
-        print("✓ SHAP explainer saved to 'models/shap_explainer.pkl'")
-    except Exception as e:
-        print(f"Warning: Could not save SHAP explainer: {e}")
-    
-    print(f"\n✓ Model saved to 'models/best_model.pkl'")
-    print(f"✓ Label encoder saved to 'models/label_encoder.pkl'")
-    print(f"✓ Feature names saved to 'models/feature_names.pkl'")
-    
-    return best_model, label_encoder, feature_names, xgb_results, rf_results
+        outputs = run_stages(stages, cache_dir=args.cache_dir, from_stage=args.from_stage,
+                             use_cache=not args.no_cache)
+    except RuntimeError as e:
+        raise SystemExit(f"❌ {e}")
+    
+    X, y, feature_names, label_encoder = outputs['features']
+    ensemble_output = outputs['ensemble']
+    return (ensemble_output['model'], label_encoder, feature_names,
+            ensemble_output['xgb_results'], ensemble_output['rf_results'])
 
 if __name__ == "__main__":
     main()
-
@@ -55,6 +55,9 @@ class ScalingBridge:
             'MAP': (60, 100)  # Mean Arterial Pressure
         }
         
+        # Bound arrays per feature order, built on first use (see range_bounds)
+        self._bounds_cache = {}
+        
         # Estimate min/max from dataset if provided
         if data_path:
             self._estimate_ranges_from_data(data_path)
@@ -195,6 +198,71 @@ class ScalingBridge:
         scaled_array = np.array([scaled_dict[feature] for feature in feature_order])
         return scaled_array
     
+    def scale_matrix(self, raw_matrix, feature_order):
+        """
+        Scale a matrix of raw values in one vectorized pass
+        
+        Args:
+            raw_matrix: Array of shape (n_samples, n_features) with raw values
+            feature_order: List of feature names matching the matrix columns
+            
+        Returns:
+            Numpy array of scaled features clipped to [0, 1]
+        """
+        min_arr = np.array([self.min_values[f] for f in feature_order], dtype=float)
+        max_arr = np.array([self.max_values[f] for f in feature_order], dtype=float)
+        scaled = (np.asarray(raw_matrix, dtype=float) - min_arr) / (max_arr - min_arr)
+        return np.clip(scaled, 0, 1)
+    
+    def range_bounds(self, feature_order):
+        """
+        Normal and extended physiological bounds as arrays aligned to a feature order.
+        The extended range widens the normal range by its own size on both sides.
+        Computed once per feature order and reused for every check.
+        
+        Args:
+            feature_order: List of feature names matching the matrix columns
+            
+        Returns:
+            Dict with 'normal_min', 'normal_max', 'extended_min', 'extended_max'
+            arrays (features without a range get -inf / +inf) and 'expected_range' labels
+        """
+        key = tuple(feature_order)
+        bounds = self._bounds_cache.get(key)
+        if bounds is None:
+            ranges = [self.physiological_ranges.get(f, (-np.inf, np.inf)) for f in key]
+            normal_min = np.array([r[0] for r in ranges], dtype=float)
+            normal_max = np.array([r[1] for r in ranges], dtype=float)
+            range_size = np.where(np.isfinite(normal_max - normal_min), normal_max - normal_min, 0)
+            bounds = {
+                'normal_min': normal_min,
+                'normal_max': normal_max,
+                'extended_min': normal_min - range_size,
+                'extended_max': normal_max + range_size,
+                'expected_range': [f"{lo:.2f} - {hi:.2f}" for lo, hi in ranges]
+            }
+            self._bounds_cache[key] = bounds
+        return bounds
+    
+    def data_quality_masks(self, raw_matrix, feature_order):
+        """
+        Screen a matrix of raw values against the physiological ranges
+        
+        Args:
+            raw_matrix: Array of shape (n_samples, n_features) with raw values
+            feature_order: List of feature names matching the matrix columns
+            
+        Returns:
+            Tuple of boolean (issues, warnings) arrays of shape (n_samples, n_features):
+            issues are values outside the extended range, warnings are values outside
+            the normal range but inside the extended range. NaN never flags.
+        """
+        bounds = self.range_bounds(feature_order)
+        raw_matrix = np.atleast_2d(np.asarray(raw_matrix, dtype=float))
+        issues = (raw_matrix < bounds['extended_min']) | (raw_matrix > bounds['extended_max'])
+        outside = (raw_matrix < bounds['normal_min']) | (raw_matrix > bounds['normal_max'])
+        return issues, outside & ~issues
+    
     def get_feature_range(self, feature_name):
         """
         Get the estimated min/max range for a feature
@@ -251,6 +319,13 @@ def main():
     for feature, value in scaled.items():
         print(f"  {feature}: {value:.4f}")
     
+    print("\nData Quality:")
+    features = list(sample_raw)
+    issues, warnings = bridge.data_quality_masks([list(sample_raw.values())], features)
+    for j, feature in enumerate(features):
+        status = "critical" if issues[0, j] else "warning" if warnings[0, j] else "ok"
+        print(f"  {feature}: {status}")
+    
     # Save bridge
     import os
     os.makedirs('models', exist_ok=True)
@@ -0,0 +1,250 @@
+"""
+Multi-Seed Runner
+Trains and evaluates the module_a pipeline (split, SMOTE, XGBoost and Random
+Forest tuning, voting ensemble) once per seed or per cross-validation fold in a
+process pool. The prepared data is written once as .npy files that every worker
+opens as a read-only memory map. Per-class recall from evaluate_model is
+aggregated into mean, variance and range across runs.
+
+Usage:
+    python multi_seed_runner.py --seeds 5 -o reports/multi_seed.json
+    python multi_seed_runner.py --cv 5
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold, train_test_split
+
+MODELS = ('xgboost', 'random_forest', 'ensemble')
+
+# Per-process read-only views of the shared data (set by _init_worker)
+_data = None
+
+
+def _init_worker(data_dir):
+    global _data
+    with open(os.path.join(data_dir, 'meta.json')) as f:
+        meta = json.load(f)
+    _data = {
+        'X': np.load(os.path.join(data_dir, 'X.npy'), mmap_mode='r'),
+        'y': np.load(os.path.join(data_dir, 'y.npy'), mmap_mode='r'),
+        'feature_names': meta['feature_names'],
+        'classes': np.array(meta['classes'], dtype=object),
+    }
+
+
+def write_shared_data(data_dir, X, y, feature_names, classes):
+    """Store the prepared matrix and labels as .npy files for the workers' memory maps"""
+    os.makedirs(data_dir, exist_ok=True)
+    np.save(os.path.join(data_dir, 'X.npy'), np.ascontiguousarray(X, dtype=float))
+    np.save(os.path.join(data_dir, 'y.npy'), np.asarray(y))
+    with open(os.path.join(data_dir, 'meta.json'), 'w') as f:
+        json.dump({'feature_names': list(feature_names), 'classes': [str(c) for c in classes]}, f)
+
+
+def run_task(task):
+    """
+    One pipeline run (executed inside pool workers).
+
+    Args:
+        task: Dict with 'run' (name), 'seed' and, for CV runs, 'fold' and 'n_folds'
+
+    Returns:
+        Dict of per-model metrics with per-class recall
+    """
+    import module_a_train_model as pipeline
+    from ensemble import PrefitVotingClassifier
+    from sklearn.metrics import recall_score
+    from sklearn.preprocessing import LabelEncoder
+
+    X, y = _data['X'], _data['y']
+    label_encoder = LabelEncoder().fit(_data['classes'])
+    seed = task['seed']
+    started = time.perf_counter()
+
+    if 'fold' in task:
+        folds = StratifiedKFold(task['n_folds'], shuffle=True, random_state=seed).split(X, y)
+        train_idx, test_idx = list(folds)[task['fold']]
+        X_train_full, X_test, y_train_full, y_test = X[train_idx], X[test_idx], y[train_idx], y[test_idx]
+    else:
+        X_train_full, X_test, y_train_full, y_test = train_test_split(
+            X, y, test_size=0.2, random_state=seed, stratify=y
+        )
+    # Same train/validation split as module_a, so models see the same amount of training data
+    X_train, _, y_train, _ = train_test_split(
+        X_train_full, y_train_full, test_size=0.2, random_state=seed, stratify=y_train_full
+    )
+
+    # The pipeline functions print progress; keep worker output out of the runner's report
+    with contextlib.redirect_stdout(io.StringIO()):
+        X_res, y_res = pipeline.oversample(X_train, y_train, random_state=seed)
+        xgb_model = pipeline.train_xgboost(X_res, y_res, _data['feature_names'],
+                                           random_state=seed, n_jobs=1, n_candidates=task['n_candidates'])
+        rf_model = pipeline.train_random_forest(X_res, y_res, _data['feature_names'],
+                                                random_state=seed, n_jobs=1, n_candidates=task['n_candidates'])
+        ensemble = PrefitVotingClassifier([('xgb', xgb_model), ('rf', rf_model)], weights=[2, 1])
+        results = {name: pipeline.evaluate_model(model, X_test, y_test, label_encoder, name)
+                   for name, model in zip(MODELS, (xgb_model, rf_model, ensemble))}
+
+    classes = list(label_encoder.classes_)
+    metrics = {}
+    for name, result in results.items():
+        per_class = recall_score(result['y_test'], result['y_pred'], labels=classes, average=None,
+                                 zero_division=np.nan)
+        metrics[name] = {
+            'accuracy': float(result['accuracy']),
+            'recall_weighted': float(result['recall_weighted']),
+            'recall_macro': float(result['recall_macro']),
+            'per_class_recall': {c: float(r) for c, r in zip(classes, per_class)}
+        }
+    return {'run': task['run'], 'seed': seed, 'fold': task.get('fold'), 'n_test': len(y_test),
+            'seconds': round(time.perf_counter() - started, 2), 'metrics': metrics}
+
+
+def _stats(values):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) == 0:
+        return {'n': 0, 'mean': None, 'variance': None, 'std': None, 'min': None, 'max': None}
+    ddof = 1 if len(values) > 1 else 0  # Sample variance across runs
+    return {'n': int(len(values)), 'mean': float(values.mean()), 'variance': float(values.var(ddof=ddof)),
+            'std': float(values.std(ddof=ddof)), 'min': float(values.min()), 'max': float(values.max())}
+
+
+def aggregate(runs, classes):
+    """Mean, sample variance and range of every metric and per-class recall across runs"""
+    summary = {}
+    for name in MODELS:
+        metrics = [run['metrics'][name] for run in runs]
+        summary[name] = {
+            metric: _stats([m[metric] for m in metrics]) for metric in ('accuracy', 'recall_weighted', 'recall_macro')
+        }
+        summary[name]['per_class_recall'] = {
+            c: _stats([m['per_class_recall'][c] for m in metrics]) for c in classes
+        }
+    return summary
+
+
+def format_report(report):
+    """Markdown tables of the aggregated metrics"""
+    lines = [f"# Multi-seed evaluation ({report['mode']}, {len(report['runs'])} runs)", '',
+             f"Generated {report['created_at']}; {report['n_samples']} samples, "
+             f"{report['workers']} worker processes, {report['seconds']:.1f}s total.", '']
+    for name in MODELS:
+        summary = report['summary'][name]
+        lines += [f"## {name}", '', '| Metric | Mean | Std | Variance | Min | Max |',
+                  '|--------|------|-----|----------|-----|-----|']
+        rows = [(m, summary[m]) for m in ('accuracy', 'recall_weighted', 'recall_macro')]
+        rows += [(f'recall[{c}]', s) for c, s in summary['per_class_recall'].items()]
+        for label, s in rows:
+            if s['n'] == 0:
+                lines.append(f"| {label} | - | - | - | - | - |")
+            else:
+                lines.append(f"| {label} | {s['mean']:.4f} | {s['std']:.4f} | {s['variance']:.5f} | "
+                             f"{s['min']:.4f} | {s['max']:.4f} |")
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def run(seeds=None, n_folds=None, base_seed=42, processes=None, n_candidates=12, data_dir=None):
+    """
+    Prepare the data once, then run the pipeline per seed (or CV fold) in a process pool.
+
+    Args:
+        seeds: Number of seeds (base_seed, base_seed + 1, ...); ignored when n_folds is set
+        n_folds: Run stratified K-fold CV instead (test = one fold per run)
+        base_seed: First seed (the CV shuffle seed in CV mode)
+        processes: Worker processes (None = CPU count)
+        n_candidates: Successive-halving candidates per model
+        data_dir: Where to write the shared .npy files (default: temporary directory)
+
+    Returns:
+        Report dict with 'runs' and aggregated 'summary'
+    """
+    import module_a_train_model as pipeline
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = pipeline.load_and_augment('data/Blood_samples_dataset_balanced_2(f).csv',
+                                       'data/blood_samples_dataset_test.csv')
+        X, y, feature_names, label_encoder = pipeline.prepare_data(df)
+
+    if n_folds:
+        mode = f'{n_folds}-fold CV'
+        tasks = [{'run': f'fold{k}', 'seed': base_seed, 'fold': k, 'n_folds': n_folds} for k in range(n_folds)]
+    else:
+        mode = f'{seeds} seeds'
+        tasks = [{'run': f'seed{base_seed + k}', 'seed': base_seed + k} for k in range(seeds)]
+    for task in tasks:
+        task['n_candidates'] = n_candidates
+
+    processes = min(processes or os.cpu_count() or 1, len(tasks))
+    own_dir = data_dir is None
+    data_dir = data_dir or tempfile.mkdtemp(prefix='multi-seed-')
+    try:
+        write_shared_data(data_dir, X, y, feature_names, label_encoder.classes_)
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(data_dir,)) as pool:
+            runs = []
+            for result in pool.imap_unordered(run_task, tasks):
+                runs.append(result)
+                ensemble = result['metrics']['ensemble']
+                print(f"  {result['run']:<8} ensemble macro recall {ensemble['recall_macro']:.4f} "
+                      f"({result['seconds']:.1f}s)")
+    finally:
+        if own_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    runs.sort(key=lambda r: (r['seed'], r['fold'] if r['fold'] is not None else -1))
+    classes = [str(c) for c in label_encoder.classes_]
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'mode': mode,
+        'n_samples': int(len(y)),
+        'workers': processes,
+        'n_candidates': n_candidates,
+        'seconds': round(time.perf_counter() - started, 2),
+        'classes': classes,
+        'runs': runs,
+        'summary': aggregate(runs, classes)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train and evaluate the pipeline across seeds or CV folds')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--seeds', type=int, default=5, help='Number of seeds (default: 5)')
+    group.add_argument('--cv', type=int, help='Stratified K-fold cross-validation instead of seeds')
+    parser.add_argument('--base-seed', type=int, default=42, help='First seed / CV shuffle seed')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--candidates', type=int, default=12, help='Tuning candidates per model and run')
+    parser.add_argument('-o', '--output', default='reports/multi_seed.json',
+                        help='JSON report (a Markdown summary is written next to it)')
+    args = parser.parse_args()
+
+    print("="*60)
+    print("MULTI-SEED TRAINING AND EVALUATION")
+    print("="*60)
+    report = run(seeds=args.seeds, n_folds=args.cv, base_seed=args.base_seed, processes=args.processes,
+                 n_candidates=args.candidates)
+
+    markdown = format_report(report)
+    print('\n' + markdown)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    with open(os.path.splitext(args.output)[0] + '.md', 'w') as f:
+        f.write(markdown + '\n')
+    print(f"✓ Report saved to '{args.output}' and '{os.path.splitext(args.output)[0]}.md'")
+
+
+if __name__ == "__main__":
+    main()
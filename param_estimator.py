@@ -3,6 +3,7 @@ Parameter Estimator
 Estimates missing clinical parameters based on symptoms, demographics, and population averages.
 """
 import random
+import numpy as np
 
 class ParameterEstimator:
     def __init__(self):
@@ -77,3 +78,45 @@ class ParameterEstimator:
                 estimated_values[feature] = base_value * random.uniform(0.95, 1.05)
                 
         return estimated_values
+
+    def estimate_missing_matrix(self, extracted_list, implied_list, demographics_list=None, seed=None):
+        """
+        Bulk version of estimate_missing_values for many patients at once.
+        
+        Args:
+            extracted_list: List of extracted value dicts (one per patient)
+            implied_list: List of implied parameter dicts from SymptomMapper
+            demographics_list: List of demographics dicts (optional)
+            seed: Seed for the random variation (optional)
+            
+        Returns:
+            Tuple of (matrix of shape (n_patients, n_features), feature name list)
+        """
+        rng = np.random.default_rng(seed)
+        features = list(self.healthy_defaults.keys())
+        col = {f: i for i, f in enumerate(features)}
+        n = len(extracted_list)
+        
+        # Healthy defaults with ±5% variation, drawn for the whole matrix at once
+        base = np.tile(np.array([self.healthy_defaults[f] for f in features], dtype=float), (n, 1))
+        if demographics_list:
+            female = np.array([bool(d) and d.get('sex') == 'Female' for d in demographics_list])
+            base[female, col['Hemoglobin']] = 13.5
+            base[female, col['Creatinine']] = 0.7
+        matrix = base * rng.uniform(0.95, 1.05, size=base.shape)
+        
+        # Symptom implications (most severe wins) with ±10% variation
+        implied_jitter = rng.uniform(0.9, 1.1, size=base.shape)
+        for row, implied_params in enumerate(implied_list):
+            for feature, implications in implied_params.items():
+                if feature in col:
+                    value = max(implications, key=lambda x: x['severity'])['value']
+                    matrix[row, col[feature]] = value * implied_jitter[row, col[feature]]
+        
+        # Values the patient actually reported are used as-is
+        for row, extracted in enumerate(extracted_list):
+            for feature, value in extracted.items():
+                if feature in col:
+                    matrix[row, col[feature]] = value
+        
+        return matrix, features
@@ -0,0 +1,184 @@
+"""
+Population Anomaly Model
+Statistical out-of-distribution scoring fitted on the training dataset.
+Holds per-class means and Cholesky-whitened covariances so the Mahalanobis
+distance of a whole batch to every class is one matrix multiply.
+"""
+import numpy as np
+import pandas as pd
+import joblib
+from scipy.stats import chi2
+
+
+class PopulationAnomalyModel:
+    """
+    Per-class Gaussian model of the (scaled) training panels.
+
+    For class k with mean mu_k and covariance C_k = L_k L_k^T, the whitening
+    matrix W_k = L_k^-1 gives d_k(x)^2 = ||W_k x - W_k mu_k||^2. All W_k^T are
+    stacked into one (n_features, n_classes * n_features) matrix at fit time.
+    """
+
+    def __init__(self, shrinkage=0.5, regularization=1e-2, quantile=0.999):
+        """
+        Initialize Population Anomaly Model
+
+        Args:
+            shrinkage: Weight of the pooled covariance mixed into each class covariance
+                       (the training set has few unique panels per class)
+            regularization: Ridge added to the covariance diagonal
+            quantile: Chi-square quantile used as the out-of-distribution threshold
+        """
+        self.shrinkage = shrinkage
+        self.regularization = regularization
+        self.quantile = quantile
+
+        self.feature_names = None
+        self.classes = None
+        self.means = None  # (n_classes, n_features)
+        self.whitening = None  # (n_classes, n_features, n_features)
+        self.threshold = None
+        self._compile()
+
+    def _compile(self):
+        """Stack the whitening matrices for single-matmul scoring"""
+        self._column_cache = {}
+        if self.whitening is None:
+            self._projection = None
+            self._offsets = None
+            return
+        n_classes, n_features, _ = self.whitening.shape
+        # Column block k holds W_k^T, so X @ projection gives [W_1 x, ..., W_K x]
+        self._projection = np.concatenate([w.T for w in self.whitening], axis=1)
+        self._offsets = np.einsum('kij,kj->ki', self.whitening, self.means).reshape(-1)
+
+    def fit(self, X, y, feature_names):
+        """
+        Fit per-class means and whitening matrices.
+
+        Args:
+            X: Array of shape (n_samples, n_features) in model (scaled) space
+            y: Class label per row
+            feature_names: Column names of X
+        """
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y)
+        self.feature_names = list(feature_names)
+        self.classes = np.unique(y)
+        n_features = X.shape[1]
+
+        pooled = np.cov(X, rowvar=False)
+        ridge = self.regularization * np.eye(n_features)
+
+        means, whitening = [], []
+        for cls in self.classes:
+            X_cls = X[y == cls]
+            mean = X_cls.mean(axis=0)
+            cov = np.cov(X_cls, rowvar=False) if len(X_cls) > 1 else np.zeros((n_features, n_features))
+            cov = (1 - self.shrinkage) * cov + self.shrinkage * pooled + ridge
+            chol = np.linalg.cholesky(cov)
+            means.append(mean)
+            whitening.append(np.linalg.solve(chol, np.eye(n_features)))
+
+        self.means = np.array(means)
+        self.whitening = np.array(whitening)
+        self.threshold = float(chi2.ppf(self.quantile, df=n_features))
+        self._compile()
+        return self
+
+    def _columns(self, feature_order):
+        """Column indices that pick the model features out of a wider matrix"""
+        key = tuple(feature_order)
+        if key not in self._column_cache:
+            index = {f: i for i, f in enumerate(key)}
+            self._column_cache[key] = np.array([index[f] for f in self.feature_names])
+        return self._column_cache[key]
+
+    def distances(self, X, feature_order=None):
+        """
+        Squared Mahalanobis distance of every row to every class.
+
+        Args:
+            X: Array of shape (n_samples, n_columns) in scaled space
+            feature_order: Column names of X (defaults to the fitted feature order)
+
+        Returns:
+            Array of shape (n_samples, n_classes)
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        if feature_order is not None:
+            X = X[:, self._columns(feature_order)]
+        z = X @ self._projection - self._offsets
+        return np.square(z).reshape(len(X), len(self.classes), -1).sum(axis=2)
+
+    def score(self, X, feature_order=None):
+        """
+        Score a batch of panels.
+
+        Returns:
+            Dict with 'distance' (to the nearest class), 'nearest_class' and
+            boolean 'out_of_distribution' arrays, one entry per row
+        """
+        d2 = self.distances(X, feature_order)
+        nearest = np.argmin(d2, axis=1)
+        distance = d2[np.arange(len(d2)), nearest]
+        return {
+            'distance': distance,
+            'nearest_class': self.classes[nearest],
+            'out_of_distribution': distance > self.threshold
+        }
+
+    def save(self, filepath):
+        """Save fitted parameters"""
+        joblib.dump({
+            'feature_names': self.feature_names,
+            'classes': self.classes,
+            'means': self.means,
+            'whitening': self.whitening,
+            'threshold': self.threshold,
+            'shrinkage': self.shrinkage,
+            'regularization': self.regularization,
+            'quantile': self.quantile
+        }, filepath)
+
+    @classmethod
+    def load(cls, filepath):
+        """Load fitted parameters"""
+        data = joblib.load(filepath)
+        model = cls(data['shrinkage'], data['regularization'], data['quantile'])
+        model.feature_names = data['feature_names']
+        model.classes = data['classes']
+        model.means = data['means']
+        model.whitening = data['whitening']
+        model.threshold = data['threshold']
+        model._compile()
+        return model
+
+
+def fit_from_csv(data_path, **kwargs):
+    """Fit on the unique panels of a training CSV (base features, 'Disease' target)"""
+    df = pd.read_csv(data_path).drop_duplicates()
+    feature_cols = [col for col in df.columns if col != 'Disease']
+    return PopulationAnomalyModel(**kwargs).fit(df[feature_cols].values, df['Disease'].values, feature_cols)
+
+
+def main():
+    """Fit the population model and check it against the held-out test file"""
+    model = fit_from_csv('data/Blood_samples_dataset_balanced_2(f).csv')
+    print(f"✓ Fitted {len(model.classes)} classes over {len(model.feature_names)} features "
+          f"(threshold d² > {model.threshold:.1f})")
+
+    test = pd.read_csv('data/blood_samples_dataset_test.csv')
+    scores = model.score(test[model.feature_names].values)
+    flagged = pd.Series(scores['out_of_distribution']).groupby(test['Disease']).mean()
+    print("\nOut-of-distribution rate on test file by class:")
+    for disease, rate in flagged.items():
+        print(f"  {disease:<10} {rate:6.1%}")
+
+    model.save('models/population_anomaly.pkl')
+    print("\n✓ Population anomaly model saved to 'models/population_anomaly.pkl'")
+    return model
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,57 @@ Prevention Advisor
 Provides disease-specific prevention and management advice.
 """
 
+
+class LabelPrefixIndex:
+    """
+    Character trie over model class labels.
+    Resolves aliases such as 'Heart Disease' or 'thalassemia' to the truncated
+    labels the model emits ('Heart Di', 'Thalasse') in O(len(label)).
+    """
+
+    def __init__(self, labels):
+        self.root = {}
+        for label in labels:
+            node = self.root
+            for ch in label.lower():
+                node = node.setdefault(ch, {})
+            node[None] = label  # Terminal marker
+
+    def lookup(self, text):
+        """
+        Find the label for `text`.
+
+        Returns the longest label that is a prefix of `text`; otherwise the
+        label that `text` is a prefix of, if that label is unique. None if no match.
+        """
+        node = self.root
+        best = None
+        for ch in text.lower():
+            if None in node:
+                best = node[None]
+            node = node.get(ch)
+            if node is None:
+                return best
+        if None in node:
+            return node[None]
+        if best is not None:
+            return best
+
+        # `text` is a prefix of one or more labels: accept only an unambiguous completion
+        completions = []
+        stack = [node]
+        while stack and len(completions) < 2:
+            current = stack.pop()
+            for key, child in current.items():
+                if key is None:
+                    completions.append(child)
+                else:
+                    stack.append(child)
+        return completions[0] if len(completions) == 1 else None
+
+
 class PreventionAdvisor:
-    def __init__(self):
+    def __init__(self, labels=None):
         self.advice_db = {
             'Diabetes': {
                 'description': "A metabolic disorder characterized by high blood sugar levels.",
@@ -103,14 +152,78 @@ class PreventionAdvisor:
             }
         }
 
+        
+        self.compile(labels)
+
+    def compile(self, labels=None):
+        """
+        Build the label index and pre-render each disease's advice into
+        ready-to-emit text fragments.
+        
+        Args:
+            labels: Model class labels (label_encoder.classes_). Defaults to advice_db keys.
+        """
+        if labels is None:
+            labels = list(self.advice_db.keys())
+        
+        # Map every model label onto an advice entry once, so lookups never scan advice_db
+        label_to_key = {}
+        for label in labels:
+            label = str(label)
+            if label in self.advice_db:
+                label_to_key[label] = label
+            else:
+                for key in self.advice_db:
+                    if key in label or label in key:
+                        label_to_key[label] = key
+                        break
+                else:
+                    label_to_key[label] = 'Healthy'
+        for key in self.advice_db:
+            label_to_key.setdefault(key, key)
+        
+        self.label_to_key = label_to_key
+        self.index = LabelPrefixIndex(label_to_key.keys())
+        self._resolved = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        self.compiled = {}
+        for key, advice in self.advice_db.items():
+            bullet = '✓' if key == 'Healthy' else '•'
+            self.compiled[key] = {
+                'analysis': f"**Analysis:**\n{advice['description']}\n\n",
+                'actions': (
+                    "\n**Recommended Actions:**\n"
+                    + "".join(f"- {action}\n" for action in advice['immediate_actions'])
+                    + "\n**Prevention & Lifestyle:**\n"
+                    + "".join(f"- {tip}\n" for tip in advice['lifestyle'])
+                ),
+                'recommendations': [
+                    f"{bullet} {item}" for item in advice['immediate_actions'] + advice['lifestyle'] + advice['diet']
+                ]
+            }
+
+    def resolve(self, disease):
+        """Resolve a model label or alias to its advice_db key"""
+        key = self._resolved.get(disease)
+        if key is not None:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+            label = self.index.lookup(disease)
+            key = self.label_to_key[label] if label is not None else 'Healthy'  # Fallback
+            self._resolved[disease] = key
+        return key
+
     def get_advice(self, disease):
         """Get prevention advice for a specific disease"""
-        # Handle potential key mismatches
-        if disease not in self.advice_db:
-            # Try partial match
-            for key in self.advice_db:
-                if key in disease or disease in key:
-                    return self.advice_db[key]
-            return self.advice_db['Healthy'] # Fallback
-            
-        return self.advice_db[disease]
+        return self.advice_db[self.resolve(disease)]
+
+    def get_compiled(self, disease):
+        """Get the pre-rendered text fragments for a specific disease"""
+        return self.compiled[self.resolve(disease)]
+
+    def get_recommendations(self, disease):
+        """Get the bulleted recommendation lines used in PDF reports"""
+        return self.compiled[self.resolve(disease)]['recommendations']
@@ -0,0 +1,203 @@
+"""
+Request Profiling
+Opt-in per-request profiling for the Flask app. A request is profiled when an
+admin asks for it (X-Profile header or ?profile= query flag) or when it is picked
+by the sampling rate. Captures go to instance/profiles/ and are listed at
+/admin/profiles. When profiling is disabled no hooks or routes are registered.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import abort, g, jsonify, request, send_from_directory, Response
+from flask_login import current_user, login_required
+
+MODES = ('cprofile', 'sample')
+
+
+class StackSampler:
+    """
+    Lightweight sampling profiler for one thread: a daemon thread records the
+    target thread's stack every `interval` seconds. Output is in collapsed-stack
+    format (one 'frame;frame;frame count' line per stack), usable by flamegraph tools.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """
+    Flask extension. Configuration (app.config):
+        PROFILING_ENABLED: Master switch; when False nothing is registered
+        PROFILING_SAMPLE_RATE: Fraction of requests profiled without being asked
+        PROFILING_SAMPLE_MODE: 'cprofile' or 'sample' for sampled requests
+        PROFILING_MAX_CAPTURES: Oldest captures beyond this count are deleted
+        ADMIN_USERNAMES: Users allowed to request profiles and list captures
+    """
+
+    def __init__(self, app=None):
+        self.profile_dir = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not app.config.get('PROFILING_ENABLED', False):
+            return
+
+        self.sample_rate = app.config.get('PROFILING_SAMPLE_RATE', 0.0)
+        self.sample_mode = app.config.get('PROFILING_SAMPLE_MODE', 'sample')
+        self.max_captures = app.config.get('PROFILING_MAX_CAPTURES', 200)
+        self.admins = set(app.config.get('ADMIN_USERNAMES', ()))
+        self.profile_dir = os.path.join(app.instance_path, 'profiles')
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._abandon)
+
+        app.add_url_rule('/admin/profiles', 'admin_profiles', login_required(self.list_view))
+        app.add_url_rule('/admin/profiles/<name>', 'admin_profile', login_required(self.capture_view))
+
+    def _is_admin(self):
+        return current_user.is_authenticated and current_user.username in self.admins
+
+    def _requested_mode(self):
+        """Profiling mode for this request, or None"""
+        flag = request.headers.get('X-Profile') or request.args.get('profile')
+        if flag and self._is_admin():
+            return flag if flag in MODES else 'cprofile'
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.sample_mode
+        return None
+
+    def _start(self):
+        if request.endpoint in ('admin_profiles', 'admin_profile', 'static'):
+            return
+        mode = self._requested_mode()
+        if mode is None:
+            return
+
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                return  # Another profiler is already active on this thread
+        else:
+            profiler = StackSampler(threading.get_ident())
+            profiler.start()
+        g._profile = (mode, profiler, time.perf_counter())
+
+    def _stop(self):
+        capture = g.pop('_profile', None)
+        if capture is None:
+            return None
+        mode, profiler, started = capture
+        if mode == 'cprofile':
+            profiler.disable()
+        else:
+            profiler.stop()
+        return mode, profiler, (time.perf_counter() - started) * 1000
+
+    def _finish(self, response):
+        stopped = self._stop()
+        if stopped is not None:
+            mode, profiler, duration_ms = stopped
+            name = self._save(mode, profiler, duration_ms)
+            response.headers['X-Profile-Capture'] = name
+        return response
+
+    def _abandon(self, exc):
+        # Unhandled exceptions skip after_request; never leave a profiler running
+        self._stop()
+
+    def _save(self, mode, profiler, duration_ms):
+        endpoint = (request.endpoint or 'unknown').replace('.', '_')
+        ext = 'prof' if mode == 'cprofile' else 'txt'
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}_{endpoint}_{duration_ms:.0f}ms_{uuid.uuid4().hex[:6]}.{ext}"
+        path = os.path.join(self.profile_dir, name)
+        if mode == 'cprofile':
+            profiler.dump_stats(path)
+        else:
+            profiler.dump(path)
+        self._prune()
+        return name
+
+    def _captures(self):
+        entries = [e for e in os.scandir(self.profile_dir) if e.is_file()]
+        return sorted(entries, key=lambda e: e.stat().st_mtime, reverse=True)
+
+    def _prune(self):
+        for entry in self._captures()[self.max_captures:]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def list_view(self):
+        """Recent captures, newest first"""
+        if not self._is_admin():
+            abort(403)
+        captures = []
+        for entry in self._captures()[:int(request.args.get('limit', 50))]:
+            # <stamp>_<endpoint>_<duration>ms_<id>.<ext>; endpoints may contain underscores
+            head, duration, _ = entry.name.rsplit('.', 1)[0].rsplit('_', 2)
+            stamp, endpoint = head.split('_', 1)
+            captures.append({
+                'name': entry.name,
+                'endpoint': endpoint,
+                'duration_ms': float(duration[:-2]),
+                'mode': 'cprofile' if entry.name.endswith('.prof') else 'sample',
+                'size_bytes': entry.stat().st_size,
+                'captured_at': stamp
+            })
+        return jsonify({'captures': captures})
+
+    def capture_view(self, name):
+        """Top functions of a cProfile capture (?download=1 for the raw file)"""
+        if not self._is_admin():
+            abort(403)
+        if os.path.basename(name) != name or not os.path.exists(os.path.join(self.profile_dir, name)):
+            abort(404)
+        if request.args.get('download') or not name.endswith('.prof'):
+            return send_from_directory(self.profile_dir, name, as_attachment=bool(request.args.get('download')))
+
+        out = io.StringIO()
+        stats = pstats.Stats(os.path.join(self.profile_dir, name), stream=out)
+        stats.sort_stats(request.args.get('sort', 'cumulative')).print_stats(int(request.args.get('limit', 40)))
+        return Response(out.getvalue(), mimetype='text/plain')
@@ -0,0 +1,176 @@
+"""
+Stage Cache
+Runs a training pipeline as named stages and caches each stage's output in a
+content-addressed store. A stage's key hashes its name, parameters, the source
+code it depends on and the content digests of its inputs (upstream outputs or
+files), so a stage is recomputed only when something it depends on changed,
+and a recomputed upstream stage that yields identical output does not
+invalidate the stages after it.
+
+Layout under the cache directory:
+    objects/<digest[:2]>/<digest>.pkl   joblib-pickled stage outputs
+    stages/<stage>/<key>.json           stage key -> output digest
+"""
+import hashlib
+import inspect
+import json
+import os
+import time
+
+import joblib
+
+DEFAULT_CACHE_DIR = 'cache/stages'
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents ('missing' if it does not exist)"""
+    if not os.path.exists(path):
+        return 'missing'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_version(*objects):
+    """Hash of the source code of functions, classes or modules"""
+    digest = hashlib.sha256()
+    for obj in objects:
+        try:
+            digest.update(inspect.getsource(obj).encode())
+        except (OSError, TypeError):
+            digest.update(repr(obj).encode())  # Builtins/compiled code: fall back to the name
+    return digest.hexdigest()
+
+
+class Stage:
+    """One named pipeline step: fn(*[outputs of `inputs`]) -> output"""
+
+    def __init__(self, name, fn, inputs=(), files=(), params=None, code=(), cache=True):
+        """
+        Initialize Stage
+
+        Args:
+            name: Stage name (used by --from-stage)
+            fn: Callable receiving the outputs of `inputs` positionally
+            inputs: Names of upstream stages
+            files: Input files whose contents are part of the key
+            params: JSON-serializable parameters that change the output
+            code: Functions/classes/modules whose source is part of the key (fn is always included)
+            cache: Store the output (False for stages with side effects, e.g. writing artifacts)
+        """
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.files = tuple(files)
+        self.params = params or {}
+        self.code = (fn,) + tuple(code)
+        self.cache = cache
+
+    def key(self, input_digests):
+        return _sha256(json.dumps({
+            'stage': self.name,
+            'params': self.params,
+            'code': code_version(*self.code),
+            'inputs': [input_digests[name] for name in self.inputs],
+            'files': {path: file_digest(path) for path in self.files}
+        }, sort_keys=True, default=str).encode())
+
+
+class StageCache:
+    """Content-addressed store of stage outputs"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _index_path(self, stage, key):
+        return os.path.join(self.cache_dir, 'stages', stage, f'{key}.json')
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest[:2], f'{digest}.pkl')
+
+    def lookup(self, stage, key):
+        """Output digest recorded for (stage, key), or None"""
+        path = self._index_path(stage, key)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            digest = json.load(f)['digest']
+        return digest if os.path.exists(self._object_path(digest)) else None
+
+    def load(self, digest):
+        return joblib.load(self._object_path(digest))
+
+    def store(self, stage, key, output):
+        """
+        Pickle `output`, store it under its content digest and index it by key.
+
+        Returns:
+            The content digest
+        """
+        os.makedirs(os.path.join(self.cache_dir, 'objects'), exist_ok=True)
+        tmp_path = os.path.join(self.cache_dir, 'objects', f'.tmp-{os.getpid()}.pkl')
+        joblib.dump(output, tmp_path)
+        digest = file_digest(tmp_path)
+        object_path = self._object_path(digest)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        os.replace(tmp_path, object_path)
+
+        index_path = self._index_path(stage, key)
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        with open(f'{index_path}.tmp', 'w') as f:
+            json.dump({'digest': digest, 'created_at': time.time()}, f)
+        os.replace(f'{index_path}.tmp', index_path)
+        return digest
+
+
+def run_stages(stages, cache_dir=DEFAULT_CACHE_DIR, from_stage=None, use_cache=True, verbose=True):
+    """
+    Run stages in order, reusing cached outputs where the stage key is unchanged.
+
+    Args:
+        stages: List of Stage objects (upstream stages first)
+        cache_dir: Cache directory (None disables caching)
+        from_stage: Recompute this stage and every later one; earlier stages must be cached
+        use_cache: False recomputes every stage (outputs are still stored)
+        verbose: Print one line per stage
+
+    Returns:
+        Dict of stage name -> output
+    """
+    names = [stage.name for stage in stages]
+    if from_stage is not None and from_stage not in names:
+        raise ValueError(f"Unknown stage '{from_stage}'. Stages: {', '.join(names)}")
+    start_index = names.index(from_stage) if from_stage else None
+    cache = StageCache(cache_dir) if cache_dir else None
+
+    outputs = {}
+    digests = {}
+    for index, stage in enumerate(stages):
+        key = stage.key(digests)
+        forced = not use_cache or (start_index is not None and index >= start_index)
+        digest = cache.lookup(stage.name, key) if cache and stage.cache and not forced else None
+
+        started = time.perf_counter()
+        if digest is not None:
+            outputs[stage.name] = cache.load(digest)
+            status = 'cached'
+        else:
+            if start_index is not None and index < start_index and stage.cache:
+                raise RuntimeError(f"Stage '{stage.name}' is not cached for the current inputs and code; "
+                                   f"run the full pipeline before using --from-stage {from_stage}")
+            outputs[stage.name] = stage.fn(*[outputs[name] for name in stage.inputs])
+            if cache and stage.cache:
+                digest = cache.store(stage.name, key, outputs[stage.name])
+            status = 'ran'
+        # Uncached stages are keyed by their own key so downstream keys stay well defined
+        digests[stage.name] = digest or key
+        if verbose:
+            print(f"[stage {index + 1}/{len(stages)}] {stage.name:<14} {status:<6} "
+                  f"{time.perf_counter() - started:6.2f}s  {digests[stage.name][:12]}")
+    return outputs
@@ -0,0 +1,129 @@
+"""
+Structured Logging
+Application logging with levels, JSON output, per-route sampling and a
+non-blocking queue handler: request threads only enqueue records, a background
+listener thread formats and writes them.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+ROOT_LOGGER = 'mediguard'
+
+_listener = None
+
+
+def get_logger(name):
+    """Logger under the application namespace, e.g. get_logger('app')"""
+    return logging.getLogger(f'{ROOT_LOGGER}.{name}')
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; structured data is passed as extra={'fields': {...}}"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        route = getattr(record, 'route', None)
+        if route:
+            entry['route'] = route
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records with the message merged but the traceback kept separate"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class RouteSampler(logging.Filter):
+    """
+    Keeps a fraction of DEBUG/INFO records per Flask endpoint; WARNING and above
+    always pass. The decision is made once per request so a sampled request
+    keeps all of its lines.
+    """
+
+    def __init__(self, sample_rates=None, default_rate=1.0):
+        super().__init__()
+        self.sample_rates = dict(sample_rates or {})
+        self.default_rate = default_rate
+
+    def filter(self, record):
+        try:
+            from flask import g, has_request_context, request
+        except ImportError:
+            return True
+        if not has_request_context():
+            return True
+
+        # Tag the record with its route while the request context is still available
+        record.route = request.endpoint
+        if record.levelno >= logging.WARNING:
+            return True
+
+        keep = g.get('_log_sampled')
+        if keep is None:
+            rate = self.sample_rates.get(request.endpoint, self.default_rate)
+            keep = rate >= 1.0 or random.random() < rate
+            g._log_sampled = keep
+        return keep
+
+
+def setup_logging(level='INFO', json_output=True, sample_rates=None, stream=None):
+    """
+    Configure the application logger (idempotent).
+
+    Args:
+        level: Minimum level for the application loggers
+        json_output: Emit JSON lines (False = human-readable text)
+        sample_rates: Dict of Flask endpoint -> fraction of DEBUG/INFO records kept
+        stream: Output stream (default: stderr)
+
+    Returns:
+        The QueueListener writing the records
+    """
+    global _listener
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(level)
+    if _listener is not None:
+        return _listener
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JSONFormatter() if json_output
+                        else logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    log_queue = queue.Queue(-1)
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(RouteSampler(sample_rates))
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,167 @@
+"""
+Synthetic Generator
+Vectorized synthetic blood panels for training-set augmentation and load testing.
+The whole (N, F) matrix is drawn in one call from a seeded np.random.Generator
+and scaled with array min/max; no per-row or per-value Python work.
+"""
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+MODES = ('uniform', 'truncnorm', 'class_conditional')
+
+
+def truncated_normal(rng, mean, std, low, high, size):
+    """
+    Truncated normal samples by inverse-CDF: u ~ U(Phi(a), Phi(b)), x = mean + std * Phi^-1(u).
+    All arguments broadcast against `size`; std == 0 returns the (clipped) mean.
+    """
+    mean, std, low, high = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (mean, std, low, high)))
+    safe_std = np.where(std > 0, std, 1.0)
+    lo_cdf = ndtr((low - mean) / safe_std)
+    hi_cdf = ndtr((high - mean) / safe_std)
+    u = lo_cdf + rng.random(size) * (hi_cdf - lo_cdf)
+    samples = mean + safe_std * ndtri(u)
+    samples = np.where(std > 0, samples, mean)
+    return np.clip(samples, low, high)
+
+
+class SyntheticGenerator:
+    """
+    Generates raw and scaled panels over a fixed feature order.
+
+    Modes:
+        uniform: Each value uniform over its physiological (normal) range
+        truncnorm: Normal centered in the physiological range with std = range * std_fraction,
+                   truncated to the range
+        class_conditional: Per-class truncated normal with the class mean/std of a
+                           (0-1 scaled) labelled dataset, see fit_classes()
+    """
+
+    def __init__(self, bridge, feature_names, seed=42, std_fraction=0.25):
+        """
+        Initialize Synthetic Generator
+
+        Args:
+            bridge: ScalingBridge providing physiological ranges and min/max scaling
+            feature_names: Feature order of the generated columns
+            seed: Seed of the np.random.Generator
+            std_fraction: Standard deviation of 'truncnorm' as a fraction of the range width
+        """
+        self.bridge = bridge
+        self.feature_names = list(feature_names)
+        self.rng = np.random.default_rng(seed)
+        self.std_fraction = std_fraction
+
+        bounds = bridge.range_bounds(self.feature_names)
+        self.normal_min = bounds['normal_min']
+        self.normal_max = bounds['normal_max']
+        self.scale_min = np.array([bridge.min_values[f] for f in self.feature_names], dtype=float)
+        self.scale_max = np.array([bridge.max_values[f] for f in self.feature_names], dtype=float)
+
+        self.classes = None
+        self.class_means = None  # (n_classes, n_features), scaled space
+        self.class_stds = None
+        self.class_weights = None
+
+    def fit_classes(self, df, label_column='Disease'):
+        """
+        Learn per-class means/stds of a scaled, labelled DataFrame for 'class_conditional'.
+
+        Returns:
+            self
+        """
+        grouped = df.groupby(label_column)[self.feature_names]
+        self.classes = np.array(list(grouped.groups.keys()), dtype=object)
+        self.class_means = grouped.mean().loc[self.classes].values
+        self.class_stds = grouped.std().fillna(0).loc[self.classes].values
+        counts = grouped.size().loc[self.classes].values
+        self.class_weights = counts / counts.sum()
+        return self
+
+    def sample_raw(self, n, mode='uniform', labels=None):
+        """
+        Draw n raw-unit panels.
+
+        Args:
+            n: Number of rows
+            mode: One of MODES
+            labels: For 'class_conditional', the class of each row (length n) or a single
+                    class; default draws classes by their frequency in the fitted data
+
+        Returns:
+            Tuple of (float64 array of shape (n, n_features), array of row labels or None)
+        """
+        size = (n, len(self.feature_names))
+        if mode == 'uniform':
+            return self.rng.uniform(self.normal_min, self.normal_max, size=size), None
+        if mode == 'truncnorm':
+            center = (self.normal_min + self.normal_max) / 2
+            std = (self.normal_max - self.normal_min) * self.std_fraction
+            return truncated_normal(self.rng, center, std, self.normal_min, self.normal_max, size), None
+        if mode != 'class_conditional':
+            raise ValueError(f"Unknown mode '{mode}', expected one of {MODES}")
+        if self.classes is None:
+            raise ValueError("class_conditional sampling requires fit_classes() first")
+
+        if labels is None:
+            class_idx = self.rng.choice(len(self.classes), size=n, p=self.class_weights)
+        else:
+            index = {label: i for i, label in enumerate(self.classes)}
+            class_idx = np.array([index[label] for label in np.broadcast_to(np.asarray(labels, dtype=object), (n,))])
+        scaled = truncated_normal(self.rng, self.class_means[class_idx], self.class_stds[class_idx], 0.0, 1.0, size)
+        return self.unscale(scaled), self.classes[class_idx]
+
+    def scale(self, raw):
+        """Min/max scale a raw matrix to [0, 1] (same mapping as ScalingBridge.scale_matrix)"""
+        return np.clip((raw - self.scale_min) / (self.scale_max - self.scale_min), 0, 1)
+
+    def unscale(self, scaled):
+        """Map a [0, 1] matrix back to raw units"""
+        return self.scale_min + scaled * (self.scale_max - self.scale_min)
+
+    def generate(self, n, mode='uniform', label='Healthy', label_column='Disease', dtype=np.float64):
+        """
+        Draw n scaled rows as a training-ready DataFrame.
+
+        Args:
+            n: Number of rows
+            mode: One of MODES
+            label: Label of every row for 'uniform'/'truncnorm'; for 'class_conditional'
+                   None (sample classes) or a single class
+            label_column: Name of the label column
+            dtype: Dtype of the feature columns
+
+        Returns:
+            DataFrame with the feature columns (in feature order) and the label column
+        """
+        raw, labels = self.sample_raw(n, mode, labels=label if mode == 'class_conditional' else None)
+        df = pd.DataFrame(self.scale(raw).astype(dtype, copy=False), columns=self.feature_names)
+        df[label_column] = labels if labels is not None else label
+        return df
+
+
+def main():
+    """Generate samples in every mode and report timing"""
+    import time
+    from module_b_scaling_bridge import ScalingBridge
+
+    print("="*60)
+    print("SYNTHETIC GENERATOR")
+    print("="*60)
+
+    data_path = 'data/Blood_samples_dataset_balanced_2(f).csv'
+    df = pd.read_csv(data_path)
+    features = [c for c in df.columns if c != 'Disease']
+    generator = SyntheticGenerator(ScalingBridge(data_path), features).fit_classes(df)
+
+    for mode in MODES:
+        start = time.perf_counter()
+        synthetic = generator.generate(100_000, mode=mode, label=None if mode == 'class_conditional' else 'Healthy')
+        elapsed = time.perf_counter() - start
+        print(f"✓ {mode:<18} {len(synthetic):,} rows in {elapsed*1000:.1f} ms "
+              f"(labels: {synthetic['Disease'].value_counts().to_dict()})")
+
+
+if __name__ == "__main__":
+    main()
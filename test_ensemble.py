@@ -0,0 +1,73 @@
+"""
+Tests for ensemble.PrefitVotingClassifier (run with `python -m pytest test_ensemble.py`)
+"""
+import io
+
+import joblib
+import numpy as np
+import pytest
+import xgboost as xgb
+from sklearn.base import clone
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+
+from ensemble import PrefitVotingClassifier
+
+
+@pytest.fixture(scope='module')
+def fitted_members():
+    X, y = make_classification(n_samples=600, n_features=28, n_informative=12, n_classes=6,
+                               n_clusters_per_class=1, random_state=42)
+    X_train, X_test, y_train = X[:500], X[500:], y[:500]
+
+    xgb_model = xgb.XGBClassifier(n_estimators=50, max_depth=4, random_state=42, eval_metric='mlogloss')
+    rf_model = RandomForestClassifier(n_estimators=50, random_state=42)
+    xgb_model.fit(X_train, y_train)
+    rf_model.fit(X_train, y_train)
+    return xgb_model, rf_model, X_train, X_test, y_train
+
+
+def test_prefit_matches_refit_voting_classifier(fitted_members):
+    """Prefit ensemble must match a refit VotingClassifier on the same data"""
+    xgb_model, rf_model, X_train, X_test, y_train = fitted_members
+    prefit = PrefitVotingClassifier([('xgb', xgb_model), ('rf', rf_model)], weights=[2, 1])
+    refit = VotingClassifier([('xgb', xgb_model), ('rf', rf_model)], voting='soft', weights=[2, 1])
+    refit.fit(X_train, y_train)
+
+    assert np.allclose(prefit.predict_proba(X_test), refit.predict_proba(X_test), atol=1e-6)
+    assert np.array_equal(prefit.predict(X_test), refit.predict(X_test))
+    assert np.array_equal(prefit.classes_, refit.classes_)
+    assert prefit.n_features_in_ == X_train.shape[1]
+
+
+def test_joblib_round_trip(fitted_members):
+    xgb_model, rf_model, _, X_test, _ = fitted_members
+    prefit = PrefitVotingClassifier([('xgb', xgb_model), ('rf', rf_model)], weights=[2, 1])
+
+    buffer = io.BytesIO()
+    joblib.dump(prefit, buffer)
+    buffer.seek(0)
+    restored = joblib.load(buffer)
+    assert np.array_equal(restored.predict_proba(X_test), prefit.predict_proba(X_test))
+
+
+def test_get_params_and_clone(fitted_members):
+    xgb_model, rf_model, _, _, _ = fitted_members
+    prefit = PrefitVotingClassifier([('xgb', xgb_model), ('rf', rf_model)], weights=[2, 1])
+
+    assert prefit.get_params(deep=False) == {'estimators': prefit.estimators, 'weights': [2, 1]}
+    cloned = clone(prefit)
+    assert cloned.weights == [2, 1]
+    assert [name for name, _ in cloned.estimators] == ['xgb', 'rf']
+
+
+def test_invalid_members_rejected(fitted_members):
+    xgb_model, rf_model, X_train, X_test, y_train = fitted_members
+    other = RandomForestClassifier(n_estimators=5, random_state=42).fit(X_train, y_train % 2)
+
+    with pytest.raises(ValueError, match='different classes'):
+        PrefitVotingClassifier([('xgb', xgb_model), ('other', other)]).predict_proba(X_test)
+    with pytest.raises(ValueError, match='weights'):
+        PrefitVotingClassifier([('xgb', xgb_model), ('rf', rf_model)], weights=[1]).fit()
+    with pytest.raises(ValueError, match='at least one'):
+        PrefitVotingClassifier([]).fit()
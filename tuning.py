@@ -0,0 +1,201 @@
+"""
+Hyperparameter Tuning
+Successive-halving search over the same parameter spaces module_a used with
+RandomizedSearchCV. Early rungs score many candidates on small stratified
+subsets; only the best third advance to more data. Every (candidate, rung, fold)
+score is cached on disk keyed by the data hash and parameters, so reruns on
+unchanged data skip finished trials.
+"""
+import hashlib
+import json
+import math
+import os
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterSampler, StratifiedKFold, train_test_split
+
+DEFAULT_CACHE_DIR = 'cache/tuning'
+
+
+def data_fingerprint(X, y):
+    """SHA-256 of the training matrix and labels (shape, dtype and bytes)"""
+    digest = hashlib.sha256()
+    for array in (np.ascontiguousarray(X), np.ascontiguousarray(y)):
+        digest.update(f"{array.shape}{array.dtype}".encode())
+        digest.update(array)  # Buffer protocol: no copy, so a memory map is read in place
+    return digest.hexdigest()
+
+
+class TrialCache:
+    """One JSON file per (data, estimator, params, rung, fold) score"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(**parts):
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.json')
+
+    def get(self, key):
+        if not self.cache_dir or not os.path.exists(self._path(key)):
+            self.misses += 1
+            return None
+        with open(self._path(key)) as f:
+            self.hits += 1
+            return json.load(f)['score']
+
+    def put(self, key, score, **info):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(dict(info, score=score), f, default=str)
+        os.replace(tmp_path, path)  # Atomic: readers never see a partial file
+
+
+def _fit_and_score(estimator, params, X, y, train_idx, test_idx, scoring, fit_params):
+    model = clone(estimator).set_params(**params)
+    model.fit(X[train_idx], y[train_idx], **fit_params)
+    return float(get_scorer(scoring)(model, X[test_idx], y[test_idx]))
+
+
+class SuccessiveHalvingSearch:
+    """
+    Successive halving with training rows (and optionally ensemble size) as the resource.
+
+    With n candidates and factor f there are ceil(log_f(n)) rungs; rung i trains
+    on n_samples / f^(last - i) rows and keeps the top 1/f candidates. Integer
+    parameters listed in `budget_params` (e.g. 'n_estimators') are scaled by the
+    same fraction, since tree ensembles cost about the same per tree on 300 rows as
+    on 3000. After the last rung the best candidate is refit on all data with its
+    full parameters (as RandomizedSearchCV(refit=True) does).
+    """
+
+    def __init__(self, estimator, param_distributions, n_candidates=12, factor=3, cv=3,
+                 scoring='recall_weighted', budget_params=(), random_state=42, n_jobs=-1,
+                 cache_dir=DEFAULT_CACHE_DIR, verbose=1):
+        """
+        Initialize Successive Halving Search
+
+        Args:
+            estimator: Unfitted base estimator
+            param_distributions: Dict of parameter -> list of values (or distributions)
+            n_candidates: Parameter sets sampled for the first rung
+            factor: Fraction 1/factor of candidates kept per rung; data grows by factor
+            cv: Stratified folds per candidate and rung
+            scoring: sklearn scorer name
+            budget_params: Integer parameters scaled down with the rung's share of the data
+            random_state: Seed for candidate sampling, subsets and folds
+            n_jobs: Parallel trial fits (joblib); estimators are set to one thread each
+            cache_dir: Directory of cached trial scores (None disables caching)
+            verbose: Print one line per rung
+        """
+        self.estimator = estimator
+        self.param_distributions = param_distributions
+        self.n_candidates = n_candidates
+        self.factor = factor
+        self.cv = cv
+        self.scoring = scoring
+        self.budget_params = tuple(budget_params)
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.cache = TrialCache(cache_dir)
+        self.verbose = verbose
+
+    def _rung_sizes(self, n_samples, n_classes):
+        n_rungs = max(1, math.ceil(math.log(self.n_candidates, self.factor)))
+        # Smallest rung still needs every class in every fold
+        min_samples = n_classes * self.cv * 2
+        return [max(min_samples, n_samples // self.factor ** (n_rungs - 1 - i)) for i in range(n_rungs)]
+
+    def fit(self, X, y, **fit_params):
+        """
+        Run the search and refit the best candidate on (X, y).
+
+        Returns:
+            self, with best_params_, best_score_, best_estimator_ and cv_results_ set
+        """
+        X = np.asarray(X)
+        y = np.asarray(y)
+        data_key = data_fingerprint(X, y)
+        base_estimator = self.estimator
+        if self.n_jobs != 1 and 'n_jobs' in base_estimator.get_params():
+            base_estimator = clone(base_estimator).set_params(n_jobs=1)  # Parallelism is across trials
+        estimator_key = f"{type(self.estimator).__name__}:{sorted(self.estimator.get_params().items())}"
+
+        candidates = list(ParameterSampler(self.param_distributions, self.n_candidates,
+                                           random_state=self.random_state))
+        rung_sizes = self._rung_sizes(len(y), len(np.unique(y)))
+        self.cv_results_ = []
+
+        for rung, n_rows in enumerate(rung_sizes):
+            if n_rows >= len(y):
+                subset = np.arange(len(y))
+            else:
+                subset, _ = train_test_split(np.arange(len(y)), train_size=n_rows, stratify=y,
+                                             random_state=self.random_state)
+            X_rung, y_rung = X[subset], y[subset]
+            folds = list(StratifiedKFold(self.cv, shuffle=True, random_state=self.random_state).split(X_rung, y_rung))
+            fraction = len(subset) / len(y)
+            trial_params = [
+                dict(params, **{p: max(1, round(params[p] * fraction)) for p in self.budget_params if p in params})
+                for params in candidates
+            ]
+
+            keys = {}
+            pending = []
+            scores = np.empty((len(candidates), self.cv))
+            for c, params in enumerate(trial_params):
+                for f in range(self.cv):
+                    keys[c, f] = self.cache.key(data=data_key, estimator=estimator_key, params=params,
+                                                n_rows=len(subset), fold=f, cv=self.cv, scoring=self.scoring,
+                                                random_state=self.random_state)
+                    cached = self.cache.get(keys[c, f])
+                    if cached is None:
+                        pending.append((c, f))
+                    else:
+                        scores[c, f] = cached
+
+            started = time.perf_counter()
+            results = Parallel(n_jobs=self.n_jobs)(
+                delayed(_fit_and_score)(base_estimator, trial_params[c], X_rung, y_rung, *folds[f],
+                                        self.scoring, fit_params)
+                for c, f in pending
+            )
+            for (c, f), score in zip(pending, results):
+                scores[c, f] = score
+                self.cache.put(keys[c, f], score, params=trial_params[c], n_rows=len(subset), fold=f)
+
+            mean_scores = scores.mean(axis=1)
+            for params, score in zip(trial_params, mean_scores):
+                self.cv_results_.append({'rung': rung, 'n_rows': len(subset), 'params': params,
+                                         'mean_score': float(score)})
+            if self.verbose:
+                print(f"  Rung {rung + 1}/{len(rung_sizes)}: {len(candidates)} candidates x {self.cv} folds "
+                      f"on {len(subset)} rows ({len(pending)} fitted, "
+                      f"{len(candidates) * self.cv - len(pending)} cached) in {time.perf_counter() - started:.1f}s, "
+                      f"best {mean_scores.max():.4f}")
+
+            order = np.argsort(-mean_scores, kind='stable')
+            if rung == len(rung_sizes) - 1:
+                self.best_params_ = candidates[order[0]]
+                self.best_score_ = float(mean_scores[order[0]])
+            else:
+                candidates = [candidates[i] for i in order[:max(1, math.ceil(len(candidates) / self.factor))]]
+
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_)
+        self.best_estimator_.fit(X, y, **fit_params)
+        return self
@@ -0,0 +1,230 @@
+"""
+Unit Normalizer
+Recognizes laboratory units written after a value ("6.1 mmol/L", "250 x10^9/L") and
+converts values to the units the dashboard, scaling bridge and clinical rules expect.
+"""
+import re
+
+import numpy as np
+
+
+class UnitNormalizer:
+    """
+    Compiled table of unit synonyms and per-parameter conversion factors.
+    Every conversion is affine: dashboard_value = value * scale + offset.
+    """
+
+    def __init__(self):
+        # Units the dashboard (and the whole pipeline) works in
+        self.dashboard_units = {
+            'Glucose': 'mg/dL',
+            'Cholesterol': 'mg/dL',
+            'Hemoglobin': 'g/dL',
+            'Platelets': '/uL',
+            'White Blood Cells': '/uL',
+            'Red Blood Cells': '10^6/uL',
+            'Hematocrit': '%',
+            'Mean Corpuscular Volume': 'fL',
+            'Mean Corpuscular Hemoglobin': 'pg',
+            'Mean Corpuscular Hemoglobin Concentration': 'g/dL',
+            'Insulin': 'uU/mL',
+            'BMI': 'kg/m2',
+            'Systolic Blood Pressure': 'mmHg',
+            'Diastolic Blood Pressure': 'mmHg',
+            'Triglycerides': 'mg/dL',
+            'HbA1c': '%',
+            'LDL Cholesterol': 'mg/dL',
+            'HDL Cholesterol': 'mg/dL',
+            'ALT': 'U/L',
+            'AST': 'U/L',
+            'Heart Rate': 'bpm',
+            'Creatinine': 'mg/dL',
+            'Troponin': 'ng/mL',
+            'C-reactive Protein': 'mg/L'
+        }
+
+        # Accepted units per parameter: unit -> (scale, offset) into dashboard units
+        cell_count = {'/uL': (1, 0), '10^3/uL': (1000, 0), '10^9/L': (1000, 0)}
+        lipid = {'mg/dL': (1, 0), 'mmol/L': (38.67, 0)}
+        hemoglobin = {'g/dL': (1, 0), 'g/L': (0.1, 0), 'mmol/L': (1.611, 0)}
+        pressure = {'mmHg': (1, 0), 'kPa': (7.50062, 0)}
+        enzyme = {'U/L': (1, 0), 'ukat/L': (60, 0)}
+        self.conversions = {
+            'Glucose': {'mg/dL': (1, 0), 'mmol/L': (18.016, 0)},
+            'Cholesterol': lipid,
+            'Hemoglobin': hemoglobin,
+            'Platelets': cell_count,
+            'White Blood Cells': cell_count,
+            'Red Blood Cells': {'10^6/uL': (1, 0), '10^12/L': (1, 0)},
+            'Hematocrit': {'%': (1, 0), 'L/L': (100, 0)},
+            'Mean Corpuscular Volume': {'fL': (1, 0)},
+            'Mean Corpuscular Hemoglobin': {'pg': (1, 0)},
+            'Mean Corpuscular Hemoglobin Concentration': hemoglobin,
+            'Insulin': {'uU/mL': (1, 0), 'mU/L': (1, 0), 'pmol/L': (1 / 6.0, 0)},
+            'BMI': {'kg/m2': (1, 0)},
+            'Systolic Blood Pressure': pressure,
+            'Diastolic Blood Pressure': pressure,
+            'Triglycerides': {'mg/dL': (1, 0), 'mmol/L': (88.57, 0)},
+            'HbA1c': {'%': (1, 0), 'mmol/mol': (0.09148, 2.152)},  # IFCC -> NGSP
+            'LDL Cholesterol': lipid,
+            'HDL Cholesterol': lipid,
+            'ALT': enzyme,
+            'AST': enzyme,
+            'Heart Rate': {'bpm': (1, 0)},
+            'Creatinine': {'mg/dL': (1, 0), 'umol/L': (1 / 88.42, 0)},
+            'Troponin': {'ng/mL': (1, 0), 'ug/L': (1, 0), 'ng/L': (0.001, 0), 'pg/mL': (0.001, 0)},
+            'C-reactive Protein': {'mg/L': (1, 0), 'mg/dL': (10, 0)}
+        }
+
+        # Written forms of each unit (compared after _normalize_unit_text)
+        self.unit_synonyms = {
+            'mg/dL': ['mg/dl', 'mg%', 'mgdl'],
+            'mmol/L': ['mmol/l', 'mmol/litre', 'mmol/liter', 'mm/l'],
+            'g/dL': ['g/dl', 'gm/dl', 'gdl'],
+            'g/L': ['g/l', 'gm/l'],
+            '/uL': ['/ul', 'cells/ul', '/mm3', 'cells/mm3', 'permicroliter'],
+            '10^3/uL': ['x10^3/ul', '10^3/ul', 'x10e3/ul', '10e3/ul', 'k/ul', 'thou/ul', 'x10^3/mm3', '10^3/mm3'],
+            '10^9/L': ['x10^9/l', '10^9/l', 'x10e9/l', '10e9/l', 'giga/l'],
+            '10^6/uL': ['x10^6/ul', '10^6/ul', 'x10e6/ul', 'million/ul', 'm/ul', 'mil/ul'],
+            '10^12/L': ['x10^12/l', '10^12/l', 'x10e12/l', '10e12/l', 't/l'],
+            '%': ['%', 'percent', 'pct'],
+            'L/L': ['l/l'],
+            'fL': ['fl', 'femtoliters', 'femtolitres'],
+            'pg': ['pg', 'picograms'],
+            'uU/mL': ['uu/ml', 'uiu/ml', 'microu/ml', 'microunits/ml'],
+            'mU/L': ['mu/l', 'miu/l'],
+            'pmol/L': ['pmol/l'],
+            'kg/m2': ['kg/m2', 'kg/m^2'],
+            'mmHg': ['mmhg', 'mm/hg'],
+            'kPa': ['kpa'],
+            'mmol/mol': ['mmol/mol'],
+            'U/L': ['u/l', 'iu/l', 'units/l'],
+            'ukat/L': ['ukat/l'],
+            'bpm': ['bpm', 'beats/min', 'beatsperminute', '/min'],
+            'umol/L': ['umol/l', 'micromol/l'],
+            'ng/mL': ['ng/ml'],
+            'ug/L': ['ug/l', 'mcg/l'],
+            'ng/L': ['ng/l'],
+            'pg/mL': ['pg/ml'],
+            'mg/L': ['mg/l']
+        }
+
+        self._compile()
+
+    def _compile(self):
+        """Build the synonym lookup and the anchored unit regex"""
+        self.synonym_to_unit = {}
+        for unit, synonyms in self.unit_synonyms.items():
+            for synonym in synonyms + [unit.lower()]:
+                self.synonym_to_unit[self._normalize_unit_text(synonym)] = unit
+
+        # Longest alternatives first so 'mmol/mol' wins over 'mmol/l' prefixes etc.
+        alternatives = sorted(self.synonym_to_unit, key=len, reverse=True)
+        self.unit_regex = re.compile('|'.join(re.escape(a) for a in alternatives))
+
+    @staticmethod
+    def _normalize_unit_text(text):
+        """Lower-case, strip whitespace and fold unicode unit spellings to ASCII"""
+        text = text.lower()
+        for src, dst in (('µ', 'u'), ('μ', 'u'), ('×', 'x'), ('⁹', '^9'), ('¹²', '^12'),
+                         ('³', '^3'), ('⁶', '^6'), ('²', '2'), ('litre', 'l'), ('liter', 'l')):
+            text = text.replace(src, dst)
+        text = re.sub(r'\s+', '', text)
+        text = re.sub(r'10\*\*?', '10^', text)
+        return text
+
+    def parse_unit(self, text, pos=0):
+        """
+        Recognize a unit starting at `text[pos]` (leading whitespace allowed).
+
+        Returns:
+            Canonical unit string, or None if no known unit follows
+        """
+        window = self._normalize_unit_text(text[pos:pos + 24])
+        match = self.unit_regex.match(window)
+        if match is None:
+            return None
+        return self.synonym_to_unit[match.group(0)]
+
+    def convert(self, feature_name, value, unit):
+        """
+        Convert a single value to dashboard units.
+
+        Raises:
+            ValueError: If the unit is not valid for this parameter
+        """
+        scale, offset = self._factors(feature_name, unit)
+        return value * scale + offset
+
+    def _factors(self, feature_name, unit):
+        """(scale, offset) for one parameter/unit pair"""
+        unit = self.canonical_unit(unit)
+        try:
+            return self.conversions[feature_name][unit]
+        except KeyError:
+            raise ValueError(f"Unsupported unit '{unit}' for {feature_name}")
+
+    def canonical_unit(self, unit):
+        """Map any accepted spelling of a unit to its canonical form (unknown units pass through)"""
+        if unit is None:
+            return None
+        return self.synonym_to_unit.get(self._normalize_unit_text(str(unit)), unit)
+
+    def accepts(self, feature_name, unit):
+        """Whether `unit` is a valid unit for `feature_name`"""
+        return self.canonical_unit(unit) in self.conversions.get(feature_name, {})
+
+    def conversion_vectors(self, feature_order, units):
+        """
+        Per-column scale and offset vectors.
+
+        Args:
+            feature_order: Column names of the matrix to convert
+            units: Dict of feature name -> unit; missing features are in dashboard units
+
+        Returns:
+            Tuple of (scale, offset) arrays of shape (n_features,)
+        """
+        scale = np.ones(len(feature_order))
+        offset = np.zeros(len(feature_order))
+        for j, feature in enumerate(feature_order):
+            unit = units.get(feature)
+            if unit is None or feature not in self.conversions:
+                continue
+            scale[j], offset[j] = self._factors(feature, unit)
+        return scale, offset
+
+    def convert_matrix(self, raw_matrix, feature_order, units):
+        """
+        Convert a batch of panels to dashboard units in one vectorized pass.
+
+        Args:
+            raw_matrix: Array of shape (n_samples, n_features)
+            feature_order: Column names of raw_matrix
+            units: Either a dict of feature -> unit applied to whole columns, or an
+                   array of shape (n_samples, n_features) with a unit per cell
+                   (None/'' meaning dashboard units)
+
+        Returns:
+            Converted float array of the same shape
+        """
+        raw_matrix = np.asarray(raw_matrix, dtype=float)
+        if isinstance(units, dict):
+            scale, offset = self.conversion_vectors(feature_order, units)
+            return raw_matrix * scale + offset
+
+        # Per-cell units: resolve each distinct unit once per column, then gather
+        units = np.asarray(units, dtype=object)
+        scale = np.ones_like(raw_matrix)
+        offset = np.zeros_like(raw_matrix)
+        for j, feature in enumerate(feature_order):
+            distinct, inverse = np.unique(units[:, j].astype(str), return_inverse=True)
+            col_scale = np.ones(len(distinct))
+            col_offset = np.zeros(len(distinct))
+            for k, unit in enumerate(distinct):
+                if unit in ('', 'None'):
+                    continue
+                col_scale[k], col_offset[k] = self._factors(feature, unit)
+            scale[:, j] = col_scale[inverse]
+            offset[:, j] = col_offset[inverse]
+        return raw_matrix * scale + offset